@@ -21,44 +21,224 @@ Characteristics:
         Worst Time: O(n)
     Insert:
         Worst Time: O(n)
+    Insert/delete k elements at once:
+        Worst Time: O(n + k) -- tail is shifted once and storage resized at most once
+
+    With a `dtype` (an `array` module typecode, e.g. 'd' for float64 or 'q' for int64) values are stored unboxed in one
+    contiguous buffer that can be handed to NumPy without copying: `numpy.asarray(l.as_memoryview())`.
 """
 
+from array import array
+from itertools import islice
+
 
 class ArrayList(object):
 
-    def __init__(self, capacity=10, min_capacity=10):
+    def __init__(self, capacity=10, min_capacity=10, dtype=None):
 
         self.min_capacity = min_capacity
         self.capacity = capacity
         self.size = 0
+        self.dtype = dtype
 
-        self.array = [None] * self.capacity
+        self.array = self.new_array(self.capacity)
 
     def __str__(self):
 
-        return str(self.array[:self.size])
+        return str(list(self.array[:self.size]))
 
-    def __getitem__(self, idx):
+    def new_array(self, n):
+
+        if self.dtype is None:
+            return [None] * n
+
+        # zero filled
+        return array(self.dtype, bytes(n * array(self.dtype).itemsize))
+
+    def as_memoryview(self):
+        """
+        Zero copy view of typed values.
+
+        The list can't grow or shrink while the view (or anything made from it, like a NumPy array) is alive.
+        """
+
+        if self.dtype is None:
+            raise TypeError('only typed lists have a buffer')
+
+        return memoryview(self.array)[:self.size]
+
+    def __buffer__(self, flags):
+        # buffer protocol (python >= 3.12)
+        return self.as_memoryview()
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return islice(self.array, self.size)
+
+    def normalize_idx(self, idx):
 
         if not isinstance(idx, int):
             raise TypeError
 
-        if idx >= self.size:
+        if idx < -self.size or idx >= self.size:
             raise IndexError
 
-        return self.array[idx]
+        return idx % self.size
+
+    def __getitem__(self, idx):
+
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(self.size)
+
+            if step == 1:
+                values = self.array[start:stop]
+            else:
+                # negative indices from slice.indices mean "before start" not "from end of storage"
+                values = [self.array[i] for i in range(start, stop, step)]
+
+            res = type(self)(max(len(values), self.min_capacity), self.min_capacity, self.dtype)
+            res.extend(values)
+
+            return res
+
+        return self.array[self.normalize_idx(idx)]
+
+    def __setitem__(self, idx, val):
+
+        if not isinstance(idx, slice):
+            self.array[self.normalize_idx(idx)] = val
+            return
+
+        start, stop, step = idx.indices(self.size)
+        values = self.as_values(val)
+
+        if step != 1:
+            indices = range(start, stop, step)
+
+            # extended slice must be same length (as with lists)
+            if len(indices) != len(values):
+                raise ValueError('attempt to assign sequence of size {} to extended slice of size {}'.format(
+                    len(values), len(indices)))
+
+            # negative indices from slice.indices mean "before start" not "from end of storage"
+            for i, v in zip(indices, values):
+                self.array[i] = v
+            return
+
+        stop = max(start, stop)
+        n = len(values)
+
+        self.shift_tail(stop, start + n)
+        self.array[start: start + n] = values
+
+    def __delitem__(self, idx):
+
+        if not isinstance(idx, slice):
+            self.pop(idx)
+            return
+
+        start, stop, step = idx.indices(self.size)
+
+        if step == 1:
+            self.delete_range(start, stop)
+            return
+
+        # extended slice so rebuild keeping other elements
+        removed = set(range(start, stop, step))
+        kept = self.as_values([v for i, v in enumerate(self) if i not in removed])
+
+        self.delete_range(0, self.size)
+        self.extend(kept)
+
+    def shift_tail(self, idx_from, idx_to):
+        """Move elements [idx_from, size) to start at idx_to (one slice copy) resizing at most once."""
+
+        size_new = self.size + idx_to - idx_from
+
+        if size_new > self.capacity:
+            self.reserve(max(size_new, 2 * self.capacity))
+
+        self.array[idx_to: size_new] = self.array[idx_from: self.size]
+
+        if size_new < self.size:
+            # drop references to removed values
+            self.array[size_new: self.size] = self.new_array(self.size - size_new)
+
+        self.size = size_new
+
+        if self.capacity >= 4 * self.min_capacity and self.size <= self.capacity // 4:
+            self.capacity = max(self.min_capacity, 2 * self.size)
+            del self.array[self.capacity:]
+
+    def insert_many(self, idx, iterable):
+
+        if idx < -self.size or idx > self.size:
+            raise IndexError
+
+        if idx < 0:
+            idx %= self.size
+
+        values = self.as_values(iterable)
+        n = len(values)
+
+        self.shift_tail(idx, idx + n)
+        self.array[idx: idx + n] = values
+
+    def delete_range(self, start, stop):
+
+        start, stop, _ = slice(start, stop).indices(self.size)
+
+        if start < stop:
+            self.shift_tail(stop, start)
 
     def check_size(self):
 
         if self.size == self.capacity:
-            self.capacity *= 2
-            new_array = [None] * self.capacity
-            new_array[:self.size] = self.array
-            self.array = new_array
+            self.reserve(self.capacity * 2)
 
         if self.capacity >= 4 * self.min_capacity and self.size <= self.capacity // 4:
             self.capacity //= 2
-            self.array = self.array[:self.capacity]
+            del self.array[self.capacity:]
+
+    def reserve(self, capacity):
+
+        if capacity <= self.capacity:
+            return
+
+        # extend existing storage (realloc can often grow it in place) rather than copying to new storage
+        self.array.extend(self.new_array(capacity - self.capacity))
+        self.capacity = capacity
+
+    def as_values(self, iterable):
+        """Convert iterable to something that can be slice assigned into array."""
+
+        if self.dtype is None:
+            return iterable if isinstance(iterable, list) else list(iterable)
+
+        if isinstance(iterable, array) and iterable.typecode == self.dtype:
+            return iterable
+
+        try:
+            view = memoryview(iterable)
+        except TypeError:
+            # array constructor iterates in C
+            return array(self.dtype, iterable)
+
+        values = array(self.dtype)
+
+        if view.format.lstrip('@=') == self.dtype and view.c_contiguous:
+            # same binary layout so just copy bytes
+            values.frombytes(view)
+        else:
+            values.fromlist(view.tolist())
+
+        return values
+
+    def extend(self, iterable):
+
+        self.insert_many(self.size, iterable)
 
     def append(self, val):
 
@@ -129,3 +309,34 @@ if __name__ == '__main__':
     l.pop(0)  # 1
     l.pop(-1)  # 8
     print(l, l.array)
+
+    l = ArrayList(dtype='d')
+    l.extend(array('d', [0.5, 1.5]))
+    l.extend(range(3))
+    l.append(4)
+    l.insert(0, -1)
+    print(l, l.as_memoryview().tolist())
+
+    import random
+
+    l = ArrayList(min_capacity=2)
+    py_l = []
+
+    for _ in range(10000):
+        i, j = sorted(random.randint(-len(py_l) - 1, len(py_l) + 1) for _ in range(2))
+        vals = [random.random() for _ in range(random.randint(0, 5))]
+        op = random.randrange(4)
+        if op == 0:
+            l.insert_many(min(max(i, -len(py_l)), len(py_l)), vals)
+            py_l[i:i] = vals
+        elif op == 1:
+            l.delete_range(i, j)
+            del py_l[i:j]
+        elif op == 2:
+            l[i:j] = vals
+            py_l[i:j] = vals
+        else:
+            l.extend(vals)
+            py_l.extend(vals)
+
+        assert list(l) == py_l and list(l[::-2]) == py_l[::-2]
@@ -0,0 +1,808 @@
+"""
+Ordered map stored in fixed size pages of a single file (for indexes that don't fit in memory).
+
+Summary:
+
+    A B+ tree keeps all key/values in leaf pages and only separator keys and child page numbers in internal pages. Each
+    page holds up to hundreds of keys so the tree is only a few pages tall and a lookup reads one page per level.
+    Leaves are linked in key order so ordered iteration and range scans read leaves one after the other without going
+    back up the tree.
+
+    * A page that overflows on insert is split in two and the first key of the right half is added to the parent.
+    * A page that drops below half full on delete borrows a key from a sibling or is merged into it (removing a
+      separator from the parent). Freed pages are reused.
+    * Bulk loading from sorted items writes full leaves one after another and then builds each internal level from the
+      one below, so no splits happen.
+
+    Keys and values are packed with `struct` formats (e.g. 'q' for 64 bit ints, '16s' for short byte strings) so every
+    page has a fixed layout. Inserting a key that wouldn't unpack to an equal key ('Ns' keys must be exactly N bytes
+    since struct pads shorter ones with zeros) or a value that doesn't fit its format raises ValueError. Values are
+    kept as they read back from disk (e.g. 'f' floats rounded to single precision). Pages are decoded into Python lists
+    when read and kept in an LRU cache of `cache_size` pages. Changed pages are only written back when evicted or on
+    flush/close.
+
+Characteristics:
+
+    * n number elements
+    * b keys per page
+    * k number elements generated
+
+    Search:
+        Worst Time: O(log_b n) page reads
+    Insert/delete:
+        Worst Time: O(log_b n) page reads/writes
+    Range:
+        Worst Time: O(log_b n + k / b) page reads
+    Bulk load:
+        Worst Time: O(n / b) page writes
+
+File format:
+
+    Page 0 is a header (magic, version, page size, root page, number pages, number elements, first free page, key
+    format, value format -- little endian). Every other page starts with (kind, number keys, next page) followed by
+    the keys and then the values (leaf) or child page numbers (internal). `next` links leaves in order and free pages
+    into a free list.
+"""
+
+import os
+import struct
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import chain
+
+VERSION = 1
+HEADER = struct.Struct('<4sIIQQQQ16s16s')
+# key/value formats are stored in 16 byte fields of header
+FORMAT_SIZE = 16
+
+PAGE_HEADER = struct.Struct('<BHQ')
+PAGE_HEADER_SIZE = 16
+
+LEAF = 0
+INTERNAL = 1
+FREE = 2
+
+# page 0 is the header so it doubles as "no page"
+NO_PAGE = 0
+
+
+class Page(object):
+
+    __slots__ = ('id', 'kind', 'keys', 'vals', 'children', 'next', 'dirty')
+
+    def __init__(self, id_, kind, keys=None, vals=None, children=None, next_=NO_PAGE):
+
+        self.id = id_
+        self.kind = kind
+
+        self.keys = [] if keys is None else keys
+        # values for a leaf, child page numbers for an internal page
+        self.vals = [] if vals is None else vals
+        self.children = [] if children is None else children
+
+        self.next = next_
+        self.dirty = True
+
+    @property
+    def is_leaf(self):
+        return self.kind == LEAF
+
+
+class Codec(object):
+    """Pack/unpack runs of keys or values with a struct format."""
+
+    def __init__(self, fmt):
+
+        self.fmt = fmt
+        self.size = struct.calcsize('<' + fmt)
+        self.num_fields = len(struct.unpack('<' + fmt, bytes(self.size)))
+
+        # struct for a run of n items by n -- packing a whole run in one call is much faster than item by item
+        self.structs = {}
+
+    def run(self, n):
+
+        s = self.structs.get(n)
+
+        if s is None:
+            s = self.structs[n] = struct.Struct('<' + self.fmt * n)
+
+        return s
+
+    def pack(self, items):
+
+        if self.num_fields == 1:
+            return self.run(len(items)).pack(*items)
+
+        return self.run(len(items)).pack(*chain.from_iterable(items))
+
+    def unpack(self, data):
+
+        fields = self.run(len(data) // self.size).unpack(data)
+
+        if self.num_fields == 1:
+            return list(fields)
+
+        f = self.num_fields
+
+        return [fields[i: i + f] for i in range(0, len(fields), f)]
+
+    def check(self, item, exact=False):
+        """
+        Get item as it will read back from a page (e.g. 'f' floats rounded, 'Ns' bytes padded with zeros).
+
+        Raise ValueError if item can't be packed or, with exact=True, if that changes it -- such a key would compare
+        differently in memory than after its page is written.
+        """
+
+        try:
+            stored = self.unpack(self.pack([item]))[0]
+        except struct.error as e:
+            raise ValueError('{!r} does not fit format {!r} ({})'.format(item, self.fmt, e)) from None
+
+        if exact and stored != item:
+            raise ValueError('{!r} would be stored as {!r} with format {!r}'.format(item, stored, self.fmt))
+
+        return stored
+
+
+def check_format(fmt):
+
+    if len(fmt.encode()) > FORMAT_SIZE:
+        raise ValueError('format {!r} longer than {} bytes'.format(fmt, FORMAT_SIZE))
+
+
+CHILD = Codec('Q')
+
+
+class BPlusTree(object):
+
+    magic = b'BPTR'
+
+    def __init__(self, path, key_format='q', val_format='q', page_size=4096, cache_size=256):
+        """Open tree in file at path (creating it if it doesn't exist). Formats and page size of an existing file win."""
+
+        check_format(key_format)
+        check_format(val_format)
+
+        self.path = path
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+        exists = os.path.exists(path) and os.path.getsize(path) > 0
+
+        self.file = open(path, 'r+b' if exists else 'w+b')
+
+        try:
+            if exists:
+                self.read_header()
+            else:
+                self.setup(key_format, val_format, page_size)
+                self.root = self.new_page(LEAF).id
+                self.flush()
+        except Exception:
+            self.file.close()
+            raise
+
+    def setup(self, key_format, val_format, page_size, root=NO_PAGE, num_pages=1, size=0, free=NO_PAGE):
+
+        if page_size < HEADER.size:
+            raise ValueError('page size must be at least {}'.format(HEADER.size))
+
+        self.page_size = page_size
+
+        self.key_codec = Codec(key_format)
+        self.val_codec = Codec(val_format)
+
+        space = page_size - PAGE_HEADER_SIZE
+
+        self.max_leaf_keys = space // (self.key_codec.size + self.val_codec.size)
+        # internal pages have one more child than keys
+        self.max_internal_keys = (space - CHILD.size) // (self.key_codec.size + CHILD.size)
+
+        if self.max_leaf_keys < 3 or self.max_internal_keys < 3:
+            raise ValueError('page size too small for key/value formats')
+
+        self.root = root
+        self.num_pages = num_pages
+        self.size = size
+        self.free = free
+
+    def read_header(self):
+
+        self.file.seek(0)
+        data = self.file.read(HEADER.size)
+
+        magic, version, page_size, root, num_pages, size, free, key_format, val_format = HEADER.unpack(data)
+
+        if magic != self.magic or version != VERSION:
+            raise ValueError('not a b+ tree file (or unsupported version)')
+
+        self.setup(key_format.rstrip(b'\0').decode(), val_format.rstrip(b'\0').decode(), page_size, root, num_pages,
+                   size, free)
+
+    def write_header(self):
+
+        header = HEADER.pack(self.magic, VERSION, self.page_size, self.root, self.num_pages, self.size, self.free,
+                             self.key_codec.fmt.encode(), self.val_codec.fmt.encode())
+
+        self.file.seek(0)
+        self.file.write(header.ljust(self.page_size, b'\0'))
+
+    def min_keys(self, page):
+
+        return (self.max_leaf_keys if page.is_leaf else self.max_internal_keys) // 2
+
+    # pages
+
+    def encode(self, page):
+
+        parts = [PAGE_HEADER.pack(page.kind, len(page.keys), page.next).ljust(PAGE_HEADER_SIZE, b'\0')]
+
+        if page.kind != FREE:
+            parts.append(self.key_codec.pack(page.keys))
+
+            if page.is_leaf:
+                parts.append(self.val_codec.pack(page.vals))
+            else:
+                parts.append(CHILD.pack(page.children))
+
+        data = b''.join(parts)
+
+        if len(data) > self.page_size:
+            raise ValueError('page {} overflows'.format(page.id))
+
+        return data.ljust(self.page_size, b'\0')
+
+    def decode(self, id_, data):
+
+        kind, n, next_ = PAGE_HEADER.unpack_from(data)
+
+        page = Page(id_, kind, next_=next_)
+        page.dirty = False
+
+        if kind == FREE:
+            return page
+
+        start = PAGE_HEADER_SIZE
+        end = start + n * self.key_codec.size
+        page.keys = self.key_codec.unpack(data[start: end])
+
+        if kind == LEAF:
+            page.vals = self.val_codec.unpack(data[end: end + n * self.val_codec.size])
+        else:
+            page.children = CHILD.unpack(data[end: end + (n + 1) * CHILD.size])
+
+        return page
+
+    def write_page(self, page):
+
+        self.file.seek(page.id * self.page_size)
+        self.file.write(self.encode(page))
+
+        page.dirty = False
+
+    def get_page(self, id_):
+
+        page = self.cache.get(id_)
+
+        if page is not None:
+            self.cache.move_to_end(id_)
+            return page
+
+        self.file.seek(id_ * self.page_size)
+        page = self.decode(id_, memoryview(self.file.read(self.page_size)))
+
+        self.cache[id_] = page
+
+        return page
+
+    def evict(self):
+        """
+        Drop least recently used pages (writing changed ones) until cache is within cache_size.
+
+        Only called at the end of an operation so a page object is never evicted and reread while in use.
+        """
+
+        cache = self.cache
+
+        while len(cache) > self.cache_size:
+            _, page = cache.popitem(last=False)
+            if page.dirty:
+                self.write_page(page)
+
+    def new_page(self, kind):
+
+        if self.free != NO_PAGE:
+            id_ = self.free
+            self.free = self.get_page(id_).next
+        else:
+            id_ = self.num_pages
+            self.num_pages += 1
+
+        page = Page(id_, kind)
+        self.cache[id_] = page
+
+        return page
+
+    def free_page(self, page):
+
+        page.kind = FREE
+        page.keys, page.vals, page.children = [], [], []
+        page.next = self.free
+        page.dirty = True
+
+        self.free = page.id
+
+    def flush(self):
+
+        for page in self.cache.values():
+            if page.dirty:
+                self.write_page(page)
+
+        self.write_header()
+        self.file.flush()
+
+    def close(self):
+
+        if self.file is None:
+            return
+
+        self.flush()
+        self.file.close()
+
+        self.file = None
+        self.cache.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    # map api
+
+    def __len__(self):
+        return self.size
+
+    def find_leaf(self, key, path=None):
+        """Leaf page that would hold key. Appends (internal page, child index) of each level to path if given."""
+
+        page = self.get_page(self.root)
+
+        while not page.is_leaf:
+            idx = bisect_right(page.keys, key)
+            if path is not None:
+                path.append((page, idx))
+            page = self.get_page(page.children[idx])
+
+        return page
+
+    def get(self, key, default=None):
+
+        leaf = self.find_leaf(key)
+        idx = bisect_left(leaf.keys, key)
+
+        res = leaf.vals[idx] if idx < len(leaf.keys) and leaf.keys[idx] == key else default
+
+        self.evict()
+
+        return res
+
+    def __getitem__(self, key):
+
+        leaf = self.find_leaf(key)
+        idx = bisect_left(leaf.keys, key)
+
+        self.evict()
+
+        if idx == len(leaf.keys) or leaf.keys[idx] != key:
+            raise KeyError(key)
+
+        return leaf.vals[idx]
+
+    def __contains__(self, key):
+
+        leaf = self.find_leaf(key)
+        idx = bisect_left(leaf.keys, key)
+
+        self.evict()
+
+        return idx < len(leaf.keys) and leaf.keys[idx] == key
+
+    def __setitem__(self, key, val):
+        self.insert(key, val)
+
+    def __delitem__(self, key):
+        self.delete(key)
+
+    def insert(self, key, val):
+
+        # fail before changing anything rather than when the page is written (lookups don't check keys since keys
+        # that don't fit can't be in the tree) and keep value as it will read back from disk
+        self.key_codec.check(key, exact=True)
+        val = self.val_codec.check(val)
+
+        path = []
+        leaf = self.find_leaf(key, path)
+
+        idx = bisect_left(leaf.keys, key)
+        leaf.dirty = True
+
+        if idx < len(leaf.keys) and leaf.keys[idx] == key:
+            leaf.vals[idx] = val
+            self.evict()
+            return
+
+        leaf.keys.insert(idx, key)
+        leaf.vals.insert(idx, val)
+        self.size += 1
+
+        page = leaf
+
+        while len(page.keys) > (self.max_leaf_keys if page.is_leaf else self.max_internal_keys):
+
+            sep, right = self.split(page)
+
+            if path:
+                parent, idx = path.pop()
+                parent.keys.insert(idx, sep)
+                parent.children.insert(idx + 1, right.id)
+                parent.dirty = True
+                page = parent
+            else:
+                root = self.new_page(INTERNAL)
+                root.keys = [sep]
+                root.children = [page.id, right.id]
+                self.root = root.id
+                break
+
+        self.evict()
+
+    def split(self, page):
+        """Move upper half of page into a new page. Get (separator key for parent, new page)."""
+
+        mid = len(page.keys) // 2
+        right = self.new_page(page.kind)
+
+        if page.is_leaf:
+            right.keys, page.keys = page.keys[mid:], page.keys[:mid]
+            right.vals, page.vals = page.vals[mid:], page.vals[:mid]
+
+            right.next = page.next
+            page.next = right.id
+
+            sep = right.keys[0]
+        else:
+            # middle key moves up to parent
+            sep = page.keys[mid]
+
+            right.keys, page.keys = page.keys[mid + 1:], page.keys[:mid]
+            right.children, page.children = page.children[mid + 1:], page.children[:mid + 1]
+
+        page.dirty = True
+
+        return sep, right
+
+    def delete(self, key):
+        """Remove key and return its value."""
+
+        path = []
+        leaf = self.find_leaf(key, path)
+
+        idx = bisect_left(leaf.keys, key)
+
+        if idx == len(leaf.keys) or leaf.keys[idx] != key:
+            self.evict()
+            raise KeyError(key)
+
+        del leaf.keys[idx]
+        val = leaf.vals.pop(idx)
+        leaf.dirty = True
+
+        self.size -= 1
+
+        page = leaf
+
+        while path and len(page.keys) < self.min_keys(page):
+            parent, idx = path.pop()
+            if not self.rebalance(parent, idx, page):
+                break
+            page = parent
+
+        root = self.get_page(self.root)
+
+        if not root.is_leaf and not root.keys:
+            # root lost its last separator
+            self.root = root.children[0]
+            self.free_page(root)
+
+        self.evict()
+
+        return val
+
+    def rebalance(self, parent, idx, page):
+        """
+        Fix underfull page (child idx of parent) by borrowing a key from a sibling or merging with one.
+
+        Return True if pages were merged (parent lost a key and may now be underfull).
+        """
+
+        left = self.get_page(parent.children[idx - 1]) if idx > 0 else None
+        right = self.get_page(parent.children[idx + 1]) if idx + 1 < len(parent.children) else None
+
+        parent.dirty = page.dirty = True
+
+        if left is not None and len(left.keys) > self.min_keys(left):
+            left.dirty = True
+
+            if page.is_leaf:
+                page.keys.insert(0, left.keys.pop())
+                page.vals.insert(0, left.vals.pop())
+                parent.keys[idx - 1] = page.keys[0]
+            else:
+                # rotate through parent
+                page.keys.insert(0, parent.keys[idx - 1])
+                parent.keys[idx - 1] = left.keys.pop()
+                page.children.insert(0, left.children.pop())
+
+            return False
+
+        if right is not None and len(right.keys) > self.min_keys(right):
+            right.dirty = True
+
+            if page.is_leaf:
+                page.keys.append(right.keys.pop(0))
+                page.vals.append(right.vals.pop(0))
+                parent.keys[idx] = right.keys[0]
+            else:
+                page.keys.append(parent.keys[idx])
+                parent.keys[idx] = right.keys.pop(0)
+                page.children.append(right.children.pop(0))
+
+            return False
+
+        # merge right page of the pair into the left one
+        if left is not None:
+            self.merge(parent, idx - 1, left, page)
+        else:
+            self.merge(parent, idx, page, right)
+
+        return True
+
+    def merge(self, parent, sep_idx, left, right):
+
+        if left.is_leaf:
+            left.keys.extend(right.keys)
+            left.vals.extend(right.vals)
+            left.next = right.next
+        else:
+            left.keys.append(parent.keys[sep_idx])
+            left.keys.extend(right.keys)
+            left.children.extend(right.children)
+
+        left.dirty = True
+
+        del parent.keys[sep_idx]
+        del parent.children[sep_idx + 1]
+
+        self.free_page(right)
+
+    def first_leaf(self):
+
+        page = self.get_page(self.root)
+
+        while not page.is_leaf:
+            page = self.get_page(page.children[0])
+
+        return page
+
+    def items(self, lo=None, hi=None):
+        """
+        Generate (key, val) with lo <= key < hi in order (None for no bound) by following the leaf links.
+
+        The tree shouldn't be changed while iterating.
+        """
+
+        if lo is None:
+            leaf = self.first_leaf()
+            idx = 0
+        else:
+            leaf = self.find_leaf(lo)
+            idx = bisect_left(leaf.keys, lo)
+
+        while True:
+
+            keys, vals, next_ = leaf.keys, leaf.vals, leaf.next
+            end = len(keys) if hi is None else bisect_left(keys, hi, idx)
+
+            self.evict()
+
+            for i in range(idx, end):
+                yield keys[i], vals[i]
+
+            if end < len(keys) or next_ == NO_PAGE:
+                return
+
+            leaf = self.get_page(next_)
+            idx = 0
+
+    def range(self, lo=None, hi=None):
+        """Generate (key, val) with lo <= key < hi."""
+
+        return self.items(lo, hi)
+
+    def __iter__(self):
+
+        for key, _ in self.items():
+            yield key
+
+    @classmethod
+    def from_sorted(cls, path, items, key_format='q', val_format='q', page_size=4096, cache_size=256, fill=1.0):
+        """
+        Create tree at path (replacing any file there) from (key, val) items in increasing key order.
+
+        Pages are filled to `fill` of their capacity (leave room to make later inserts cheaper) and written straight
+        to the file.
+        """
+
+        check_format(key_format)
+        check_format(val_format)
+
+        key_codec, val_codec = Codec(key_format), Codec(val_format)
+
+        # check items before replacing the file
+        keys, vals = [], []
+        for key, val in items:
+            key_codec.check(key, exact=True)
+            if keys and not key > keys[-1]:
+                raise ValueError('keys not strictly increasing ({!r} after {!r})'.format(key, keys[-1]))
+            keys.append(key)
+            vals.append(val_codec.check(val))
+
+        if os.path.exists(path):
+            os.remove(path)
+
+        tree = cls(path, key_format, val_format, page_size, cache_size)
+
+        # start from an empty file rather than the empty root leaf
+        tree.cache.clear()
+        tree.num_pages = 1
+
+        def chunks(n, capacity, min_size):
+            """Split range(n) into runs of at most capacity (at least min_size unless there is only one)."""
+
+            per_page = max(min_size, min(capacity, int(capacity * fill)))
+            bounds = list(range(0, n, per_page)) + [n]
+
+            if len(bounds) > 2 and bounds[-1] - bounds[-2] < min_size:
+                # share last two runs evenly
+                bounds[-2] = (bounds[-3] + bounds[-1]) // 2
+
+            return list(zip(bounds, bounds[1:]))
+
+        if not keys:
+            tree.root = tree.new_page(LEAF).id
+            tree.flush()
+            return tree
+
+        ranges = chunks(len(keys), tree.max_leaf_keys, tree.max_leaf_keys // 2)
+        first_id = tree.num_pages
+
+        # level is list of (page id, smallest key in subtree)
+        level = []
+
+        for i, (start, end) in enumerate(ranges):
+            id_ = first_id + i
+            next_ = id_ + 1 if i + 1 < len(ranges) else NO_PAGE
+            tree.write_page(Page(id_, LEAF, keys[start: end], vals[start: end], next_=next_))
+            level.append((id_, keys[start]))
+
+        tree.num_pages += len(ranges)
+
+        while len(level) > 1:
+
+            # runs of children (one more than keys)
+            ranges = chunks(len(level), tree.max_internal_keys + 1, tree.max_internal_keys // 2 + 1)
+
+            upper = []
+
+            for start, end in ranges:
+                id_ = tree.num_pages
+                tree.num_pages += 1
+
+                children = level[start: end]
+                page = Page(id_, INTERNAL, [k for _, k in children[1:]], children=[c for c, _ in children])
+
+                tree.write_page(page)
+                upper.append((id_, children[0][1]))
+
+            level = upper
+
+        tree.root = level[0][0]
+        tree.size = len(keys)
+        tree.flush()
+
+        return tree
+
+    def height(self):
+
+        h = 1
+        page = self.get_page(self.root)
+
+        while not page.is_leaf:
+            page = self.get_page(page.children[0])
+            h += 1
+
+        return h
+
+
+if __name__ == '__main__':
+
+    import random
+    import tempfile
+    import time
+
+    d = tempfile.mkdtemp()
+
+    # small pages and cache so splits, merges and evictions all happen
+    path = os.path.join(d, 'test.bpt')
+
+    with BPlusTree(path, page_size=128, cache_size=4) as tree:
+
+        expected = {}
+
+        for i in range(20000):
+            key = random.randrange(3000)
+            if key in expected and random.random() < 0.5:
+                assert tree.delete(key) == expected.pop(key)
+            else:
+                tree[key] = expected[key] = i
+
+        assert len(tree) == len(expected)
+        assert list(tree.items()) == sorted(expected.items())
+
+        assert [k for k, _ in tree.range(1000, 1100)] == sorted(k for k in expected if 1000 <= k < 1100)
+
+        print('height {} pages {} for {} keys'.format(tree.height(), tree.num_pages, len(tree)))
+
+    # reopen
+    with BPlusTree(path) as tree:
+        assert list(tree.items()) == sorted(expected.items())
+
+        for key in list(expected):
+            del tree[key]
+
+        assert len(tree) == 0 and list(tree) == []
+
+    n = 10 ** 6
+    n_lookups = 100000
+    keys = random.sample(range(n), n)
+
+    path = os.path.join(d, 'bench.bpt')
+
+    t0 = time.perf_counter()
+    tree = BPlusTree.from_sorted(path, ((k, 2 * k) for k in range(n)), cache_size=64)
+    print('bulk load {} keys {:.2f}s ({} pages)'.format(n, time.perf_counter() - t0, tree.num_pages))
+
+    for cache_size in [16, 1024]:
+        tree.cache_size = cache_size
+
+        t0 = time.perf_counter()
+        for k in keys[:n_lookups]:
+            assert tree[k] == 2 * k
+        print('cache {:5d} pages: {:.0f} lookups/s'.format(cache_size, n_lookups / (time.perf_counter() - t0)))
+
+    t0 = time.perf_counter()
+    assert sum(1 for _ in tree.range(n // 4, 3 * n // 4)) == n // 2
+    print('range scan {} keys {:.2f}s'.format(n // 2, time.perf_counter() - t0))
+
+    tree.close()
+
+    os.remove(path)
+
+    t0 = time.perf_counter()
+    with BPlusTree(path, cache_size=64) as tree:
+        for k in keys:
+            tree[k] = 2 * k
+        print('{} random inserts {:.2f}s ({} pages)'.format(n, time.perf_counter() - t0, tree.num_pages))
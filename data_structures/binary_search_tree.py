@@ -12,6 +12,11 @@ Summary:
 
     **Note**: Worst case performance is bad since the tree can grow linearly.
 
+    `add` is functional (copies the path to the new node). BinarySearchTree changes nodes in place with loops instead of
+    recursion (so linear trees don't hit the recursion limit) and can keep itself AVL balanced: each node stores its
+    height and after an insert/delete the nodes on the search path are rotated where subtree heights differ by more
+    than 1. That bounds the height by ~1.44 logn so all operations are O(logn) worst case.
+
 Characteristics:
 
     * n number elements
@@ -30,6 +35,8 @@ Characteristics:
 
 class Node(object):
 
+    __slots__ = ('key', 'val', 'left', 'right', 'height')
+
     def __init__(self, key, val, left=None, right=None):
 
         self.key = key
@@ -38,18 +45,26 @@ class Node(object):
         self.left = left
         self.right = right
 
-    def __getitem__(self, key):
+        # only maintained by balanced BinarySearchTree
+        self.height = 1
 
-        if self.key == key:
-            return self.val
+    def find(self, key):
 
-        if key < self.key and self.left:
-            return self.left[key]
+        node = self
 
-        if key > self.key and self.right:
-            return self.right[key]
+        while node is not None and node.key != key:
+            node = node.left if key < node.key else node.right
 
-        raise KeyError
+        return node
+
+    def __getitem__(self, key):
+
+        node = self.find(key)
+
+        if node is None:
+            raise KeyError(key)
+
+        return node.val
 
     # https://stackoverflow.com/questions/37426935
     def __str__(self):
@@ -65,12 +80,8 @@ class Node(object):
 
     def __contains__(self, item):
 
-        if self.key == item:
-            return True
-
-        res = (item in self.left if self.left else False) or (item in self.right if self.right else False)
-
-        return res
+        # only one subtree can hold item
+        return self.find(item) is not None
 
 
 def add(key, val, node=None):
@@ -88,36 +99,32 @@ def add(key, val, node=None):
 
 
 def delete(key, root):
+    """Functional like add: copies the path to the deleted node so trees sharing nodes with root are unchanged."""
 
     if root is None:
         return root
 
     if key < root.key:
-        root.left = delete(key, root.left)
-    elif key > root.key:
-        root.right = delete(key, root.right)
-    else:
-
-        if root.right is None:
-            return root.left
-        elif root.left is None:
-            return root.right
+        return Node(root.key, root.val, delete(key, root.left), root.right)
 
-        min_node = root.right
-        while min_node.left:
-            min_node = min_node.left
+    if key > root.key:
+        return Node(root.key, root.val, root.left, delete(key, root.right))
 
-        root.key = min_node.key
-        root.val = min_node.val
+    if root.right is None:
+        return root.left
+    elif root.left is None:
+        return root.right
 
-        root.right = delete(root.key, root.right)
+    min_node = root.right
+    while min_node.left:
+        min_node = min_node.left
 
-    return root
+    return Node(min_node.key, min_node.val, root.left, delete(min_node.key, root.right))
 
 
 def delete_loop(key, root):
 
-    # This is messier but does only single traversal to find successor.
+    # This is messier but does only single traversal to find successor. Unlike delete it changes nodes in place.
 
     node = root
 
@@ -137,7 +144,7 @@ def delete_loop(key, root):
         node.val = succ.val
 
         if succ_parent:
-            succ_parent.left = None
+            succ_parent.left = succ.right
         else:
             # node is succ_parent
             node.right = succ.right
@@ -162,6 +169,281 @@ def _get_succ(node):
     return prev, node
 
 
+def height(node):
+    return node.height if node is not None else 0
+
+
+def update_height(node):
+
+    node.height = 1 + max(height(node.left), height(node.right))
+
+
+def rotate_left(node):
+
+    top = node.right
+    node.right = top.left
+    top.left = node
+
+    update_height(node)
+    update_height(top)
+
+    return top
+
+
+def rotate_right(node):
+
+    top = node.left
+    node.left = top.right
+    top.right = node
+
+    update_height(node)
+    update_height(top)
+
+    return top
+
+
+def rebalance(node):
+    """Restore AVL property (subtree heights differ by at most 1) at node. Return new root of subtree."""
+
+    update_height(node)
+
+    balance = height(node.left) - height(node.right)
+
+    if balance > 1:
+        if height(node.left.left) < height(node.left.right):
+            node.left = rotate_left(node.left)
+        return rotate_right(node)
+
+    if balance < -1:
+        if height(node.right.right) < height(node.right.left):
+            node.right = rotate_right(node.right)
+        return rotate_left(node)
+
+    return node
+
+
+class BinarySearchTree(object):
+    """
+    Mutable BST. Operations walk down the tree in a loop (no recursion) and change nodes in place.
+
+    If balanced is True the tree is kept AVL balanced by rotating nodes on the search path after inserts/deletes.
+    """
+
+    def __init__(self, balanced=False):
+
+        self.balanced = balanced
+
+        self.root = None
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __str__(self):
+        return str(self.root)
+
+    def __iter__(self):
+        """Keys in order."""
+
+        for key, _ in self.items():
+            yield key
+
+    def items(self):
+        """(key, val) in key order."""
+
+        stack = []
+        node = self.root
+
+        while stack or node is not None:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.key, node.val
+            node = node.right
+
+    def __contains__(self, key):
+
+        return self.root is not None and self.root.find(key) is not None
+
+    def get(self, key, default=None):
+
+        node = self.root.find(key) if self.root is not None else None
+
+        return default if node is None else node.val
+
+    def __getitem__(self, key):
+
+        if self.root is None:
+            raise KeyError(key)
+
+        return self.root[key]
+
+    def __setitem__(self, key, val):
+        self.insert(key, val)
+
+    def __delitem__(self, key):
+        self.delete(key)
+
+    def fix_path(self, path):
+        """Rebalance nodes on path (root first) from the bottom up, relinking rotated subtrees."""
+
+        for i in range(len(path) - 1, -1, -1):
+
+            node = path[i]
+            old_height = node.height
+
+            top = rebalance(node)
+
+            if top is not node:
+                if i == 0:
+                    self.root = top
+                elif path[i - 1].left is node:
+                    path[i - 1].left = top
+                else:
+                    path[i - 1].right = top
+            elif node.height == old_height:
+                # heights above are unchanged
+                return
+
+    def insert(self, key, val):
+
+        if self.root is None:
+            self.root = Node(key, val)
+            self.size = 1
+            return
+
+        path = []
+        node = self.root
+
+        while True:
+
+            if key == node.key:
+                node.val = val
+                return
+
+            path.append(node)
+
+            if key < node.key:
+                if node.left is None:
+                    node.left = Node(key, val)
+                    break
+                node = node.left
+            else:
+                if node.right is None:
+                    node.right = Node(key, val)
+                    break
+                node = node.right
+
+        self.size += 1
+
+        if self.balanced:
+            self.fix_path(path)
+
+    def delete(self, key):
+        """Remove key and return its value."""
+
+        path = []
+        node = self.root
+
+        while node is not None and node.key != key:
+            path.append(node)
+            node = node.left if key < node.key else node.right
+
+        if node is None:
+            raise KeyError(key)
+
+        val = node.val
+
+        if node.left is not None and node.right is not None:
+            # move successor into node and remove successor instead (it has no left child)
+            path.append(node)
+            succ = node.right
+            while succ.left is not None:
+                path.append(succ)
+                succ = succ.left
+
+            node.key, node.val = succ.key, succ.val
+            node = succ
+
+        child = node.left if node.left is not None else node.right
+
+        if not path:
+            self.root = child
+        elif path[-1].left is node:
+            path[-1].left = child
+        else:
+            path[-1].right = child
+
+        self.size -= 1
+
+        if self.balanced:
+            self.fix_path(path)
+
+        return val
+
+    def height(self):
+        """Height of tree (computed with a level order walk so it also works for unbalanced trees)."""
+
+        h = 0
+        level = [self.root] if self.root is not None else []
+
+        while level:
+            h += 1
+            level = [child for node in level for child in (node.left, node.right) if child is not None]
+
+        return h
+
+
+def benchmark(n, max_linear=5000):
+    """
+    Seconds to insert n sorted and n random keys with functional add and BinarySearchTree (plain/AVL).
+
+    Sorted keys make unbalanced trees linear (O(n^2) inserts) so those are skipped if n > max_linear.
+    """
+
+    import random
+    import sys
+    import time
+
+    keys = {'sorted': list(range(n)), 'random': random.sample(range(n), n)}
+
+    res = {}
+
+    for order, ks in keys.items():
+
+        linear = order == 'sorted'
+
+        if linear and n > max_linear:
+            res['add', order] = 'skipped'
+        else:
+            t0 = time.perf_counter()
+            root = None
+            try:
+                for k in ks:
+                    root = add(k, None, root)
+                res['add', order] = time.perf_counter() - t0
+            except RecursionError:
+                res['add', order] = 'RecursionError (limit {})'.format(sys.getrecursionlimit())
+
+        for balanced in [False, True]:
+
+            name = 'BinarySearchTree(balanced={})'.format(balanced)
+
+            if linear and not balanced and n > max_linear:
+                res[name, order] = 'skipped'
+                continue
+
+            bst = BinarySearchTree(balanced)
+
+            t0 = time.perf_counter()
+            for k in ks:
+                bst.insert(k, None)
+            res[name, order] = time.perf_counter() - t0
+
+    return res
+
+
 if __name__ == '__main__':
 
     bst = add('d', 0)
@@ -178,3 +460,29 @@ if __name__ == '__main__':
     bst = delete('g', bst)
 
     print(bst)
+
+    bst = BinarySearchTree(balanced=True)
+    for k in 'dbacgefh':
+        bst[k] = 0
+    del bst['g']
+    print(bst)
+
+    import random
+
+    for balanced in [False, True]:
+        bst = BinarySearchTree(balanced)
+        d = {}
+        for _ in range(20000):
+            k = random.randrange(2000)
+            if k in d and random.random() < 0.5:
+                assert bst.delete(k) == d.pop(k)
+            else:
+                bst[k] = d[k] = random.random()
+            assert len(bst) == len(d)
+        assert list(bst) == sorted(d) and all(bst[k] == v for k, v in d.items())
+        print('balanced={} height {} for {} keys'.format(balanced, bst.height(), len(bst)))
+
+    for n in [3000, 10 ** 6]:
+        print('n = {}'.format(n))
+        for (name, order), t in benchmark(n).items():
+            print('    {:34s} {:6s} {}'.format(name, order, t if isinstance(t, str) else '{:.3f}s'.format(t)))
@@ -0,0 +1,332 @@
+"""
+Bounded FIFO queues for producer/consumer pipelines.
+
+Summary:
+
+    BoundedQueue wraps a FIFOQueue (or RingBufferQueue) with a lock and two conditions. put blocks while the queue is
+    full (backpressure) and get blocks while it is empty, both with optional timeouts.
+
+    AsyncBoundedQueue is the same for coroutines on one asyncio event loop: put/get await instead of blocking a thread.
+
+    SPSCQueue is for exactly one producer thread and one consumer thread. It is a ring buffer where only the producer
+    writes `tail` and only the consumer writes `head`, so no lock is needed: the producer stores the item before
+    publishing the new tail and the consumer takes the item before publishing the new head. This relies on the GIL
+    making single list item and attribute stores atomic. Waiting is done by polling with a short sleep.
+
+Characteristics:
+
+    Put:
+        Worst Time: O(1) (excluding waiting)
+    Get:
+        Worst Time: O(1) (excluding waiting)
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+
+from data_structures.fifo_queue import EmptyQueueException, FIFOQueue
+
+
+class FullQueueException(Exception):
+    pass
+
+
+class BoundedQueue(object):
+
+    def __init__(self, maxsize, queue=None):
+
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+
+        self.maxsize = maxsize
+        self.queue = FIFOQueue() if queue is None else queue
+
+        self.lock = threading.Lock()
+        self.not_empty = threading.Condition(self.lock)
+        self.not_full = threading.Condition(self.lock)
+
+    def __len__(self):
+        return len(self.queue)
+
+    def put(self, item, block=True, timeout=None):
+
+        with self.not_full:
+
+            if len(self.queue) >= self.maxsize:
+                if not block:
+                    raise FullQueueException
+
+                if not self.not_full.wait_for(lambda: len(self.queue) < self.maxsize, timeout):
+                    raise FullQueueException
+
+            self.queue.enqueue(item)
+            self.not_empty.notify()
+
+    def get(self, block=True, timeout=None):
+
+        with self.not_empty:
+
+            if not len(self.queue):
+                if not block:
+                    raise EmptyQueueException
+
+                if not self.not_empty.wait_for(lambda: len(self.queue), timeout):
+                    raise EmptyQueueException
+
+            item = self.queue.dequeue()
+            self.not_full.notify()
+
+            return item
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+
+class AsyncBoundedQueue(object):
+
+    def __init__(self, maxsize, queue=None):
+
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+
+        self.maxsize = maxsize
+        self.queue = FIFOQueue() if queue is None else queue
+
+        # futures of coroutines waiting for an item/free slot
+        self.getters = deque()
+        self.putters = deque()
+
+    def __len__(self):
+        return len(self.queue)
+
+    @staticmethod
+    def wake_next(waiters):
+
+        while waiters:
+            fut = waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                return
+
+    async def wait(self, waiters, ready, timeout):
+
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+
+        while not ready():
+
+            fut = loop.create_future()
+            waiters.append(fut)
+
+            try:
+                await asyncio.wait_for(fut, None if deadline is None else max(0, deadline - loop.time()))
+            except BaseException as e:
+                # may have been woken just before timeout/cancellation so pass wake up on
+                if ready():
+                    self.wake_next(waiters)
+                if isinstance(e, asyncio.TimeoutError):
+                    return False
+                raise
+
+        return True
+
+    async def put(self, item, timeout=None):
+
+        if not await self.wait(self.putters, lambda: len(self.queue) < self.maxsize, timeout):
+            raise FullQueueException
+
+        self.put_nowait(item)
+
+    async def get(self, timeout=None):
+
+        if not await self.wait(self.getters, lambda: len(self.queue), timeout):
+            raise EmptyQueueException
+
+        return self.get_nowait()
+
+    def put_nowait(self, item):
+
+        if len(self.queue) >= self.maxsize:
+            raise FullQueueException
+
+        self.queue.enqueue(item)
+        self.wake_next(self.getters)
+
+    def get_nowait(self):
+
+        if not len(self.queue):
+            raise EmptyQueueException
+
+        item = self.queue.dequeue()
+        self.wake_next(self.putters)
+
+        return item
+
+
+class SPSCQueue(object):
+    """Lock free bounded queue for a single producer thread and single consumer thread."""
+
+    def __init__(self, maxsize, poll_interval=1e-5):
+
+        if maxsize < 1:
+            raise ValueError('maxsize must be at least 1')
+
+        self.maxsize = maxsize
+        self.poll_interval = poll_interval
+
+        self.array = [None] * maxsize
+
+        # only producer writes tail and only consumer writes head (both count all items ever enqueued/dequeued)
+        self.head = 0
+        self.tail = 0
+
+    def __len__(self):
+        return self.tail - self.head
+
+    def wait(self, ready, timeout):
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while not ready():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self.poll_interval)
+
+        return True
+
+    def put(self, item, block=True, timeout=None):
+
+        tail = self.tail
+
+        if tail - self.head >= self.maxsize:
+            if not block or not self.wait(lambda: tail - self.head < self.maxsize, timeout):
+                raise FullQueueException
+
+        self.array[tail % self.maxsize] = item
+
+        # publish only after item is stored
+        self.tail = tail + 1
+
+    def get(self, block=True, timeout=None):
+
+        head = self.head
+
+        if self.tail == head:
+            if not block or not self.wait(lambda: self.tail != head, timeout):
+                raise EmptyQueueException
+
+        idx = head % self.maxsize
+        item = self.array[idx]
+        self.array[idx] = None
+
+        # free slot only after item is taken
+        self.head = head + 1
+
+        return item
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+
+def benchmark_threads(make_queue, num_producers, num_consumers, num_items=100000):
+    """Items per second moved through queue by producer and consumer threads."""
+
+    q = make_queue()
+    done = object()
+
+    per_producer = num_items // num_producers
+
+    def produce():
+        for i in range(per_producer):
+            q.put(i)
+
+    def consume():
+        while q.get() is not done:
+            pass
+
+    producers = [threading.Thread(target=produce) for _ in range(num_producers)]
+    consumers = [threading.Thread(target=consume) for _ in range(num_consumers)]
+
+    t0 = time.perf_counter()
+
+    for t in producers + consumers:
+        t.start()
+    for t in producers:
+        t.join()
+    for _ in consumers:
+        q.put(done)
+    for t in consumers:
+        t.join()
+
+    return per_producer * num_producers / (time.perf_counter() - t0)
+
+
+async def benchmark_async(num_producers, num_consumers, num_items=100000, maxsize=1024):
+
+    q = AsyncBoundedQueue(maxsize)
+    done = object()
+
+    per_producer = num_items // num_producers
+
+    async def produce():
+        for i in range(per_producer):
+            await q.put(i)
+
+    async def consume():
+        while await q.get() is not done:
+            pass
+
+    t0 = time.perf_counter()
+
+    consumers = [asyncio.ensure_future(consume()) for _ in range(num_consumers)]
+    await asyncio.gather(*[produce() for _ in range(num_producers)])
+    for _ in consumers:
+        await q.put(done)
+    await asyncio.gather(*consumers)
+
+    return per_producer * num_producers / (time.perf_counter() - t0)
+
+
+if __name__ == '__main__':
+
+    import queue
+
+    from data_structures.fifo_queue import RingBufferQueue
+
+    q = BoundedQueue(2)
+    q.put(1)
+    q.put(2)
+    try:
+        q.put(3, timeout=0.01)
+    except FullQueueException:
+        print('full')
+    assert q.get() == 1 and q.get() == 2
+
+    maxsize = 1024
+
+    queues = [
+        ('queue.Queue', lambda: queue.Queue(maxsize)),
+        ('BoundedQueue(FIFOQueue)', lambda: BoundedQueue(maxsize)),
+        ('BoundedQueue(RingBufferQueue)', lambda: BoundedQueue(maxsize, RingBufferQueue())),
+        ('SPSCQueue', lambda: SPSCQueue(maxsize)),
+    ]
+
+    for num_producers, num_consumers in [(1, 1), (4, 1), (4, 4)]:
+        print('{} -> {}'.format(num_producers, num_consumers))
+
+        for name, make_queue in queues:
+            if name == 'SPSCQueue' and (num_producers, num_consumers) != (1, 1):
+                continue
+            rate = benchmark_threads(make_queue, num_producers, num_consumers)
+            print('    {:30s} {:9.0f} items/s'.format(name, rate))
+
+        rate = asyncio.run(benchmark_async(num_producers, num_consumers))
+        print('    {:30s} {:9.0f} items/s'.format('AsyncBoundedQueue', rate))
@@ -7,6 +7,16 @@ Summary:
     2. Set these bits in the boolean array.
     3. Any bit not set in the array means the corresponding element is not in the filter.
 
+    Bits are packed 8 to a byte. Rather than k independent hashes, all k indices come from one 128 bit digest split
+    into two 64 bit hashes h1, h2 with index_i = h1 + i * h2 + (i ** 3 - i) / 6 (Kirsch-Mitzenmacher double hashing
+    with a cubic term so small or composite m doesn't make indices cycle) -- this has the same asymptotic false
+    positive rate.
+
+    For n expected members and target false positive rate p the optimal sizes are:
+
+        m = -n ln(p) / ln(2) ** 2
+        k = m / n ln(2)
+
 Characteristics:
 
     * m number bits in array
@@ -21,49 +31,500 @@ Characteristics:
         Worst Time: O(k)
     Search:
         Worst Time: O(k)
+    Union/intersection:
+        Worst Time: O(m) -- but done on whole integers in C rather than per element
+
+File format:
+
+    A 64 byte header (magic, version, m, k, seed, count -- little endian) followed by the packed bits. `BloomFilter.open`
+    memory maps the file so lookups only page in the bytes they touch, and processes opening the same file read only
+    share one copy in the OS page cache.
 """
 
+import math
+import mmap
+import numbers
+import struct
+from hashlib import blake2b
+
+MASK_64 = (1 << 64) - 1
+
+# 2: items are encoded with a type tag
+VERSION = 2
+HEADER = struct.Struct('<4sIQIQQ')
+HEADER_SIZE = 64
+
+
+def to_bytes(item):
+    """
+    Canonical encoding of item so equal items hash the same (in any process).
+
+    Each encoding starts with a type tag byte so e.g. 1, '1' and b'1' don't collide. Numbers that equal an int (bools,
+    integral floats, ...) are encoded as that int and other numbers by their hash (numerically equal numbers hash the
+    same and numeric hashes don't depend on the process). Tuples and frozensets are encoded from their elements.
+    Anything else falls back to its hash, which is only stable across processes if the type's hash is.
+    """
+
+    if isinstance(item, (bytes, bytearray, memoryview)):
+        return b'b' + bytes(item)
+    if isinstance(item, str):
+        return b's' + item.encode('utf-8', 'surrogatepass')
+    if item is None:
+        return b'n'
+
+    if isinstance(item, tuple):
+        return b't' + join_encoded(to_bytes(x) for x in item)
+    if isinstance(item, frozenset):
+        return b'z' + join_encoded(sorted(to_bytes(x) for x in item))
+
+    if isinstance(item, numbers.Number):
+        if isinstance(item, complex) and not item.imag:
+            item = item.real
+        try:
+            if int(item) == item:
+                return b'i' + str(int(item)).encode()
+        except (TypeError, ValueError, OverflowError):
+            pass
+        return b'x' + hash(item).to_bytes(8, 'little', signed=True)
+
+    return b'h' + hash(item).to_bytes(8, 'little', signed=True)
+
+
+def join_encoded(encodings):
+    """Length prefix each encoding so different sequences can't join to the same bytes."""
+
+    return b''.join(len(enc).to_bytes(8, 'little') + enc for enc in encodings)
+
 
 class BloomFilter(object):
 
-    def __init__(self, num_hashes=5, size=30):
+    magic = b'BLMF'
+
+    def __init__(self, num_hashes=5, size=30, seed=0):
 
         assert num_hashes >= 1
 
         self.num_hashes = num_hashes
         self.size = size
+        self.seed = seed
+
+        # number of adds (upper bound on number of distinct members)
+        self.count = 0
+
+        self.array = bytearray(self.num_bytes(size))
+
+        # set when backed by memory mapped file
+        self.file = None
+        self.mmap = None
+
+    @classmethod
+    def for_capacity(cls, n, fp_rate, seed=0):
+        """Create filter sized to hold n members with false positive rate fp_rate."""
 
-        self.array = [0] * size
+        if n <= 0 or not 0 < fp_rate < 1:
+            raise ValueError('need n > 0 and 0 < fp_rate < 1')
+
+        size = math.ceil(-n * math.log(fp_rate) / math.log(2) ** 2)
+        num_hashes = max(1, round(size / n * math.log(2)))
+
+        return cls(num_hashes, size, seed)
 
     def __contains__(self, item):
 
         # no false negatives but can have false positives
 
+        array = self.array
+
         for i in self.calculate_indices(item):
-            if not self.array[i]:
+            if not array[i >> 3] >> (i & 7) & 1:
                 return False
 
         return True
 
-    def calculate_indices(self, item):
+    def __len__(self):
+        return self.count
+
+    @staticmethod
+    def num_bytes(size):
+        return (size + 7) // 8
+
+    @staticmethod
+    def hash(item, seed):
+
+        digest = blake2b(to_bytes(item), digest_size=16, salt=seed.to_bytes(16, 'little')).digest()
 
-        h = hash(item)
+        return int.from_bytes(digest, 'little')
 
-        for _ in range(self.num_hashes - 1):
-            # hash of (small) int is the same int, so convert them to strings
-            h = hash(str(h))
-            yield h % self.size
+    def calculate_indices(self, item, h=None):
+
+        if h is None:
+            h = self.hash(item, self.seed)
+
+        size = self.size
+        h1, h2 = (h & MASK_64) % size, (h >> 64) % size
+
+        # enhanced double hashing -- h2 changes each step so indices don't cycle when h2 shares factors with size
+        indices = []
+        for i in range(self.num_hashes):
+            indices.append(h1)
+            h1 = (h1 + h2) % size
+            h2 = (h2 + i + 1) % size
+
+        return indices
 
     def add(self, item):
 
+        array = self.array
+
         for i in self.calculate_indices(item):
-            self.array[i] = 1
+            array[i >> 3] |= 1 << (i & 7)
+
+        self.count += 1
+
+    def add_many(self, iterable):
+
+        array = self.array
+        calculate_indices = self.calculate_indices
+
+        n = 0
+        for x in iterable:
+            for i in calculate_indices(x):
+                array[i >> 3] |= 1 << (i & 7)
+            n += 1
+
+        self.count += n
 
     def update(self, iterable):
 
+        self.add_many(iterable)
+
+    def estimated_fp_rate(self):
+        """False positive rate given the fraction of bits currently set."""
+
+        bits_set = int.from_bytes(self.array, 'little').bit_count()
+
+        return (bits_set / self.size) ** self.num_hashes
+
+    def contains_many(self, iterable):
+
+        array = self.array
+        calculate_indices = self.calculate_indices
+
+        return [all(array[i >> 3] >> (i & 7) & 1 for i in calculate_indices(x)) for x in iterable]
+
+    def check_compatible(self, other):
+
+        if (self.size, self.num_hashes, self.seed) != (other.size, other.num_hashes, other.seed):
+            raise ValueError('filters need same size, number hashes and seed')
+
+    def combine(self, other, bits, count):
+
+        self.check_compatible(other)
+
+        res = type(self)(self.num_hashes, self.size, self.seed)
+        res.array[:] = bits.to_bytes(len(self.array), 'little')
+        res.count = count
+
+        return res
+
+    def union(self, other):
+        """Filter containing members of either filter (same as filter built from both sets)."""
+
+        bits = int.from_bytes(self.array, 'little') | int.from_bytes(other.array, 'little')
+
+        return self.combine(other, bits, self.count + other.count)
+
+    def intersection(self, other):
+        """Filter containing members of both filters (may have higher false positive rate than one built directly)."""
+
+        bits = int.from_bytes(self.array, 'little') & int.from_bytes(other.array, 'little')
+
+        return self.combine(other, bits, min(self.count, other.count))
+
+    __or__ = union
+    __and__ = intersection
+
+    def header(self):
+
+        return HEADER.pack(self.magic, VERSION, self.size, self.num_hashes, self.seed, self.count).ljust(HEADER_SIZE, b'\0')
+
+    def save(self, path):
+
+        with open(path, 'wb') as f:
+            f.write(self.header())
+            f.write(self.array)
+
+    @classmethod
+    def read_header(cls, f):
+
+        magic, version, size, num_hashes, seed, count = HEADER.unpack(f.read(HEADER_SIZE)[:HEADER.size])
+
+        if magic != cls.magic or version != VERSION:
+            raise ValueError('not a bloom filter file (or unsupported version)')
+
+        return size, num_hashes, seed, count
+
+    @classmethod
+    def load(cls, path):
+        """Read filter from file into memory."""
+
+        with open(path, 'rb') as f:
+            size, num_hashes, seed, count = cls.read_header(f)
+
+            bf = cls(num_hashes, size, seed)
+            bf.count = count
+
+            if f.readinto(bf.array) != len(bf.array):
+                raise ValueError('truncated bloom filter file')
+
+        return bf
+
+    @classmethod
+    def open(cls, path, writable=False):
+        """
+        Memory map filter from file without reading it into memory.
+
+        With writable=True adds are written through to the file (count is written on flush/close).
+        """
+
+        f = open(path, 'r+b' if writable else 'rb')
+
+        try:
+            size, num_hashes, seed, count = cls.read_header(f)
+
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        except Exception:
+            f.close()
+            raise
+
+        bf = cls.__new__(cls)
+        bf.num_hashes = num_hashes
+        bf.size = size
+        bf.seed = seed
+        bf.count = count
+
+        bf.file = f
+        bf.mmap = mm
+        bf.array = memoryview(mm)[HEADER_SIZE: HEADER_SIZE + cls.num_bytes(size)]
+
+        if len(bf.array) != cls.num_bytes(size):
+            bf.close()
+            raise ValueError('truncated bloom filter file')
+
+        return bf
+
+    def flush(self):
+
+        if self.mmap is not None and not self.array.readonly:
+            self.mmap[:HEADER_SIZE] = self.header()
+            self.mmap.flush()
+
+    def close(self):
+
+        if self.mmap is None:
+            return
+
+        self.flush()
+
+        # memoryview must be released before the map can be closed
+        self.array.release()
+        self.mmap.close()
+        self.file.close()
+
+        self.array = self.mmap = self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+# number of nonzero 4 bit counters in each byte
+NONZERO_NIBBLES = bytes(bool(b & 15) + bool(b >> 4) for b in range(256))
+
+# byte with each of the two 4 bit counters of bytes a, b summed (saturating at 15) / the smaller one at index a << 8 | b
+SUM_NIBBLE_PAIRS = bytes(min(15, (a & 15) + (b & 15)) | min(15, (a >> 4) + (b >> 4)) << 4
+                         for a in range(256) for b in range(256))
+MIN_NIBBLE_PAIRS = bytes(min(a & 15, b & 15) | min(a >> 4, b >> 4) << 4 for a in range(256) for b in range(256))
+
+# both 4 bit counters of each byte halved
+HALVED_NIBBLES = bytes((b & 15) >> 1 | (b >> 5) << 4 for b in range(256))
+
+
+class CountingBloomFilter(BloomFilter):
+    """
+    Bloom filter with a 4 bit counter (two per byte) instead of a bit so members can be removed.
+
+    Counters saturate at 15 and are then never decremented (so removes can't cause false negatives).
+    """
+
+    magic = b'BLMC'
+
+    @staticmethod
+    def num_bytes(size):
+        return (size + 1) // 2
+
+    def __contains__(self, item):
+
+        array = self.array
+
+        for i in self.calculate_indices(item):
+            if not array[i >> 1] >> ((i & 1) << 2) & 15:
+                return False
+
+        return True
+
+    def add(self, item):
+
+        array = self.array
+
+        for i in self.calculate_indices(item):
+            shift = (i & 1) << 2
+            if array[i >> 1] >> shift & 15 != 15:
+                array[i >> 1] += 1 << shift
+
+        self.count += 1
+
+    def add_many(self, iterable):
+
         for x in iterable:
             self.add(x)
 
+    def remove(self, item):
+
+        if item not in self:
+            raise KeyError(item)
+
+        array = self.array
+
+        for i in self.calculate_indices(item):
+            shift = (i & 1) << 2
+            if array[i >> 1] >> shift & 15 != 15:
+                array[i >> 1] -= 1 << shift
+
+        self.count -= 1
+
+    def contains_many(self, iterable):
+
+        return [x in self for x in iterable]
+
+    def estimate(self, item):
+        """Upper bound on number of times item was added (smallest of its counters, at most 15)."""
+
+        array = self.array
+
+        return min(array[i >> 1] >> ((i & 1) << 2) & 15 for i in self.calculate_indices(item))
+
+    def halve(self):
+        """Halve all counters (ages counts so estimates follow recent adds)."""
+
+        # (bytes() since a memory mapped filter's array is a memoryview -- slice assignment writes through to it)
+        self.array[:] = bytes(self.array).translate(HALVED_NIBBLES)
+        self.count //= 2
+
+    def estimated_fp_rate(self):
+
+        # (bytes() since a memory mapped filter's array is a memoryview)
+        nonzero = sum(bytes(self.array).translate(NONZERO_NIBBLES))
+
+        return (nonzero / self.size) ** self.num_hashes
+
+    def combine_counters(self, other, table, count):
+        """Filter whose byte i is table[(self byte i) << 8 | (other byte i)]."""
+
+        self.check_compatible(other)
+
+        res = type(self)(self.num_hashes, self.size, self.seed)
+        res.array[:] = bytes(table[a << 8 | b] for a, b in zip(self.array, other.array))
+        res.count = count
+
+        return res
+
+    def union(self, other):
+        """Filter with counters summed (saturating at 15) -- same as filter built from the adds of both."""
+
+        return self.combine_counters(other, SUM_NIBBLE_PAIRS, self.count + other.count)
+
+    def intersection(self, other):
+        """Filter with smaller of each pair of counters (may have higher false positive rate than one built directly)."""
+
+        return self.combine_counters(other, MIN_NIBBLE_PAIRS, min(self.count, other.count))
+
+    __or__ = union
+    __and__ = intersection
+
+
+class ScalableBloomFilter(object):
+    """
+    Bloom filter that keeps its false positive rate by adding larger filters (slices) as it fills up.
+
+    Slice i holds initial_capacity * growth ** i members with false positive rate fp_rate * (1 - tightening) *
+    tightening ** i so the compound rate sum_i(fp_i) stays below fp_rate however many slices are added.
+    """
+
+    def __init__(self, initial_capacity=1000, fp_rate=0.01, growth=2, tightening=0.85, seed=0):
+
+        self.initial_capacity = initial_capacity
+        self.fp_rate = fp_rate
+        self.growth = growth
+        self.tightening = tightening
+        self.seed = seed
+
+        self.slices = []
+        self.capacities = []
+
+        self.add_slice()
+
+    def add_slice(self):
+
+        i = len(self.slices)
+
+        capacity = self.initial_capacity * self.growth ** i
+        fp_rate = self.fp_rate * (1 - self.tightening) * self.tightening ** i
+
+        self.slices.append(BloomFilter.for_capacity(capacity, fp_rate, self.seed))
+        self.capacities.append(capacity)
+
+    def __len__(self):
+        return sum(len(bf) for bf in self.slices)
+
+    def __contains__(self, item):
+
+        # slices share seed so digest only computed once
+        h = BloomFilter.hash(item, self.seed)
+
+        for bf in reversed(self.slices):
+            array = bf.array
+            if all(array[i >> 3] >> (i & 7) & 1 for i in bf.calculate_indices(item, h)):
+                return True
+
+        return False
+
+    def add(self, item):
+
+        # members already (probably) present don't use up capacity
+        if item in self:
+            return
+
+        if self.slices[-1].count >= self.capacities[-1]:
+            self.add_slice()
+
+        self.slices[-1].add(item)
+
+    def update(self, iterable):
+
+        for x in iterable:
+            self.add(x)
+
+    def estimated_fp_rate(self):
+
+        p = 1
+        for bf in self.slices:
+            p *= 1 - bf.estimated_fp_rate()
+
+        return 1 - p
+
 
 if __name__ == '__main__':
 
@@ -81,3 +542,49 @@ if __name__ == '__main__':
         s += str(i) in bf
 
     print('False positive rate: {}'.format(s / n))
+
+    bf1 = BloomFilter.for_capacity(10000, 0.01)
+    bf2 = BloomFilter.for_capacity(10000, 0.01)
+    bf1.add_many(range(5000))
+    bf2.add_many(range(5000, 10000))
+
+    bf = bf1 | bf2
+    assert all(bf.contains_many(range(10000)))
+
+    bf.add(('edge', 1))
+    assert ('edge', 1.0) in bf and 1 in bf and '1' not in bf and b'1' not in bf
+
+    s = sum(bf.contains_many(range(10000, 10000 + n)))
+    print('False positive rate (target 0.01): {} using {} bytes'.format(s / n, len(bf.array)))
+
+    import os
+    import tempfile
+
+    path = os.path.join(tempfile.mkdtemp(), 'filter.bf')
+    bf.save(path)
+
+    with BloomFilter.open(path, writable=True) as bf_mapped:
+        assert all(bf_mapped.contains_many(range(10000)))
+        bf_mapped.add('persisted')
+
+    with BloomFilter.open(path) as bf_mapped:
+        assert 'persisted' in bf_mapped and len(bf_mapped) == len(bf) + 1
+
+    assert 'persisted' in BloomFilter.load(path)
+
+    sbf = ScalableBloomFilter(initial_capacity=1000, fp_rate=0.01)
+    sbf.update(range(100000))
+    assert all(x in sbf for x in range(100000))
+
+    s = sum(x in sbf for x in range(100000, 100000 + n))
+    print('Scalable false positive rate: {} (estimated {:.4f}, {} slices)'.format(
+        s / n, sbf.estimated_fp_rate(), len(sbf.slices)))
+
+    cbf = CountingBloomFilter.for_capacity(1000, 0.01)
+    cbf.update(range(1000))
+    for x in range(500):
+        cbf.remove(x)
+
+    assert all(x in cbf for x in range(500, 1000))
+    s = sum(x in cbf for x in range(500))
+    print('Counting false positive rate after removes: {} (estimated {:.4f})'.format(s / 500, cbf.estimated_fp_rate()))
@@ -0,0 +1,483 @@
+"""
+In-process key/value caches with bounded size and different eviction policies.
+
+Summary:
+
+    Each cache is a HashMap from key to a linked list node holding the entry, so finding an entry, reordering it and
+    evicting are all O(1). Limits are a number of entries and/or a total size in bytes (sys.getsizeof of values by
+    default). Entries can also expire after a time to live; expired entries are dropped when they are next accessed or
+    reach the eviction end of the cache.
+
+    * LRUCache: entries in one DoublyLinkedList from least to most recently used. A hit moves the node to the end and
+      the least recently used entry is evicted.
+    * LFUCache: entries grouped into buckets by number of uses (a DoublyLinkedList of buckets in increasing use count,
+      each with a DoublyLinkedList of its entries). A hit moves an entry into the next bucket (creating it if needed)
+      and the least recently used entry of the least used bucket is evicted -- all O(1).
+    * TinyLFUCache: LRU eviction but a new key is only admitted when the cache is full if it has been requested more
+      often than the entry it would evict. Request counts of all keys (including ones not in the cache) are kept
+      approximately in a CountingBloomFilter with 4 bit counters, which is halved every sample_size requests so counts
+      follow recent popularity. This keeps one-off keys (e.g. scans) from pushing out popular entries.
+
+    All caches count hits, misses, evictions, expirations and rejected admissions. `memoize` caches a function's
+    results in one of them.
+
+Characteristics:
+
+    Get/put/delete:
+        Worst Time: O(1) amortized
+"""
+
+import sys
+import time
+from functools import wraps
+
+from data_structures.bloom_filter import CountingBloomFilter
+from data_structures.hash_map import HashMap
+from data_structures.linked_list import DoublyLinkedList
+
+MISSING = object()
+
+# separates positional from keyword arguments in memoize keys
+KWARGS_MARK = object()
+
+
+class Entry(object):
+
+    __slots__ = ('key', 'value', 'size', 'expires', 'bucket')
+
+    def __init__(self, key, value, size, expires):
+
+        self.key = key
+        self.value = value
+        self.size = size
+        # clock time after which entry is stale (None for never)
+        self.expires = expires
+
+        # LFU bucket node holding entry
+        self.bucket = None
+
+
+class Cache(object):
+    """
+    Shared logic for caches. Subclasses say how entries are ordered with:
+
+    * link(entry) -> node for a new entry
+    * touch(node) on a hit
+    * unlink(node) when an entry is removed
+    * victim() -> node of next entry to evict
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, ttl=None, sizeof=sys.getsizeof, clock=time.monotonic):
+
+        if max_entries is None and max_bytes is None:
+            raise ValueError('need max_entries and/or max_bytes')
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self.clock = clock
+
+        self.map = HashMap()
+        self.bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejections = 0
+
+    def __len__(self):
+        return len(self.map)
+
+    def stats(self):
+
+        requests = self.hits + self.misses
+
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / requests if requests else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'rejections': self.rejections,
+            'entries': len(self.map),
+            'bytes': self.bytes,
+        }
+
+    def expired(self, entry):
+        return entry.expires is not None and entry.expires <= self.clock()
+
+    def record(self, key):
+        """Called with the key of every get."""
+
+    def admit(self, key):
+        """Whether to add new key when the cache is full."""
+
+        return True
+
+    def full(self, extra_entries=0, extra_bytes=0):
+
+        if self.max_entries is not None and len(self.map) + extra_entries > self.max_entries:
+            return True
+
+        return self.max_bytes is not None and self.bytes + extra_bytes > self.max_bytes
+
+    def get(self, key, default=None):
+
+        self.record(key)
+
+        node = self.map.get(key)
+
+        if node is not None:
+            if not self.expired(node.val):
+                self.hits += 1
+                self.touch(node)
+                return node.val.value
+
+            self.remove(node)
+            self.expirations += 1
+
+        self.misses += 1
+
+        return default
+
+    def __getitem__(self, key):
+
+        value = self.get(key, MISSING)
+
+        if value is MISSING:
+            raise KeyError(key)
+
+        return value
+
+    def __contains__(self, key):
+        """Whether key has a fresh entry (doesn't count as a request)."""
+
+        node = self.map.get(key)
+
+        return node is not None and not self.expired(node.val)
+
+    def put(self, key, value, ttl=None):
+
+        ttl = self.ttl if ttl is None else ttl
+        expires = None if ttl is None else self.clock() + ttl
+        size = self.sizeof(value) if self.max_bytes is not None else 0
+
+        if self.max_bytes is not None and size > self.max_bytes:
+            self.rejections += 1
+            return
+
+        node = self.map.get(key)
+
+        if node is not None:
+            entry = node.val
+            self.bytes += size - entry.size
+            entry.value, entry.size, entry.expires = value, size, expires
+            self.touch(node)
+            self.make_room()
+            return
+
+        if self.full(1, size) and not self.admit(key):
+            self.rejections += 1
+            return
+
+        # evict before linking so the new entry can't be its own victim
+        self.make_room(1, size)
+
+        self.map[key] = self.link(Entry(key, value, size, expires))
+        self.bytes += size
+
+    def make_room(self, extra_entries=0, extra_bytes=0):
+
+        while len(self.map) and self.full(extra_entries, extra_bytes):
+            victim = self.victim()
+
+            if self.expired(victim.val):
+                self.expirations += 1
+            else:
+                self.evictions += 1
+
+            self.remove(victim)
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    def remove(self, node):
+
+        entry = node.val
+
+        del self.map[entry.key]
+        self.unlink(node)
+
+        self.bytes -= entry.size
+
+    def pop(self, key, *default):
+
+        node = self.map.get(key)
+
+        if node is None:
+            if default:
+                return default[0]
+            raise KeyError(key)
+
+        self.remove(node)
+
+        return node.val.value
+
+    def __delitem__(self, key):
+        self.pop(key)
+
+    def expire(self):
+        """Drop all expired entries."""
+
+        now = self.clock()
+
+        for node in [node for node in self.map.values() if node.val.expires is not None and node.val.expires <= now]:
+            self.remove(node)
+            self.expirations += 1
+
+
+class LRUCache(Cache):
+
+    def __init__(self, max_entries=None, max_bytes=None, ttl=None, sizeof=sys.getsizeof, clock=time.monotonic):
+
+        super().__init__(max_entries, max_bytes, ttl, sizeof, clock)
+
+        # least recently used first
+        self.order = DoublyLinkedList()
+
+    def link(self, entry):
+        return self.order.append_right(entry)
+
+    def touch(self, node):
+        self.order.move_to_end(node)
+
+    def unlink(self, node):
+        self.order.unlink(node)
+
+    def victim(self):
+        return self.order.head
+
+
+class Bucket(object):
+
+    __slots__ = ('count', 'entries')
+
+    def __init__(self, count):
+
+        self.count = count
+        # least recently used first
+        self.entries = DoublyLinkedList()
+
+
+class LFUCache(Cache):
+
+    def __init__(self, max_entries=None, max_bytes=None, ttl=None, sizeof=sys.getsizeof, clock=time.monotonic):
+
+        super().__init__(max_entries, max_bytes, ttl, sizeof, clock)
+
+        # buckets in increasing use count
+        self.buckets = DoublyLinkedList()
+
+    def link(self, entry):
+
+        first = self.buckets.head
+
+        if first is None or first.val.count != 1:
+            first = self.buckets.append_left(Bucket(1))
+
+        entry.bucket = first
+
+        return first.val.entries.append_right(entry)
+
+    def touch(self, node):
+
+        entry = node.val
+        bucket_node = entry.bucket
+        bucket = bucket_node.val
+
+        nxt = bucket_node.next
+        if nxt is None or nxt.val.count != bucket.count + 1:
+            nxt = self.buckets.insert_after(bucket_node, Bucket(bucket.count + 1))
+
+        # move node between bucket lists
+        bucket.entries.unlink(node)
+        nxt.val.entries.link_after(node, nxt.val.entries.last)
+        entry.bucket = nxt
+
+        if not bucket.entries.n:
+            self.buckets.unlink(bucket_node)
+
+    def unlink(self, node):
+
+        bucket_node = node.val.bucket
+        entries = bucket_node.val.entries
+
+        entries.unlink(node)
+
+        if not entries.n:
+            self.buckets.unlink(bucket_node)
+
+    def victim(self):
+        return self.buckets.head.val.entries.head
+
+
+class TinyLFUCache(LRUCache):
+
+    def __init__(self, max_entries=None, max_bytes=None, ttl=None, sizeof=sys.getsizeof, clock=time.monotonic,
+                 sketch_size=None, sample_size=None):
+
+        super().__init__(max_entries, max_bytes, ttl, sizeof, clock)
+
+        capacity = max_entries if max_entries is not None else 1024
+
+        # counts of all recently requested keys share the counters so it needs many more than capacity
+        self.sketch = CountingBloomFilter(num_hashes=4, size=sketch_size or max(64, 16 * capacity))
+        self.sample_size = sample_size or 10 * capacity
+        self.requests = 0
+
+    def record(self, key):
+
+        # (sketch only takes bytes/str/numbers -- hash() is consistent with == for any hashable key in this process)
+        self.sketch.add(hash(key))
+        self.requests += 1
+
+        if self.requests >= self.sample_size:
+            self.sketch.halve()
+            self.requests //= 2
+
+    def admit(self, key):
+
+        victim = self.victim()
+
+        if victim is None or self.expired(victim.val):
+            return True
+
+        return self.sketch.estimate(hash(key)) > self.sketch.estimate(hash(victim.val.key))
+
+
+def memoize(cache=None):
+    """
+    Decorator caching results of a function by its arguments (which must be hashable).
+
+    The cache (LRUCache with 128 entries by default) is available as the `cache` attribute of the wrapped function.
+    """
+
+    if cache is None:
+        cache = LRUCache(max_entries=128)
+
+    def decorator(func):
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+
+            # marker keeps f(1, b=2) and f((1,), (('b', 2),)) apart
+            key = args + (KWARGS_MARK,) + tuple(sorted(kwargs.items())) if kwargs else args
+
+            res = cache.get(key, MISSING)
+
+            if res is MISSING:
+                res = func(*args, **kwargs)
+                cache.put(key, res)
+
+            return res
+
+        wrapper.cache = cache
+
+        return wrapper
+
+    return decorator
+
+
+def zipf_trace(num_keys, num_requests, alpha=0.9, seed=0):
+    """Requests for keys 0..num_keys-1 where key i is requested with probability proportional to 1 / (i + 1) ** alpha."""
+
+    import random
+    from itertools import accumulate
+
+    rng = random.Random(seed)
+    cum_weights = list(accumulate(1 / (i + 1) ** alpha for i in range(num_keys)))
+
+    keys = list(range(num_keys))
+    # popular keys shouldn't also be neighbors
+    rng.shuffle(keys)
+
+    # (str keys since small int keys hash to themselves and runs of them make long HashMap clusters)
+    return ['k{}'.format(k) for k in rng.choices(keys, cum_weights=cum_weights, k=num_requests)]
+
+
+def scan_trace(num_keys, num_requests, scan_every=10000, scan_length=5000, seed=0):
+    """Zipf requests interrupted by scans over keys that are requested once."""
+
+    trace = zipf_trace(num_keys, num_requests, seed=seed)
+    res = []
+    next_scan_key = num_keys
+
+    for i in range(0, len(trace), scan_every):
+        res.extend(trace[i: i + scan_every])
+        res.extend('k{}'.format(k) for k in range(next_scan_key, next_scan_key + scan_length))
+        next_scan_key += scan_length
+
+    return res
+
+
+def replay(cache, trace):
+    """Get each key of trace, putting it on a miss. Get (hit ratio, requests per second)."""
+
+    get, put = cache.get, cache.put
+
+    t0 = time.perf_counter()
+
+    for key in trace:
+        if get(key, MISSING) is MISSING:
+            put(key, key)
+
+    elapsed = time.perf_counter() - t0
+
+    return cache.stats()['hit_ratio'], len(trace) / elapsed
+
+
+if __name__ == '__main__':
+
+    t = [0]
+    c = LRUCache(max_entries=2, ttl=10, clock=lambda: t[0])
+    c['a'] = 1
+    c['b'] = 2
+    c.get('a')
+    c['c'] = 3
+    assert 'b' not in c and c['a'] == 1
+    t[0] = 11
+    assert c.get('a') is None
+    print(c.stats())
+
+    c = LFUCache(max_entries=2)
+    c['a'] = 1
+    c['b'] = 2
+    c.get('a')
+    c.get('a')
+    c.get('b')
+    c['c'] = 3
+    assert 'b' not in c and 'a' in c and 'c' in c
+
+    c = LRUCache(max_bytes=1000, sizeof=len)
+    for i in range(20):
+        c[i] = 'x' * 100
+    assert len(c) == 10 and c.bytes == 1000
+
+    @memoize()
+    def fib(n):
+        return n if n < 2 else fib(n - 1) + fib(n - 2)
+
+    print(fib(200), fib.cache.stats()['hits'])
+
+    traces = [
+        ('zipf', zipf_trace(100000, 300000)),
+        ('zipf + scans', scan_trace(100000, 300000)),
+    ]
+
+    for name, trace in traces:
+        print(name)
+        for cls in [LRUCache, LFUCache, TinyLFUCache]:
+            hit_ratio, rate = replay(cls(max_entries=2000), trace)
+            print('    {:14s} hit ratio {:.3f}  {:.0f} requests/s'.format(cls.__name__, hit_ratio, rate))
@@ -0,0 +1,370 @@
+"""
+List stored as a sequence of bounded chunks (a flat rope) for random edits on large lists.
+
+Summary:
+
+    Values are split into chunks of between chunk_size / 2 and 2 * chunk_size values. An edit only shifts values within
+    one chunk. Chunks that grow too large are split and ones that shrink too small are merged with a neighbor.
+
+    To find the chunk holding an index a Fenwick (binary indexed) tree of chunk lengths is kept. It finds the chunk and
+    offset in O(log c) and is updated in O(log c) when a chunk length changes. It is rebuilt in O(c) when chunks are
+    split or merged (once every ~chunk_size edits).
+
+Characteristics:
+
+    * n number elements
+    * b chunk size
+    * c number chunks (~n / b)
+
+    Index:
+        Worst Time: O(log c)
+    Insert/delete:
+        Worst Time: O(b + log c) amortized
+    Insert/delete k elements at once:
+        Worst Time: O(b + k + c)
+
+    Has the same interface as ArrayList (including slices and `dtype` for unboxed values) except `as_memoryview` since
+    values aren't contiguous.
+"""
+
+from array import array
+from itertools import chain
+
+from data_structures.array_list import EmptyListException
+
+
+class ChunkedList(object):
+
+    def __init__(self, capacity=10, min_capacity=10, dtype=None, chunk_size=512):
+        """capacity and min_capacity are accepted for compatibility with ArrayList (storage grows by chunks)."""
+
+        self.min_capacity = min_capacity
+        self.chunk_size = chunk_size
+        self.dtype = dtype
+
+        self.chunks = [self.new_chunk()]
+        self.size = 0
+
+        self.build_index()
+
+    def new_chunk(self, values=()):
+
+        if self.dtype is None:
+            return list(values)
+
+        return array(self.dtype, values)
+
+    def __len__(self):
+        return self.size
+
+    def __str__(self):
+
+        return str(list(self))
+
+    def __iter__(self):
+
+        return chain.from_iterable(self.chunks)
+
+    def build_index(self):
+
+        # fenwick tree (1 indexed) -- tree[i] is sum of lengths of chunks (i - lowbit(i), i]
+        tree = [0] + [len(chunk) for chunk in self.chunks]
+
+        for i in range(1, len(tree)):
+            j = i + (i & -i)
+            if j < len(tree):
+                tree[j] += tree[i]
+
+        self.tree = tree
+
+    def index_add(self, chunk_idx, delta):
+
+        tree = self.tree
+        i = chunk_idx + 1
+
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def locate(self, idx):
+        """Get (chunk index, offset in chunk) for element idx."""
+
+        tree = self.tree
+        n = len(tree) - 1
+
+        pos = 0
+        step = 1 << n.bit_length()
+
+        # largest pos with prefix sum <= idx
+        while step:
+            if pos + step <= n and tree[pos + step] <= idx:
+                pos += step
+                idx -= tree[pos]
+            step >>= 1
+
+        return pos, idx
+
+    def normalize_idx(self, idx):
+
+        if not isinstance(idx, int):
+            raise TypeError
+
+        if idx < -self.size or idx >= self.size:
+            raise IndexError
+
+        return idx % self.size
+
+    def values(self, start, stop):
+        """Chunk type (list or array) with elements [start, stop)."""
+
+        res = self.new_chunk()
+
+        if start >= stop:
+            return res
+
+        chunk_idx, offset = self.locate(start)
+        n = stop - start
+
+        while n:
+            part = self.chunks[chunk_idx][offset: offset + n]
+            res += part
+            n -= len(part)
+            chunk_idx, offset = chunk_idx + 1, 0
+
+        return res
+
+    def __getitem__(self, idx):
+
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(self.size)
+
+            if step == 1:
+                values = self.values(start, stop)
+            else:
+                values = [self[i] for i in range(start, stop, step)]
+
+            res = type(self)(len(values), self.min_capacity, self.dtype, self.chunk_size)
+            res.extend(values)
+
+            return res
+
+        chunk_idx, offset = self.locate(self.normalize_idx(idx))
+
+        return self.chunks[chunk_idx][offset]
+
+    def __setitem__(self, idx, val):
+
+        if not isinstance(idx, slice):
+            chunk_idx, offset = self.locate(self.normalize_idx(idx))
+            self.chunks[chunk_idx][offset] = val
+            return
+
+        start, stop, step = idx.indices(self.size)
+        values = self.new_chunk(val)
+
+        if step != 1:
+            indices = range(start, stop, step)
+
+            # extended slice must be same length (as with lists)
+            if len(indices) != len(values):
+                raise ValueError('attempt to assign sequence of size {} to extended slice of size {}'.format(
+                    len(values), len(indices)))
+
+            for i, v in zip(indices, values):
+                chunk_idx, offset = self.locate(i)
+                self.chunks[chunk_idx][offset] = v
+            return
+
+        self.delete_range(start, max(start, stop))
+        self.insert_many(start, values)
+
+    def __delitem__(self, idx):
+
+        if not isinstance(idx, slice):
+            self.pop(idx)
+            return
+
+        start, stop, step = idx.indices(self.size)
+
+        if step == 1:
+            self.delete_range(start, stop)
+            return
+
+        # extended slice so rebuild keeping other elements
+        removed = set(range(start, stop, step))
+        kept = self.new_chunk(v for i, v in enumerate(self) if i not in removed)
+
+        self.delete_range(0, self.size)
+        self.extend(kept)
+
+    def replace_chunks(self, lo, hi, values):
+        """Replace chunks[lo: hi] with values split into chunks of valid size (taking in a neighbor if too few)."""
+
+        if len(values) < self.chunk_size // 2:
+            if hi < len(self.chunks):
+                values = values + self.chunks[hi]
+                hi += 1
+            elif lo > 0:
+                lo -= 1
+                values = self.chunks[lo] + values
+
+        # equal parts of at most chunk_size (so at least chunk_size / 2)
+        n = len(values)
+        m = -(-n // self.chunk_size)
+        bounds = [n * i // m for i in range(m + 1)] if m else [0]
+
+        self.chunks[lo: hi] = [values[a: b] for a, b in zip(bounds, bounds[1:])]
+
+        if not self.chunks:
+            self.chunks.append(self.new_chunk())
+
+        self.build_index()
+
+    def insert_many(self, idx, iterable):
+
+        if idx < -self.size or idx > self.size:
+            raise IndexError
+
+        if idx < 0:
+            idx %= self.size
+
+        values = self.new_chunk(iterable)
+
+        if idx == self.size:
+            chunk_idx = len(self.chunks) - 1
+            offset = len(self.chunks[chunk_idx])
+        else:
+            chunk_idx, offset = self.locate(idx)
+
+        chunk = self.chunks[chunk_idx]
+        chunk[offset: offset] = values
+
+        self.size += len(values)
+
+        if len(chunk) > 2 * self.chunk_size:
+            self.replace_chunks(chunk_idx, chunk_idx + 1, chunk)
+        else:
+            self.index_add(chunk_idx, len(values))
+
+    def delete_range(self, start, stop):
+
+        start, stop, _ = slice(start, stop).indices(self.size)
+
+        if start >= stop:
+            return
+
+        lo, offset_lo = self.locate(start)
+        hi, offset_hi = self.locate(stop - 1)
+
+        # what is left of first and last chunks touched
+        values = self.chunks[lo][:offset_lo] + self.chunks[hi][offset_hi + 1:]
+
+        self.size -= stop - start
+
+        self.replace_chunks(lo, hi + 1, values)
+
+    def insert(self, idx, val):
+
+        if idx < -self.size or idx > self.size:
+            raise IndexError
+
+        if idx < 0:
+            idx %= self.size
+
+        if idx == self.size:
+            chunk_idx = len(self.chunks) - 1
+            offset = len(self.chunks[chunk_idx])
+        else:
+            chunk_idx, offset = self.locate(idx)
+
+        chunk = self.chunks[chunk_idx]
+        chunk.insert(offset, val)
+
+        self.size += 1
+
+        if len(chunk) > 2 * self.chunk_size:
+            half = len(chunk) // 2
+            self.chunks[chunk_idx: chunk_idx + 1] = [chunk[:half], chunk[half:]]
+            self.build_index()
+        else:
+            self.index_add(chunk_idx, 1)
+
+    def append(self, val):
+
+        self.insert(self.size, val)
+
+    def extend(self, iterable):
+
+        values = self.new_chunk(iterable)
+
+        last = self.chunks[-1]
+        n_fill = max(0, self.chunk_size - len(last))
+
+        last.extend(values[:n_fill])
+        self.chunks.extend(values[i: i + self.chunk_size] for i in range(n_fill, len(values), self.chunk_size))
+
+        self.size += len(values)
+
+        self.build_index()
+
+    def pop(self, idx=-1):
+
+        if self.size == 0:
+            raise EmptyListException
+
+        chunk_idx, offset = self.locate(self.normalize_idx(idx))
+
+        chunk = self.chunks[chunk_idx]
+        val = chunk.pop(offset)
+
+        self.size -= 1
+
+        if len(chunk) < self.chunk_size // 2 and len(self.chunks) > 1:
+            # merge with neighbor (splitting again if that makes it too big)
+            if chunk_idx == len(self.chunks) - 1:
+                chunk_idx -= 1
+
+            merged = self.chunks[chunk_idx] + self.chunks[chunk_idx + 1]
+
+            if len(merged) > 2 * self.chunk_size:
+                half = len(merged) // 2
+                self.chunks[chunk_idx: chunk_idx + 2] = [merged[:half], merged[half:]]
+            else:
+                self.chunks[chunk_idx: chunk_idx + 2] = [merged]
+
+            self.build_index()
+        else:
+            self.index_add(chunk_idx, -1)
+
+        return val
+
+
+if __name__ == '__main__':
+
+    import random
+
+    cl = ChunkedList(chunk_size=4)
+    l = []
+
+    for _ in range(10000):
+        if random.random() < 0.6 or not l:
+            idx = random.randint(-len(l), len(l))
+            cl.insert(idx, idx)
+            l.insert(idx, idx)
+        else:
+            idx = random.randint(-len(l), len(l) - 1)
+            assert cl.pop(idx) == l.pop(idx)
+
+        assert len(cl) == len(l)
+
+    assert list(cl) == l and all(cl[i] == l[i] for i in range(len(l)))
+    print(list(cl)[:10])
+
+    # slices behave like list slices
+    cl[10: 500] = range(20)
+    l[10: 500] = range(20)
+    del cl[::3]
+    del l[::3]
+    cl[::-2] = range(len(l[::-2]))
+    l[::-2] = range(len(l[::-2]))
+    assert list(cl) == l and list(cl[5: 50: 2]) == l[5: 50: 2]
@@ -1,16 +1,22 @@
 """
-FIFO Queue implemented using singly linked list.
+FIFO Queue implemented using singly linked list or a ring buffer.
 
 Summary:
 
     Supports enqueue (to back) and dequeue (from front).
 
+    The ring buffer version stores items in an array used circularly: the front is at index `head` and the back wraps
+    around to the start of the array. No node is allocated per item and batches are moved with at most two slice
+    copies. The array doubles when full (and halves when a quarter full).
+
 Characteristics:
 
     Enqueue:
-        Worst Time: O(1)
+        Worst Time: O(1) -- amortized for ring buffer
     Dequeue:
-        Worst Time: O(1)
+        Worst Time: O(1) -- amortized for ring buffer
+    Enqueue/dequeue k items (ring buffer):
+        Worst Time: O(k) amortized
 """
 
 from data_structures.linked_list import LinkedList
@@ -21,9 +27,17 @@ class FIFOQueue(object):
     def __init__(self):
         self.list = LinkedList()
 
+    def __len__(self):
+        return self.list.n
+
     def enqueue(self, item):
         self.list.append_right(item)
 
+    def enqueue_many(self, items):
+
+        for item in items:
+            self.list.append_right(item)
+
     def dequeue(self):
 
         if not self.list.n:
@@ -31,6 +45,162 @@ class FIFOQueue(object):
 
         return self.list.pop(0)
 
+    def dequeue_many(self, k):
+
+        if k < 0:
+            raise ValueError('k must be >= 0')
+
+        return [self.list.pop(0) for _ in range(min(k, self.list.n))]
+
+    def peek(self):
+
+        if not self.list.n:
+            raise EmptyQueueException
+
+        return self.list.head.val
+
+
+class RingBufferQueue(object):
+
+    def __init__(self, capacity=16, min_capacity=16):
+
+        self.min_capacity = min_capacity
+        self.capacity = max(capacity, 1)
+
+        self.array = [None] * self.capacity
+        self.head = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def __str__(self):
+
+        return str(self.array[self.head: self.head + self.size] +
+                   self.array[:max(0, self.head + self.size - self.capacity)])
+
+    def resize(self, capacity):
+
+        n = self.size
+        items = self.array[self.head: self.head + n] + self.array[:max(0, self.head + n - self.capacity)]
+
+        self.array = items + [None] * (capacity - n)
+        self.capacity = capacity
+        self.head = 0
+
+    def enqueue(self, item):
+
+        if self.size == self.capacity:
+            self.resize(2 * self.capacity)
+
+        self.array[(self.head + self.size) % self.capacity] = item
+        self.size += 1
+
+    def enqueue_many(self, items):
+
+        items = list(items)
+        n = len(items)
+
+        if self.size + n > self.capacity:
+            self.resize(max(2 * self.capacity, self.size + n))
+
+        # copy into [tail, end of array) then wrap around to start
+        tail = (self.head + self.size) % self.capacity
+        n_first = min(n, self.capacity - tail)
+
+        self.array[tail: tail + n_first] = items[:n_first]
+        self.array[:n - n_first] = items[n_first:]
+
+        self.size += n
+
+    def dequeue(self):
+
+        if not self.size:
+            raise EmptyQueueException
+
+        item = self.array[self.head]
+        self.array[self.head] = None
+
+        self.head = (self.head + 1) % self.capacity
+        self.size -= 1
+
+        self.check_shrink()
+
+        return item
+
+    def dequeue_many(self, k):
+
+        if k < 0:
+            raise ValueError('k must be >= 0')
+
+        n = min(k, self.size)
+
+        head = self.head
+        n_first = min(n, self.capacity - head)
+        n_wrapped = n - n_first
+
+        items = self.array[head: head + n_first] + self.array[:n_wrapped]
+
+        # drop references to dequeued items
+        self.array[head: head + n_first] = [None] * n_first
+        self.array[:n_wrapped] = [None] * n_wrapped
+
+        self.head = (head + n) % self.capacity
+        self.size -= n
+
+        self.check_shrink()
+
+        return items
+
+    def peek(self):
+
+        if not self.size:
+            raise EmptyQueueException
+
+        return self.array[self.head]
+
+    def check_shrink(self):
+
+        if self.capacity >= 4 * self.min_capacity and self.size <= self.capacity // 4:
+            self.resize(self.capacity // 2)
+
 
 class EmptyQueueException(Exception):
     pass
+
+
+if __name__ == '__main__':
+
+    import random
+    import time
+    from collections import deque
+
+    q = RingBufferQueue(capacity=2, min_capacity=2)
+    d = deque()
+
+    for _ in range(10000):
+        op = random.randrange(4)
+        if op == 0:
+            q.enqueue(_)
+            d.append(_)
+        elif op == 1:
+            items = list(range(random.randint(0, 10)))
+            q.enqueue_many(items)
+            d.extend(items)
+        elif op == 2 and d:
+            assert q.peek() == d[0] and q.dequeue() == d.popleft()
+        else:
+            k = random.randint(0, 10)
+            assert q.dequeue_many(k) == [d.popleft() for _ in range(min(k, len(d)))]
+
+        assert len(q) == len(d)
+
+    batch = list(range(1000))
+
+    for cls in [FIFOQueue, RingBufferQueue]:
+        q = cls()
+        t0 = time.perf_counter()
+        for _ in range(1000):
+            q.enqueue_many(batch)
+            q.dequeue_many(len(batch))
+        print('{:16s} {:.3f}s for 1e6 items in batches of 1000'.format(cls.__name__, time.perf_counter() - t0))
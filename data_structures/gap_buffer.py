@@ -0,0 +1,369 @@
+"""
+List with a movable gap of free slots for edits clustered around a cursor (e.g. text editors).
+
+Summary:
+
+    Values are stored in an array with a block of unused slots (the gap) at the position of the last edit. Inserting or
+    deleting at the gap just moves its boundary. Editing elsewhere first moves the gap there by copying the values in
+    between, so a run of edits near the same position costs O(1) each plus one O(distance) move.
+
+Characteristics:
+
+    * n number elements
+    * d distance from last edit
+
+    Index:
+        Worst Time: O(1)
+    Insert/delete:
+        Worst Time: O(d) -- O(n) when growing
+        Average Time: O(1) amortized for edits at the cursor
+    Insert/delete k elements at once:
+        Worst Time: O(d + k)
+
+    Has the same interface as ArrayList (including slices and `dtype` for unboxed values).
+"""
+
+import random
+from itertools import chain, islice
+
+from data_structures.array_list import ArrayList, EmptyListException
+
+
+class GapBuffer(object):
+
+    def __init__(self, capacity=10, min_capacity=10, dtype=None):
+
+        self.min_capacity = min_capacity
+        self.capacity = capacity
+        self.dtype = dtype
+
+        self.array = self.new_array(self.capacity)
+
+        # free slots are [gap_start, gap_end)
+        self.gap_start = 0
+        self.gap_end = self.capacity
+
+    @property
+    def size(self):
+        return self.capacity - (self.gap_end - self.gap_start)
+
+    def __len__(self):
+        return self.size
+
+    def __str__(self):
+
+        return str(list(self))
+
+    def __iter__(self):
+
+        return chain(islice(self.array, self.gap_start), islice(self.array, self.gap_end, self.capacity))
+
+    # same storage as ArrayList
+    new_array = ArrayList.new_array
+    as_values = ArrayList.as_values
+
+    def as_memoryview(self):
+        """
+        Zero copy view of typed values (moves the gap to the end so values are contiguous).
+
+        The list can't grow or shrink while the view is alive.
+        """
+
+        if self.dtype is None:
+            raise TypeError('only typed lists have a buffer')
+
+        self.move_gap(self.size)
+
+        return memoryview(self.array)[:self.size]
+
+    def normalize_idx(self, idx, size):
+
+        if not isinstance(idx, int):
+            raise TypeError
+
+        if idx < -size or idx >= size:
+            raise IndexError
+
+        return idx % size
+
+    def values(self, start, stop):
+        """Storage slice (list or array) of elements [start, stop)."""
+
+        gap_start, gap_end = self.gap_start, self.gap_end
+        gap = gap_end - gap_start
+
+        if stop <= gap_start:
+            return self.array[start: stop]
+        if start >= gap_start:
+            return self.array[start + gap: stop + gap]
+
+        return self.array[start: gap_start] + self.array[gap_end: stop + gap]
+
+    def __getitem__(self, idx):
+
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(self.size)
+
+            if step == 1:
+                values = self.values(start, max(start, stop))
+            else:
+                gap_start, gap = self.gap_start, self.gap_end - self.gap_start
+                values = [self.array[i + gap if i >= gap_start else i] for i in range(start, stop, step)]
+
+            res = type(self)(max(len(values), self.min_capacity), self.min_capacity, self.dtype)
+            res.extend(values)
+
+            return res
+
+        idx = self.normalize_idx(idx, self.size)
+
+        if idx >= self.gap_start:
+            idx += self.gap_end - self.gap_start
+
+        return self.array[idx]
+
+    def __setitem__(self, idx, val):
+
+        if not isinstance(idx, slice):
+            idx = self.normalize_idx(idx, self.size)
+
+            if idx >= self.gap_start:
+                idx += self.gap_end - self.gap_start
+
+            self.array[idx] = val
+            return
+
+        start, stop, step = idx.indices(self.size)
+        values = self.as_values(val)
+
+        if step != 1:
+            indices = range(start, stop, step)
+
+            # extended slice must be same length (as with lists)
+            if len(indices) != len(values):
+                raise ValueError('attempt to assign sequence of size {} to extended slice of size {}'.format(
+                    len(values), len(indices)))
+
+            gap_start, gap = self.gap_start, self.gap_end - self.gap_start
+            for i, v in zip(indices, values):
+                self.array[i + gap if i >= gap_start else i] = v
+            return
+
+        # both edits happen at the gap
+        self.delete_range(start, max(start, stop))
+        self.insert_many(start, values)
+
+    def __delitem__(self, idx):
+
+        if not isinstance(idx, slice):
+            self.pop(idx)
+            return
+
+        start, stop, step = idx.indices(self.size)
+
+        if step == 1:
+            self.delete_range(start, stop)
+            return
+
+        # extended slice so rebuild keeping other elements
+        removed = set(range(start, stop, step))
+        kept = self.as_values([v for i, v in enumerate(self) if i not in removed])
+
+        self.delete_range(0, self.size)
+        self.extend(kept)
+
+    def move_gap(self, idx):
+        """Move gap so it starts at element idx."""
+
+        gap_start, gap_end = self.gap_start, self.gap_end
+
+        if idx < gap_start:
+            # values in [idx, gap_start) go to end of gap
+            n = gap_start - idx
+            self.array[gap_end - n: gap_end] = self.array[idx: gap_start]
+        elif idx > gap_start:
+            # values after gap go to start of gap
+            n = idx - gap_start
+            self.array[gap_start: idx] = self.array[gap_end: gap_end + n]
+            n = -n
+        else:
+            return
+
+        self.gap_start -= n
+        self.gap_end -= n
+
+    def resize(self, capacity):
+
+        n_after = self.capacity - self.gap_end
+
+        array = self.new_array(capacity)
+        array[:self.gap_start] = self.array[:self.gap_start]
+        array[capacity - n_after:] = self.array[self.gap_end:]
+
+        self.array = array
+        self.capacity = capacity
+        self.gap_end = capacity - n_after
+
+    def insert_many(self, idx, iterable):
+
+        size = self.size
+
+        if idx < -size or idx > size:
+            raise IndexError
+
+        if idx < 0:
+            idx %= size
+
+        values = self.as_values(iterable)
+        n = len(values)
+
+        if self.gap_end - self.gap_start < n:
+            self.resize(max(2 * self.capacity, size + n))
+
+        self.move_gap(idx)
+
+        self.array[self.gap_start: self.gap_start + n] = values
+        self.gap_start += n
+
+    def insert(self, idx, val):
+
+        size = self.size
+
+        if idx < -size or idx > size:
+            raise IndexError
+
+        if idx < 0:
+            idx %= size
+
+        if self.gap_start == self.gap_end:
+            self.resize(2 * self.capacity)
+
+        self.move_gap(idx)
+
+        self.array[self.gap_start] = val
+        self.gap_start += 1
+
+    def append(self, val):
+
+        self.insert(self.size, val)
+
+    def extend(self, iterable):
+
+        self.insert_many(self.size, iterable)
+
+    def pop(self, idx=-1):
+
+        size = self.size
+
+        if size == 0:
+            raise EmptyListException
+
+        idx = self.normalize_idx(idx, size)
+
+        self.move_gap(idx)
+
+        val = self.array[self.gap_end]
+        if self.dtype is None:
+            # drop reference to removed value
+            self.array[self.gap_end] = None
+        self.gap_end += 1
+
+        self.check_shrink()
+
+        return val
+
+    def delete_range(self, start, stop):
+
+        start, stop, _ = slice(start, stop).indices(self.size)
+
+        if start >= stop:
+            return
+
+        self.move_gap(start)
+
+        # removed values join the gap
+        if self.dtype is None:
+            self.array[self.gap_end: self.gap_end + stop - start] = [None] * (stop - start)
+        self.gap_end += stop - start
+
+        self.check_shrink()
+
+    def check_shrink(self):
+
+        if self.capacity >= 4 * self.min_capacity and self.size <= self.capacity // 4:
+            self.resize(max(self.min_capacity, 2 * self.size))
+
+
+def random_edit_trace(size, num_ops, locality=0.95):
+    """
+    Edits (op, idx) to a list of given size.
+
+    With probability `locality` an edit happens at the cursor (typing/backspacing) otherwise the cursor jumps.
+    """
+
+    trace = []
+    cursor = size // 2
+
+    for _ in range(num_ops):
+
+        if random.random() > locality:
+            cursor = random.randint(1, size - 1)
+
+        if random.random() < 0.7:
+            trace.append(('insert', cursor))
+            cursor += 1
+            size += 1
+        else:
+            trace.append(('pop', cursor - 1))
+            cursor -= 1
+            size -= 1
+
+        # keep away from ends of list
+        cursor = min(max(cursor, 1), size - 1)
+
+    return trace
+
+
+def replay(lst, trace):
+
+    for op, idx in trace:
+        if op == 'insert':
+            lst.insert(idx, 'x')
+        else:
+            lst.pop(idx)
+
+
+if __name__ == '__main__':
+
+    import time
+
+    from data_structures.chunked_list import ChunkedList
+    from data_structures.linked_list import LinkedList
+
+    gb = GapBuffer()
+    gb.extend('hello world')
+    gb.insert(5, ',')
+    gb.pop(-1)
+    gb.insert(-1, 'l')
+    print(''.join(gb))
+
+    size = 50000
+
+    for locality in [0.99, 0.5]:
+
+        trace = random_edit_trace(size, 2000, locality)
+
+        print('locality {}:'.format(locality))
+
+        for cls in [ArrayList, LinkedList, GapBuffer, ChunkedList]:
+
+            lst = cls()
+            if isinstance(lst, LinkedList):
+                for _ in range(size):
+                    lst.append_right('x')
+            else:
+                lst.extend('x' * size)
+
+            t0 = time.perf_counter()
+            replay(lst, trace)
+            print('    {:12s} {:.4f}s'.format(cls.__name__, time.perf_counter() - t0))
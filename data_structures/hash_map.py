@@ -12,6 +12,11 @@ Summary:
     For closed hashing the choice of probing algorithm (to determine next hash on collision) is important. Linear
     probing, for example, is bad because it increases the average number of hash collisions in future operations.
 
+    Robin Hood hashing is linear probing where an inserted entry takes the slot of any entry that is closer to its home
+    bucket ("steal from the rich"). This keeps probe lengths short and nearly equal, and lets lookups for missing keys
+    stop as soon as they have probed further than the entry they are looking at. Deletes shift the following entries of
+    the cluster back one slot instead of leaving tombstones, so lookups never slow down after many deletes.
+
 Characteristics:
 
     * n number
@@ -25,13 +30,49 @@ Characteristics:
     Pop:
         Worst Time: O(n)
         Average Time: O(1) amortized
+
+    Resizing rehashes every entry at once, so the operation that triggers it takes O(n). IncrementalHashMap instead keeps
+    the old table around while a new one is filled, migrating a few buckets on every operation (like Redis's two table
+    rehash). Lookups check both tables during the migration. Each operation is then O(1) (not just amortized) at the
+    cost of holding two tables while migrating.
 """
 
+import math
+import time
+from collections import deque
+from functools import wraps
+
+MASK_64 = (1 << 64) - 1
+
+# 2 ** 64 / golden ratio
+FIBONACCI = 0x9E3779B97F4A7C15
+
+
+def mix_hash(h):
+    """
+    Spread hash(key) so its low bits (the bucket) depend on all its bits.
+
+    Python's hash of an int is the int itself so keys differing only in high bits would share a bucket. Multiplying
+    by FIBONACCI (Fibonacci hashing) moves every bit into the high half which is then folded onto the low half.
+    """
+
+    h = (h * FIBONACCI) & MASK_64
+
+    return h ^ (h >> 32)
+
 
 class HashMap(object):
-    """Closed hash map."""
+    """
+    Closed hash map using Robin Hood probing.
+
+    Hashes, keys and values live in three parallel lists. Hashes are cached (after mix_hash) so resizing and probing
+    never call `hash(key)` again and most mismatches are rejected without calling `key.__eq__`.
+    """
 
-    def __init__(self, capacity=10, upsize=2/3, downsize=0.25):
+    def __init__(self, capacity=8, upsize=0.8, downsize=0.2):
+
+        # power of 2 capacity so bucket is a mask of the hash
+        capacity = 1 << max(capacity - 1, 1).bit_length()
 
         self.min_capacity = capacity
         self.capacity = capacity
@@ -40,11 +81,40 @@ class HashMap(object):
 
         self.size = 0
 
-        self.array = [None] * self.capacity
+        self.hashes = [None] * capacity
+        self.keys_ = [None] * capacity
+        self.values_ = [None] * capacity
 
     def __str__(self):
 
-        return str(self.array)
+        return '{' + ', '.join('{!r}: {!r}'.format(k, v) for k, v in self.items()) + '}'
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+
+        for h, key in zip(self.hashes, self.keys_):
+            if h is not None:
+                yield key
+
+    def __contains__(self, key):
+        return self.get_idx(key) >= 0
+
+    def keys(self):
+        return iter(self)
+
+    def values(self):
+
+        for h, val in zip(self.hashes, self.values_):
+            if h is not None:
+                yield val
+
+    def items(self):
+
+        for h, key, val in zip(self.hashes, self.keys_, self.values_):
+            if h is not None:
+                yield key, val
 
     def check_capacity(self):
 
@@ -56,74 +126,384 @@ class HashMap(object):
             new_capacity = self.capacity // 2
 
         if new_capacity is not None:
-            old_array = self.array
+            self.resize(new_capacity)
+
+    def resize(self, new_capacity):
+
+        old = [(h, k, v) for h, k, v in zip(self.hashes, self.keys_, self.values_) if h is not None]
+
+        self.capacity = new_capacity
+        self.size = 0
+        self.hashes = [None] * new_capacity
+        self.keys_ = [None] * new_capacity
+        self.values_ = [None] * new_capacity
+
+        # reuse cached hashes
+        for h, key, val in old:
+            self.insert(h, key, val)
+
+    def get_idx(self, key, h=None):
+        """Get array index of existing key or -1 if key is missing."""
+
+        if h is None:
+            h = mix_hash(hash(key))
+
+        return self.probe(self.hashes, self.keys_, self.capacity - 1, key, h)
+
+    @staticmethod
+    def probe(hashes, keys, mask, key, h):
+
+        idx = h & mask
+        dist = 0
+
+        while True:
+
+            h_entry = hashes[idx]
+
+            if h_entry is None:
+                return -1
 
-            self.array = [None] * new_capacity
+            if h_entry == h:
+                key_entry = keys[idx]
+                if key_entry is key or key_entry == key:
+                    return idx
 
-            self.capacity = new_capacity
+            # any entry of ours would have displaced this one
+            if dist > (idx - h_entry) & mask:
+                return -1
 
-            for tup in old_array:
-                if tup is None:
-                    continue
+            idx = (idx + 1) & mask
+            dist += 1
 
-                self[tup[0]] = tup[1]
+    def insert(self, h, key, value):
+        """Insert entry or overwrite value of existing key."""
 
-    def get_idx(self, key, use_removed=False):
-        """Get array index of existing key or place to put new entry."""
+        hashes, keys, values = self.hashes, self.keys_, self.values_
+        mask = self.capacity - 1
 
-        h = hash(key) % self.capacity
-        entry = self.array[h]
+        idx = h & mask
+        dist = 0
 
-        while entry is not None:
+        while True:
 
-            if entry is REMOVED:
-                if use_removed:
-                    break
-            elif entry[0] == key:
-                break
+            h_entry = hashes[idx]
 
-            # linear probing
-            h = (h + 1) % self.capacity
-            entry = self.array[h]
+            if h_entry is None:
+                hashes[idx], keys[idx], values[idx] = h, key, value
+                self.size += 1
+                return
 
-        return h
+            if h_entry == h:
+                key_entry = keys[idx]
+                if key_entry is key or key_entry == key:
+                    values[idx] = value
+                    return
+
+            dist_entry = (idx - h_entry) & mask
+
+            if dist_entry < dist:
+                # steal slot from richer entry and carry on inserting it (it can't match any later key)
+                hashes[idx], h = h, h_entry
+                keys[idx], key = key, keys[idx]
+                values[idx], value = value, values[idx]
+                dist = dist_entry
+
+            idx = (idx + 1) & mask
+            dist += 1
 
     def __setitem__(self, key, value):
 
         self.check_capacity()
 
-        idx = self.get_idx(key, use_removed=True)
-
-        self.array[idx] = (key, value)
+        self.insert(mix_hash(hash(key)), key, value)
 
     def __getitem__(self, key):
 
         idx = self.get_idx(key)
 
-        tup = self.array[idx]
+        if idx < 0:
+            raise KeyError(key)
+
+        return self.values_[idx]
+
+    def get(self, key, default=None):
+
+        idx = self.get_idx(key)
+
+        if idx < 0:
+            return default
 
-        if tup is None:
-            raise KeyError
+        return self.values_[idx]
 
-        return tup[1]
+    def __delitem__(self, key):
 
-    def pop(self, key):
+        self.pop(key)
+
+    def pop(self, key, *default):
 
         idx = self.get_idx(key)
 
-        tup = self.array[idx]
+        if idx < 0:
+            if default:
+                return default[0]
+            raise KeyError(key)
+
+        value = self.values_[idx]
+
+        self.remove_idx(idx)
+
+        self.check_capacity()
+
+        return value
+
+    def remove_idx(self, idx):
+        """Remove entry and shift rest of cluster back (no tombstones)."""
+
+        hashes, keys, values = self.hashes, self.keys_, self.values_
+        mask = self.capacity - 1
 
-        if tup is None:
-            raise KeyError
+        idx_next = (idx + 1) & mask
 
-        self.array[idx] = REMOVED
+        # stop at empty slot or entry already in its home bucket
+        while hashes[idx_next] is not None and (idx_next - hashes[idx_next]) & mask:
+            hashes[idx], keys[idx], values[idx] = hashes[idx_next], keys[idx_next], values[idx_next]
+            idx = idx_next
+            idx_next = (idx + 1) & mask
 
+        hashes[idx] = keys[idx] = values[idx] = None
 
-class Removed(object):
+        self.size -= 1
+
+
+class Moved(object):
     pass
 
 
-REMOVED = Removed()
+# marks old table slots that have been migrated (hash is kept so probing past them still works)
+MOVED = Moved()
+
+
+def timed(func):
+    """Record latency of a map operation if the map is tracking latencies."""
+
+    @wraps(func)
+    def wrapper(self, *args):
+
+        if self.latencies is None:
+            return func(self, *args)
+
+        t0 = time.perf_counter()
+        res = func(self, *args)
+        self.latencies.append(time.perf_counter() - t0)
+
+        return res
+
+    return wrapper
+
+
+class IncrementalHashMap(HashMap):
+    """
+    Robin Hood hash map that migrates to a resized table a few buckets at a time.
+
+    The old table is never written to while migrating except to mark slots as MOVED, so its probe sequences stay intact.
+    Every entry is live in exactly one of the two tables. `migrate_step` old slots are moved per operation; once the
+    old table is empty it is dropped.
+
+    If `latency_window` is set the latencies of the last `latency_window` operations are kept (see
+    `latency_percentile`).
+    """
+
+    def __init__(self, capacity=8, upsize=0.8, downsize=0.2, migrate_step=8, latency_window=None):
+
+        super().__init__(capacity, upsize, downsize)
+
+        self.migrate_step = migrate_step
+
+        # old table (hashes, keys, values, capacity) and next slot to migrate
+        self.old = None
+        self.cursor = 0
+
+        self.latencies = deque(maxlen=latency_window) if latency_window else None
+
+    @property
+    def migrating(self):
+        return self.old is not None
+
+    def latency_percentile(self, p=99):
+        """Latency (seconds) under which p percent of recorded operations completed."""
+
+        if not self.latencies:
+            raise ValueError('no latencies recorded')
+
+        latencies = sorted(self.latencies)
+        idx = max(0, math.ceil(p / 100 * len(latencies)) - 1)
+
+        return latencies[idx]
+
+    def resize(self, new_capacity):
+
+        self.old = self.hashes, self.keys_, self.values_, self.capacity
+        self.cursor = 0
+
+        self.capacity = new_capacity
+        self.hashes = [None] * new_capacity
+        self.keys_ = [None] * new_capacity
+        self.values_ = [None] * new_capacity
+
+    def check_capacity(self):
+
+        if self.old is None:
+            super().check_capacity()
+        elif self.size >= self.capacity * self.upsize:
+            # new table filled up before migration finished (can happen when shrinking)
+            self.migrate(self.old[3])
+            super().check_capacity()
+
+    def migrate(self, n):
+
+        old_hashes, old_keys, old_values, old_capacity = self.old
+
+        stop = min(self.cursor + n, old_capacity)
+
+        for idx in range(self.cursor, stop):
+            key = old_keys[idx]
+            if old_hashes[idx] is None or key is MOVED:
+                continue
+
+            # entry already counted in size
+            self.size -= 1
+            self.insert(old_hashes[idx], key, old_values[idx])
+
+            old_keys[idx] = MOVED
+            old_values[idx] = None
+
+        self.cursor = stop
+
+        if stop == old_capacity:
+            self.old = None
+
+    def old_get_idx(self, key, h):
+
+        old_hashes, old_keys, _, old_capacity = self.old
+
+        return self.probe(old_hashes, old_keys, old_capacity - 1, key, h)
+
+    @timed
+    def __setitem__(self, key, value):
+
+        if self.old is not None:
+            self.migrate(self.migrate_step)
+
+        self.check_capacity()
+
+        h = mix_hash(hash(key))
+
+        if self.old is not None:
+            idx = self.old_get_idx(key, h)
+            if idx >= 0:
+                # move entry to new table
+                self.old[1][idx] = MOVED
+                self.old[2][idx] = None
+                self.size -= 1
+
+        self.insert(h, key, value)
+
+    @timed
+    def __getitem__(self, key):
+
+        res = self.get(key, MOVED)
+
+        if res is MOVED:
+            raise KeyError(key)
+
+        return res
+
+    def get(self, key, default=None):
+
+        h = mix_hash(hash(key))
+
+        idx = self.get_idx(key, h)
+        if idx >= 0:
+            return self.values_[idx]
+
+        if self.old is not None:
+            idx = self.old_get_idx(key, h)
+            if idx >= 0:
+                return self.old[2][idx]
+
+        return default
+
+    def __contains__(self, key):
+
+        return self.get(key, MOVED) is not MOVED
+
+    @timed
+    def pop(self, key, *default):
+
+        if self.old is not None:
+            self.migrate(self.migrate_step)
+
+        h = mix_hash(hash(key))
+
+        idx = self.get_idx(key, h)
+
+        if idx >= 0:
+            value = self.values_[idx]
+            self.remove_idx(idx)
+        elif self.old is not None and self.old_get_idx(key, h) >= 0:
+            idx = self.old_get_idx(key, h)
+            value = self.old[2][idx]
+            self.old[1][idx] = MOVED
+            self.old[2][idx] = None
+            self.size -= 1
+        elif default:
+            return default[0]
+        else:
+            raise KeyError(key)
+
+        self.check_capacity()
+
+        return value
+
+    def items(self):
+
+        yield from super().items()
+
+        if self.old is not None:
+            for h, key, val in zip(*self.old[:3]):
+                if h is not None and key is not MOVED:
+                    yield key, val
+
+    def __iter__(self):
+
+        for key, _ in self.items():
+            yield key
+
+    def values(self):
+
+        for _, val in self.items():
+            yield val
+
+
+def benchmark_set_latency(n=10 ** 6):
+    """Compare latencies of inserting n keys with stop the world and incremental resizing."""
+
+    for hm in [HashMap(), IncrementalHashMap()]:
+
+        latencies = []
+        t_start = time.perf_counter()
+
+        for i in range(n):
+            t0 = time.perf_counter()
+            hm[i] = i
+            latencies.append(time.perf_counter() - t0)
+
+        t_total = time.perf_counter() - t_start
+
+        latencies.sort()
+        print('{}: total {:.2f}s p99 {:.2f}us p99.99 {:.2f}us max {:.2f}ms'.format(
+            type(hm).__name__, t_total, latencies[int(0.99 * n)] * 1e6, latencies[int(0.9999 * n)] * 1e6,
+            latencies[-1] * 1e3))
 
 
 if __name__ == '__main__':
@@ -145,3 +525,43 @@ if __name__ == '__main__':
     hm['a'] = 6
 
     print(hm)
+
+    import random
+
+    d = {}
+    hm = HashMap()
+
+    for _ in range(100000):
+        k = random.randint(0, 2000)
+        if random.random() < 0.5:
+            assert hm.pop(k, None) == d.pop(k, None)
+        else:
+            hm[k] = d[k] = random.random()
+
+    assert len(hm) == len(d) and dict(hm.items()) == d
+
+    d = {}
+    hm = IncrementalHashMap(migrate_step=2, latency_window=1000)
+
+    for _ in range(100000):
+        k = random.randint(0, 2000)
+        if random.random() < 0.5:
+            assert hm.pop(k, None) == d.pop(k, None)
+        else:
+            hm[k] = d[k] = random.random()
+        assert (k in hm) == (k in d)
+
+    assert len(hm) == len(d) and dict(hm.items()) == d
+    print('p99 latency: {:.2f}us'.format(hm.latency_percentile(99) * 1e6))
+
+    # keys differing only in high bits spread over buckets (raw hashes would all share bucket 0)
+    t0 = time.perf_counter()
+    for cls in [HashMap, IncrementalHashMap]:
+        hm = cls()
+        keys = [i << 16 for i in range(20000)]
+        for k in keys:
+            hm[k] = k
+        assert all(hm[k] == k for k in keys)
+    assert time.perf_counter() - t0 < 5, 'stride 2 ** 16 keys took {:.1f}s'.format(time.perf_counter() - t0)
+
+    benchmark_set_latency()
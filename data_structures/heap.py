@@ -23,9 +23,15 @@ Characteristics:
         Worst Time: O(n) using sift-down method
     Search:
         Worst Time: O(n)
+    Decrease key / remove (IndexedHeap):
+        Worst Time: O(logn)
+
+    A d-ary heap (DaryHeap) has height log_d(n) so pushes are cheaper, but pops compare d children per level:
+    O(d log_d(n)).
 """
 
-import math
+from array import array
+import heapq
 
 
 class Heap(object):
@@ -53,15 +59,15 @@ class Heap(object):
 
     def check_size(self):
 
+        # resize in place rather than copying into a new list
+
         if self.size == self.capacity:
+            self.array.extend([None] * self.capacity)
             self.capacity *= 2
-            new_array = [None] * self.capacity
-            new_array[:self.size] = self.array
-            self.array = new_array
 
         if self.capacity >= 4 * self.min_capacity and self.size <= self.capacity // 4:
             self.capacity //= 2
-            self.array = self.array[:self.capacity]
+            del self.array[self.capacity:]
 
     @classmethod
     def heapify(cls, iterable, min_capacity=10):
@@ -80,15 +86,9 @@ class Heap(object):
         heap.size = n
         heap.array[:n] = l
 
-        height = int(math.log2(heap.size))
-
-        if height <= 0:
-            return
-
-        # sift non-leaf nodes down
-        for lvl in range(height - 1, -1, -1):
-            for idx in range(2 ** lvl - 1, 2 ** (lvl + 1) - 1):
-                heap.sift_down(idx)
+        # sift non-leaf nodes down (last one is parent of last leaf)
+        for idx in range((n - 2) // 2, -1, -1):
+            heap.sift_down(idx)
 
         heap.val_idx = {v: i for i, v in enumerate(heap.array) if i < heap.size}
 
@@ -144,10 +144,8 @@ class Heap(object):
 
     def sift_down(self, idx=0):
 
-        height = int(math.log2(self.size))
-
-        # loop if idx not in bottom row
-        while idx < 2 ** height:
+        # loop until idx has no children
+        while True:
 
             idx_child1 = idx * 2 + 1
 
@@ -180,9 +178,390 @@ class Heap(object):
             self.sift_down(idx)
 
 
+class IndexedHeap(object):
+    """
+    Min heap of (priority, item) entries addressed by handles.
+
+    `push` returns an integer handle that stays valid until its entry is popped or removed. Handles index parallel lists
+    so priorities can be changed without hashing (or even comparing) the items themselves. Freed handles are reused.
+
+    Each node has `arity` children. Larger arities make the tree shallower (cheaper pushes/decrease keys) at the cost of
+    more comparisons per level when popping.
+    """
+
+    def __init__(self, arity=2):
+
+        if arity < 2:
+            raise ValueError('arity must be at least 2')
+
+        self.arity = arity
+
+        # heap position -> handle
+        self.heap = []
+
+        # handle -> priority/item/heap position (-1 if handle is free)
+        self.priorities = []
+        self.items = []
+        self.positions = []
+
+        self.free_handles = []
+
+    @property
+    def size(self):
+        return len(self.heap)
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, handle):
+        return 0 <= handle < len(self.positions) and self.positions[handle] >= 0
+
+    def __str__(self):
+
+        return str([(self.priorities[h], self.items[h]) for h in self.heap])
+
+    def push(self, priority, item=None):
+
+        if self.free_handles:
+            handle = self.free_handles.pop()
+            self.priorities[handle] = priority
+            self.items[handle] = item
+            self.positions[handle] = len(self.heap)
+        else:
+            handle = len(self.positions)
+            self.priorities.append(priority)
+            self.items.append(item)
+            self.positions.append(len(self.heap))
+
+        self.heap.append(handle)
+
+        self.sift_up(len(self.heap) - 1)
+
+        return handle
+
+    def peek(self):
+
+        if not self.heap:
+            raise IndexError
+
+        handle = self.heap[0]
+
+        return self.priorities[handle], self.items[handle]
+
+    def pop(self):
+
+        if not self.heap:
+            raise IndexError
+
+        return self.remove(self.heap[0])
+
+    def remove(self, handle):
+
+        if handle not in self:
+            raise KeyError(handle)
+
+        idx = self.positions[handle]
+        last = self.heap.pop()
+
+        # move last entry into the hole and restore order in whichever direction it violates
+        if last != handle:
+            self.heap[idx] = last
+            self.positions[last] = idx
+            self.sift_up(idx)
+            self.sift_down(self.positions[last])
+
+        res = self.priorities[handle], self.items[handle]
+
+        self.priorities[handle] = self.items[handle] = None
+        self.positions[handle] = -1
+        self.free_handles.append(handle)
+
+        return res
+
+    def priority(self, handle):
+
+        if handle not in self:
+            raise KeyError(handle)
+
+        return self.priorities[handle]
+
+    def decrease_key(self, handle, priority):
+
+        if handle not in self:
+            raise KeyError(handle)
+
+        if self.priorities[handle] < priority:
+            raise ValueError('new priority is larger than current priority')
+
+        self.priorities[handle] = priority
+        self.sift_up(self.positions[handle])
+
+    def update(self, handle, priority):
+
+        if handle not in self:
+            raise KeyError(handle)
+
+        old = self.priorities[handle]
+        self.priorities[handle] = priority
+
+        if priority < old:
+            self.sift_up(self.positions[handle])
+        else:
+            self.sift_down(self.positions[handle])
+
+    def sift_up(self, idx):
+
+        # move hole upwards and write the handle once at the end instead of swapping each level
+        heap, priorities, positions = self.heap, self.priorities, self.positions
+
+        handle = heap[idx]
+        priority = priorities[handle]
+
+        arity = self.arity
+
+        while idx > 0:
+            idx_parent = (idx - 1) // arity
+            handle_parent = heap[idx_parent]
+            if priority < priorities[handle_parent]:
+                heap[idx] = handle_parent
+                positions[handle_parent] = idx
+                idx = idx_parent
+            else:
+                break
+
+        heap[idx] = handle
+        positions[handle] = idx
+
+    def sift_down(self, idx):
+
+        heap, priorities, positions = self.heap, self.priorities, self.positions
+        arity = self.arity
+        n = len(heap)
+
+        handle = heap[idx]
+        priority = priorities[handle]
+
+        while True:
+            idx_first = arity * idx + 1
+            if idx_first >= n:
+                break
+
+            # smallest child
+            idx_child = idx_first
+            priority_child = priorities[heap[idx_first]]
+            for i in range(idx_first + 1, min(idx_first + arity, n)):
+                if priorities[heap[i]] < priority_child:
+                    idx_child = i
+                    priority_child = priorities[heap[i]]
+
+            if priority_child < priority:
+                handle_child = heap[idx_child]
+                heap[idx] = handle_child
+                positions[handle_child] = idx
+                idx = idx_child
+            else:
+                break
+
+        heap[idx] = handle
+        positions[handle] = idx
+
+
+class DaryHeap(object):
+    """
+    Min heap of (priority, id) entries with `arity` children per node.
+
+    Priorities and integer ids are kept in heap order in two parallel compact arrays (see the `array` module) so entries
+    are not boxed tuples. Pass `typecode=None` to keep priorities in a list when they are not numbers. Ids default to
+    the insertion count.
+    """
+
+    def __init__(self, arity=4, typecode='d'):
+
+        if arity < 2:
+            raise ValueError('arity must be at least 2')
+
+        self.arity = arity
+        self.typecode = typecode
+
+        self.priorities = array(typecode) if typecode else []
+        self.ids = array('q')
+
+        self.count = 0
+
+    @property
+    def size(self):
+        return len(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __str__(self):
+
+        return str(list(zip(self.priorities, self.ids)))
+
+    @classmethod
+    def heapify(cls, priorities, ids=None, arity=4, typecode='d'):
+
+        heap = cls(arity, typecode)
+        heap.push_many(priorities, ids)
+
+        return heap
+
+    def peek(self):
+
+        if not self.ids:
+            raise IndexError
+
+        return self.priorities[0], self.ids[0]
+
+    def push(self, priority, id_=None):
+
+        if id_ is None:
+            id_ = self.count
+        self.count += 1
+
+        self.priorities.append(priority)
+        self.ids.append(id_)
+
+        self.sift_up(len(self.ids) - 1)
+
+        return id_
+
+    def push_many(self, priorities, ids=None):
+
+        n_old = len(self.ids)
+
+        self.priorities.extend(priorities)
+        n_new = len(self.priorities) - n_old
+
+        if ids is None:
+            self.ids.extend(range(self.count, self.count + n_new))
+        else:
+            self.ids.extend(ids)
+
+        if len(self.ids) != len(self.priorities):
+            del self.priorities[n_old:]
+            del self.ids[n_old:]
+            raise ValueError('priorities and ids have different lengths')
+
+        self.count += n_new
+
+        if n_new > n_old:
+            # cheaper to rebuild whole heap bottom up (O(n)) than sift up every new entry (O(k logn))
+            for idx in range((len(self.ids) - 2) // self.arity, -1, -1):
+                self.sift_down(idx)
+        else:
+            for idx in range(n_old, n_old + n_new):
+                self.sift_up(idx)
+
+    def pop(self):
+
+        if not self.ids:
+            raise IndexError
+
+        priorities, ids = self.priorities, self.ids
+
+        res = priorities[0], ids[0]
+
+        priority_last, id_last = priorities.pop(), ids.pop()
+
+        if ids:
+            priorities[0] = priority_last
+            ids[0] = id_last
+            self.sift_down(0)
+
+        return res
+
+    def pop_many(self, k):
+
+        if k < 0:
+            raise ValueError('k must be >= 0')
+
+        k = min(k, len(self.ids))
+
+        res = []
+        append, pop = res.append, self.pop
+
+        for _ in range(k):
+            append(pop())
+
+        return res
+
+    def nsmallest(self, k):
+        """Get k smallest entries in order without modifying heap."""
+
+        if k < 0:
+            raise ValueError('k must be >= 0')
+
+        # frontier of candidate positions -- only children of returned entries can be next smallest
+        priorities, ids, arity = self.priorities, self.ids, self.arity
+        n = len(ids)
+
+        res = []
+
+        frontier = [(priorities[0], 0)] if n else []
+
+        while frontier and len(res) < k:
+            priority, idx = heapq.heappop(frontier)
+            res.append((priority, ids[idx]))
+
+            idx_first = arity * idx + 1
+            for i in range(idx_first, min(idx_first + arity, n)):
+                heapq.heappush(frontier, (priorities[i], i))
+
+        return res
+
+    def sift_up(self, idx):
+
+        priorities, ids, arity = self.priorities, self.ids, self.arity
+
+        priority, id_ = priorities[idx], ids[idx]
+
+        while idx > 0:
+            idx_parent = (idx - 1) // arity
+            if priority < priorities[idx_parent]:
+                priorities[idx] = priorities[idx_parent]
+                ids[idx] = ids[idx_parent]
+                idx = idx_parent
+            else:
+                break
+
+        priorities[idx] = priority
+        ids[idx] = id_
+
+    def sift_down(self, idx):
+
+        priorities, ids, arity = self.priorities, self.ids, self.arity
+        n = len(ids)
+
+        priority, id_ = priorities[idx], ids[idx]
+
+        while True:
+            idx_first = arity * idx + 1
+            if idx_first >= n:
+                break
+
+            # smallest child
+            idx_child = idx_first
+            priority_child = priorities[idx_first]
+            for i in range(idx_first + 1, min(idx_first + arity, n)):
+                if priorities[i] < priority_child:
+                    idx_child = i
+                    priority_child = priorities[i]
+
+            if priority_child < priority:
+                priorities[idx] = priority_child
+                ids[idx] = ids[idx_child]
+                idx = idx_child
+            else:
+                break
+
+        priorities[idx] = priority
+        ids[idx] = id_
+
+
 if __name__ == '__main__':
 
-    import heapq
     import random
 
     ph = [random.randint(0, 99) for _ in range(10)]
@@ -209,3 +588,20 @@ if __name__ == '__main__':
     h.modify(1.5, 4)
     print(h)
     print(h.val_idx)
+
+    ih = IndexedHeap()
+    handles = {v: ih.push(random.random(), v) for v in range(1000)}
+    for v in range(0, 1000, 3):
+        ih.decrease_key(handles[v], ih.priority(handles[v]) - 1)
+    for v in range(1, 1000, 3):
+        ih.remove(handles[v])
+
+    popped = [ih.pop()[0] for _ in range(len(ih))]
+    assert popped == sorted(popped)
+
+    dh = DaryHeap.heapify([random.random() for _ in range(1000)])
+    dh.push_many([random.random() for _ in range(100)])
+    smallest = dh.nsmallest(50)
+    assert smallest == dh.pop_many(50)
+    popped = [p for p, _ in dh.pop_many(len(dh))]
+    assert popped == sorted(popped) and popped[0] >= smallest[-1][0]
@@ -23,11 +23,19 @@ Characteristics:
         Worst Time: O(n)
     Insert:
         Worst Time: O(n)
+    Remove/insert/move node (doubly linked, given node):
+        Worst Time: O(1)
+    Splice:
+        Worst Time: O(1)
+
+    Nodes use __slots__ (no per instance __dict__).
 """
 
 
 class Node(object):
 
+    __slots__ = ('val', 'next', 'prev')
+
     def __init__(self, val, next_=None, prev=None):
 
         self.val = val
@@ -112,23 +120,20 @@ class LinkedList(object):
             raise InvalidAccessException
 
         if idx == 0:
-            val = self.head.val
-            self.head = self.head.next
-            self.n -= 1
-            return val
-
-        prev = self[idx - 1]
-
-        val = prev.next.val
-
-        if idx == self.n - 1:
-            self.last = prev
+            node = self.head
+            self.head = node.next
+            if self.head is None:
+                self.last = None
         else:
-            prev.next = prev.next.next
+            prev = self[idx - 1]
+            node = prev.next
+            prev.next = node.next
+            if node is self.last:
+                self.last = prev
 
         self.n -= 1
 
-        return val
+        return node.val
 
     def insert(self, idx, val):
 
@@ -231,6 +236,87 @@ class DoublyLinkedList(LinkedList):
         if idx < self.n - 1:
             curr.next.prev = curr
 
+        return curr
+
+    # O(1) operations on nodes returned by appends/inserts (node must belong to this list)
+
+    def unlink(self, node):
+
+        if node.prev is None:
+            self.head = node.next
+        else:
+            node.prev.next = node.next
+
+        if node.next is None:
+            self.last = node.prev
+        else:
+            node.next.prev = node.prev
+
+        node.prev = node.next = None
+
+        self.n -= 1
+
+    def link_after(self, node, prev):
+        """Link detached node after prev (or at front if prev is None)."""
+
+        node.prev = prev
+        node.next = self.head if prev is None else prev.next
+
+        if node.next is None:
+            self.last = node
+        else:
+            node.next.prev = node
+
+        if prev is None:
+            self.head = node
+        else:
+            prev.next = node
+
+        self.n += 1
+
+    def remove_node(self, node):
+
+        self.unlink(node)
+
+        return node.val
+
+    def insert_after(self, node, val):
+
+        new = Node(val)
+        self.link_after(new, node)
+
+        return new
+
+    def move_to_front(self, node):
+
+        if node is not self.head:
+            self.unlink(node)
+            self.link_after(node, None)
+
+    def move_to_end(self, node):
+
+        if node is not self.last:
+            self.unlink(node)
+            self.link_after(node, self.last)
+
+    def splice(self, other):
+        """Move all nodes of other list to end of this list (other is left empty)."""
+
+        if other is self or not other.n:
+            return
+
+        if self.n:
+            self.last.next = other.head
+            other.head.prev = self.last
+        else:
+            self.head = other.head
+
+        self.last = other.last
+        self.n += other.n
+
+        other.head = other.last = None
+        other.n = 0
+
 
 class InvalidAccessException(Exception):
     pass
@@ -252,3 +338,38 @@ if __name__ == '__main__':
     l.pop(1)
     l.pop(3)
     print(l)
+
+    node = l[2]
+    l.move_to_front(node)
+    l.move_to_end(l.head)
+    l.remove_node(l.head)
+    l.insert_after(l.last, 9)
+    l2 = DoublyLinkedList()
+    l2.append_right(10)
+    l.splice(l2)
+    print(l)
+
+    import tracemalloc
+
+    from data_structures.fifo_queue import FIFOQueue
+    from data_structures.stack import Stack
+
+    n = 100000
+    vals = list(range(n))
+
+    fills = [
+        (LinkedList, lambda c, v: c.append_right(v)),
+        (DoublyLinkedList, lambda c, v: c.append_right(v)),
+        (FIFOQueue, lambda c, v: c.enqueue(v)),
+        (Stack, lambda c, v: c.push(v)),
+    ]
+
+    for cls, fill in fills:
+        tracemalloc.start()
+        c = cls()
+        for v in vals:
+            fill(c, v)
+        mem, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print('{:16s} {:.1f} bytes/element'.format(cls.__name__, mem / n))
+        del c
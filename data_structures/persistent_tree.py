@@ -0,0 +1,401 @@
+"""
+Persistent (immutable) balanced search tree for keeping many versions of a map.
+
+Summary:
+
+    Nodes are never changed after creation. Insert and delete copy only the nodes on the path from the root to the
+    changed key and return a new root; every other subtree is shared with the previous version. So each version costs
+    O(logn) new nodes and taking a snapshot is just keeping a reference to a root.
+
+    The tree is weight balanced (Adams' trees as used by Haskell's Data.Map): each node stores the size of its subtree
+    and a subtree may be at most DELTA times the size of its sibling. Rebalancing uses single or double rotations
+    (chosen by GAMMA), which for a persistent tree only means building a few new nodes. Sizes also give rank/index
+    queries for free.
+
+Characteristics:
+
+    * n number elements
+
+    Search:
+        Worst Time: O(logn)
+    Insert/delete:
+        Worst Time: O(logn) (time and new memory)
+    Snapshot:
+        Worst Time: O(1)
+    Rank/select:
+        Worst Time: O(logn)
+"""
+
+DELTA = 3
+GAMMA = 2
+
+
+class Node(object):
+
+    __slots__ = ('key', 'val', 'left', 'right', 'size')
+
+    def __init__(self, key, val, left=None, right=None):
+
+        self.key = key
+        self.val = val
+
+        self.left = left
+        self.right = right
+
+        self.size = size(left) + size(right) + 1
+
+
+def size(node):
+    return node.size if node is not None else 0
+
+
+def single_left(key, val, left, right):
+    return Node(right.key, right.val, Node(key, val, left, right.left), right.right)
+
+
+def single_right(key, val, left, right):
+    return Node(left.key, left.val, left.left, Node(key, val, left.right, right))
+
+
+def double_left(key, val, left, right):
+
+    rl = right.left
+
+    return Node(rl.key, rl.val, Node(key, val, left, rl.left), Node(right.key, right.val, rl.right, right.right))
+
+
+def double_right(key, val, left, right):
+
+    lr = left.right
+
+    return Node(lr.key, lr.val, Node(left.key, left.val, left.left, lr.left), Node(key, val, lr.right, right))
+
+
+def balance(key, val, left, right):
+    """New node for key/val with children left/right, rotating if one child got too heavy by a single insert/delete."""
+
+    size_l, size_r = size(left), size(right)
+
+    if size_l + size_r <= 1:
+        return Node(key, val, left, right)
+
+    if size_r > DELTA * size_l:
+        if size(right.left) < GAMMA * size(right.right):
+            return single_left(key, val, left, right)
+        return double_left(key, val, left, right)
+
+    if size_l > DELTA * size_r:
+        if size(left.right) < GAMMA * size(left.left):
+            return single_right(key, val, left, right)
+        return double_right(key, val, left, right)
+
+    return Node(key, val, left, right)
+
+
+def get(root, key, default=None):
+
+    node = root
+
+    while node is not None:
+        if key == node.key:
+            return node.val
+        node = node.left if key < node.key else node.right
+
+    return default
+
+
+def contains(root, key):
+
+    node = root
+
+    while node is not None:
+        if key == node.key:
+            return True
+        node = node.left if key < node.key else node.right
+
+    return False
+
+
+def rank(root, key):
+    """Number of keys less than key."""
+
+    res = 0
+    node = root
+
+    while node is not None:
+        if key <= node.key:
+            node = node.left
+        else:
+            res += size(node.left) + 1
+            node = node.right
+
+    return res
+
+
+def select(root, k):
+    """(key, val) of the k-th smallest key (0 indexed)."""
+
+    if not 0 <= k < size(root):
+        raise IndexError(k)
+
+    node = root
+
+    while True:
+        size_l = size(node.left)
+
+        if k < size_l:
+            node = node.left
+        elif k == size_l:
+            return node.key, node.val
+        else:
+            k -= size_l + 1
+            node = node.right
+
+
+def insert(root, key, val):
+    """Return root of a new version with key set to val."""
+
+    if root is None:
+        return Node(key, val)
+
+    if key < root.key:
+        return balance(root.key, root.val, insert(root.left, key, val), root.right)
+
+    if key > root.key:
+        return balance(root.key, root.val, root.left, insert(root.right, key, val))
+
+    return Node(key, val, root.left, root.right)
+
+
+def pop_min(root):
+    """Get (min node, root of new version without it)."""
+
+    if root.left is None:
+        return root, root.right
+
+    min_node, left = pop_min(root.left)
+
+    return min_node, balance(root.key, root.val, left, root.right)
+
+
+def pop_max(root):
+    """Get (max node, root of new version without it)."""
+
+    if root.right is None:
+        return root, root.left
+
+    max_node, right = pop_max(root.right)
+
+    return max_node, balance(root.key, root.val, root.left, right)
+
+
+def glue(left, right):
+    """Join subtrees of a deleted node (all keys in left < all keys in right and sizes balanced)."""
+
+    if left is None:
+        return right
+    if right is None:
+        return left
+
+    # take replacement from the bigger side so result stays balanced
+    if left.size > right.size:
+        node, left = pop_max(left)
+    else:
+        node, right = pop_min(right)
+
+    return balance(node.key, node.val, left, right)
+
+
+def delete(root, key):
+    """Return root of a new version without key."""
+
+    if root is None:
+        raise KeyError(key)
+
+    if key < root.key:
+        return balance(root.key, root.val, delete(root.left, key), root.right)
+
+    if key > root.key:
+        return balance(root.key, root.val, root.left, delete(root.right, key))
+
+    return glue(root.left, root.right)
+
+
+def iterate(root):
+    """(key, val) pairs in key order."""
+
+    stack = []
+    node = root
+
+    while stack or node is not None:
+        while node is not None:
+            stack.append(node)
+            node = node.left
+        node = stack.pop()
+        yield node.key, node.val
+        node = node.right
+
+
+class PersistentMap(object):
+    """
+    Map whose versions share structure.
+
+    Changing the map replaces its root. snapshot() returns a map with the current root that later changes don't affect.
+    """
+
+    def __init__(self, root=None):
+
+        self.root = root
+
+    def snapshot(self):
+        return PersistentMap(self.root)
+
+    def __len__(self):
+        return size(self.root)
+
+    def __iter__(self):
+
+        for key, _ in iterate(self.root):
+            yield key
+
+    def items(self):
+        return iterate(self.root)
+
+    def __contains__(self, key):
+        return contains(self.root, key)
+
+    def get(self, key, default=None):
+        return get(self.root, key, default)
+
+    def __getitem__(self, key):
+
+        node = self.root
+
+        while node is not None:
+            if key == node.key:
+                return node.val
+            node = node.left if key < node.key else node.right
+
+        raise KeyError(key)
+
+    def __setitem__(self, key, val):
+        self.root = insert(self.root, key, val)
+
+    def __delitem__(self, key):
+        self.root = delete(self.root, key)
+
+    def rank(self, key):
+        """Number of keys less than key."""
+
+        return rank(self.root, key)
+
+    def select(self, k):
+        """(key, val) of the k-th smallest key (negative k counts from the end)."""
+
+        if k < 0:
+            k += size(self.root)
+
+        return select(self.root, k)
+
+    def set(self, key, val):
+        """Return a new map with key set to val (self is unchanged)."""
+
+        return PersistentMap(insert(self.root, key, val))
+
+    def remove(self, key):
+        """Return a new map without key (self is unchanged)."""
+
+        return PersistentMap(delete(self.root, key))
+
+
+def count_nodes(roots):
+    """Number of distinct nodes reachable from roots."""
+
+    seen = set()
+    stack = [root for root in roots if root is not None]
+
+    while stack:
+        node = stack.pop()
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        stack.extend(child for child in (node.left, node.right) if child is not None)
+
+    return len(seen)
+
+
+def benchmark_memory(num_keys=10000, num_versions=100000):
+    """Memory used keeping every version of a map through a run of random updates."""
+
+    import random
+    import sys
+    import tracemalloc
+
+    base = PersistentMap()
+    for key in random.sample(range(num_keys), num_keys):
+        base[key] = 0
+
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+
+    versions = [base]
+    m = base
+
+    for i in range(num_versions):
+        key = random.randrange(num_keys)
+        if key in m and random.random() < 0.3:
+            m = m.remove(key)
+        else:
+            m = m.set(key, i)
+        versions.append(m)
+
+    used = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+
+    node_bytes = sys.getsizeof(base.root)
+    total_size = sum(len(v) for v in versions)
+
+    return {
+        'bytes per version': used / num_versions,
+        'distinct nodes': count_nodes(v.root for v in versions),
+        'nodes without sharing': total_size,
+        'bytes without sharing (nodes only)': total_size * node_bytes,
+        'bytes used': used,
+    }
+
+
+if __name__ == '__main__':
+
+    import random
+
+    m = PersistentMap()
+    for c in 'dbacgefh':
+        m[c] = ord(c)
+
+    snap = m.snapshot()
+    del m['g']
+    m['z'] = 0
+
+    print(list(snap), list(m))
+
+    m = PersistentMap()
+    d = {}
+    versions = []
+
+    for i in range(20000):
+        key = random.randrange(1000)
+        if key in d and random.random() < 0.4:
+            del d[key]
+            del m[key]
+        else:
+            d[key] = m[key] = i
+        if i % 1000 == 0:
+            versions.append((m.snapshot(), dict(d)))
+
+    # old versions are unchanged and balanced
+    for v, expected in versions:
+        items = sorted(expected.items())
+        assert list(v.items()) == items
+        assert all(v.select(i) == item and v.rank(item[0]) == i for i, item in enumerate(items))
+
+    print({k: round(v) for k, v in benchmark_memory().items()})
@@ -0,0 +1,808 @@
+"""
+Map from strings to values supporting prefix queries, as a path compressed (radix/Patricia) trie.
+
+Summary:
+
+    A trie has one edge per character so a key shares nodes with every other key it has a prefix in common with. In a
+    radix trie chains of nodes with one child and no value are merged into a single edge labelled with a whole
+    substring, so the number of nodes is at most 2 * (number keys) no matter how long the keys are. Children are in a
+    dict keyed by the first character of their label (labels of siblings never share a first character).
+
+    * Insert walks down while the key starts with the child labels. If it stops partway through a label that edge is
+      split in two at the point the key and label differ.
+    * Delete removes the value and merges the node with its only child (or removes it when it has none) so the trie
+      stays compressed.
+    * Prefix queries walk down to the prefix (which may end partway through a label) and generate the subtree below.
+
+    FrozenRadixTrie is a read only version in one flat buffer (bytes or a memory mapped file): an array of fixed size
+    node records with children of a node stored next to each other, and all labels concatenated in one byte string.
+    Finding a child is `bytes.find` of its first byte in an array of first bytes of the node's children. Nothing is
+    deserialized on load so opening it is O(1) and processes mapping the same file share one copy of it in the OS page
+    cache. Keys are UTF-8 encoded in the frozen form and values are packed with a `struct` format (e.g. 'q' for 64 bit
+    ints).
+
+Characteristics:
+
+    * n number keys
+    * m length of key/prefix
+    * k number keys generated
+
+    Space: O(n) nodes (plus total length of distinct labels)
+
+    Search/insert/delete:
+        Worst Time: O(m)
+    Keys with prefix:
+        Worst Time: O(m + k * (key length)) -- keys are generated in sorted order
+    Longest prefix of:
+        Worst Time: O(m)
+
+File format:
+
+    A header (magic, version, number nodes, number keys, offsets of the node array, first byte array and labels, value
+    format -- little endian), the node array (label start, label length, first child, number children, has value,
+    value), the first byte of every node's label and then the labels. Node 0 is the root and the nodes are in breadth
+    first order.
+"""
+
+import mmap
+import struct
+import sys
+
+VERSION = 1
+HEADER = struct.Struct('<4sIQQQQQ16s')
+
+# node record without value
+NODE = '<IIIHB'
+
+# single byte strings for finding children
+BYTES = [bytes([i]) for i in range(256)]
+
+
+class Node(object):
+
+    __slots__ = ('label', 'children', 'has_val', 'val')
+
+    def __init__(self, label, val=None, has_val=False):
+
+        self.label = label
+        # first character of label -> child (None for a leaf so leaves don't each hold an empty dict)
+        self.children = None
+
+        self.has_val = has_val
+        self.val = val
+
+    def add_child(self, child):
+
+        if self.children is None:
+            self.children = {}
+
+        self.children[child.label[0]] = child
+
+
+def common_prefix_length(a, b, start=0):
+    """Length of common prefix of a[start:] and b."""
+
+    n = min(len(a) - start, len(b))
+    i = 0
+
+    while i < n and a[start + i] == b[i]:
+        i += 1
+
+    return i
+
+
+class RadixTrie(object):
+
+    def __init__(self, items=()):
+
+        self.root = Node('')
+        self.size = 0
+
+        for key, val in items:
+            self.insert(key, val)
+
+    def __len__(self):
+        return self.size
+
+    def find(self, key):
+        """Node for key (whether or not it has a value) or None."""
+
+        node = self.root
+        pos = 0
+
+        while pos < len(key):
+            if node.children is None:
+                return None
+
+            node = node.children.get(key[pos])
+
+            if node is None or not key.startswith(node.label, pos):
+                return None
+
+            pos += len(node.label)
+
+        return node
+
+    def __contains__(self, key):
+
+        node = self.find(key)
+
+        return node is not None and node.has_val
+
+    def get(self, key, default=None):
+
+        node = self.find(key)
+
+        return node.val if node is not None and node.has_val else default
+
+    def __getitem__(self, key):
+
+        node = self.find(key)
+
+        if node is None or not node.has_val:
+            raise KeyError(key)
+
+        return node.val
+
+    def __setitem__(self, key, val):
+        self.insert(key, val)
+
+    def __delitem__(self, key):
+        self.delete(key)
+
+    def insert(self, key, val):
+
+        node = self.root
+        pos = 0
+
+        while pos < len(key):
+            child = node.children.get(key[pos]) if node.children is not None else None
+
+            if child is None:
+                node.add_child(Node(key[pos:], val, True))
+                self.size += 1
+                return
+
+            label = child.label
+
+            if key.startswith(label, pos):
+                node = child
+                pos += len(label)
+                continue
+
+            # key leaves the edge partway through -- split the edge where they differ
+            i = common_prefix_length(key, label, pos)
+
+            mid = Node(label[:i])
+            child.label = label[i:]
+            mid.add_child(child)
+            node.children[label[0]] = mid
+
+            pos += i
+
+            if pos == len(key):
+                mid.val, mid.has_val = val, True
+            else:
+                mid.add_child(Node(key[pos:], val, True))
+
+            self.size += 1
+            return
+
+        if not node.has_val:
+            self.size += 1
+
+        node.val, node.has_val = val, True
+
+    def delete(self, key):
+        """Remove key and return its value."""
+
+        parent = None
+        node = self.root
+        pos = 0
+
+        while pos < len(key):
+            child = node.children.get(key[pos]) if node.children is not None else None
+
+            if child is None or not key.startswith(child.label, pos):
+                raise KeyError(key)
+
+            parent, node = node, child
+            pos += len(child.label)
+
+        if not node.has_val:
+            raise KeyError(key)
+
+        val = node.val
+        node.val, node.has_val = None, False
+        self.size -= 1
+
+        if node is self.root:
+            return val
+
+        if node.children is None:
+            del parent.children[node.label[0]]
+
+            if not parent.children:
+                parent.children = None
+            elif parent is not self.root and not parent.has_val and len(parent.children) == 1:
+                # parent was only branching for node -- merge it with its other child
+                self.merge_child(parent)
+
+        elif len(node.children) == 1:
+            self.merge_child(node)
+
+        return val
+
+    @staticmethod
+    def merge_child(node):
+        """Merge node (no value, one child) with its child in place (so node's parent needs no change)."""
+
+        child, = node.children.values()
+
+        node.label += child.label
+        node.children = child.children
+        node.val, node.has_val = child.val, child.has_val
+
+    def subtree(self, prefix):
+        """(node, key of node) for the highest node whose key starts with prefix or (None, None)."""
+
+        node = self.root
+        pos = 0
+
+        while pos < len(prefix):
+            child = node.children.get(prefix[pos]) if node.children is not None else None
+
+            if child is None:
+                return None, None
+
+            label = child.label
+
+            if prefix.startswith(label, pos):
+                node = child
+                pos += len(label)
+            elif label.startswith(prefix[pos:]):
+                # prefix ends partway through label
+                return child, prefix[:pos] + label
+            else:
+                return None, None
+
+        return node, prefix
+
+    def items(self, prefix=''):
+        """Generate (key, val) for keys starting with prefix in sorted order."""
+
+        node, key = self.subtree(prefix)
+
+        if node is None:
+            return
+
+        stack = [(node, key)]
+
+        while stack:
+            node, key = stack.pop()
+
+            if node.has_val:
+                yield key, node.val
+
+            if node.children is not None:
+                # reversed so smallest child is popped first
+                for _, child in sorted(node.children.items(), reverse=True):
+                    stack.append((child, key + child.label))
+
+    def keys_with_prefix(self, prefix):
+        """Generate keys starting with prefix in sorted order."""
+
+        for key, _ in self.items(prefix):
+            yield key
+
+    def __iter__(self):
+        return self.keys_with_prefix('')
+
+    def longest_prefix_of(self, s):
+        """(key, val) for the longest key that is a prefix of s or None."""
+
+        node = self.root
+        pos = 0
+        best = (s[:0], node.val) if node.has_val else None
+
+        while pos < len(s) and node.children is not None:
+            node = node.children.get(s[pos])
+
+            if node is None or not s.startswith(node.label, pos):
+                break
+
+            pos += len(node.label)
+
+            if node.has_val:
+                best = (s[:pos], node.val)
+
+        return best
+
+    def num_nodes(self):
+
+        count = 0
+        stack = [self.root]
+
+        while stack:
+            node = stack.pop()
+            count += 1
+            if node.children is not None:
+                stack.extend(node.children.values())
+
+        return count
+
+    def memory_usage(self):
+        """Approximate bytes used by nodes, labels and child dicts (not values)."""
+
+        total = 0
+        stack = [self.root]
+
+        while stack:
+            node = stack.pop()
+            total += sys.getsizeof(node) + sys.getsizeof(node.label)
+
+            if node.children is not None:
+                total += sys.getsizeof(node.children)
+                stack.extend(node.children.values())
+
+        return total
+
+    def freeze(self, val_format='q'):
+        """Serialize to bytes in FrozenRadixTrie format (values must fit val_format)."""
+
+        return FrozenRadixTrie.build(self.items(), val_format)
+
+
+def to_bytes(key):
+    return key.encode() if isinstance(key, str) else key
+
+
+class FrozenRadixTrie(object):
+    """
+    Read only radix trie over a flat buffer (see module docstring).
+
+    Keys may be given as str (UTF-8 encoded) or bytes and keys are returned as the same type as the query.
+    """
+
+    magic = b'RDXT'
+
+    def __init__(self, buf):
+
+        magic, version, num_nodes, size, nodes_offset, first_offset, labels_offset, val_format = HEADER.unpack_from(buf)
+
+        if magic != self.magic or version != VERSION:
+            raise ValueError('not a radix trie (or unsupported version)')
+
+        self.buf = buf
+        self.size = size
+        self.num_nodes = num_nodes
+        self.val_format = val_format.rstrip(b'\0').decode()
+
+        self.node_struct = struct.Struct(NODE + self.val_format)
+        self.nodes_offset = nodes_offset
+        self.first_offset = first_offset
+        self.labels_offset = labels_offset
+
+        if len(buf) < labels_offset:
+            raise ValueError('truncated radix trie')
+
+        self.file = self.mmap = None
+
+    @classmethod
+    def build(cls, items, val_format='q'):
+        """Serialize (key, val) items (keys distinct) to bytes."""
+
+        items = sorted((to_bytes(key), val) for key, val in items)
+        keys = [key for key, _ in items]
+
+        node_struct = struct.Struct(NODE + val_format)
+        empty_val = struct.unpack('<' + val_format, bytes(struct.calcsize('<' + val_format)))
+
+        records = []
+        first = bytearray()
+        labels = bytearray()
+
+        # breadth first so children of a node get consecutive indices -- (lo, hi, start) is a node for keys[lo: hi]
+        # whose label starts at start
+        queue = [(0, len(keys), 0)]
+        num_nodes = 1
+        i = 0
+
+        while i < len(queue):
+            lo, hi, start = queue[i]
+            i += 1
+
+            if i == 1:
+                # root label is always empty (lookups start below it)
+                depth = 0
+            elif hi - lo == 1:
+                depth = len(keys[lo])
+            else:
+                # common prefix of a sorted range is common prefix of its first and last keys
+                depth = start + common_prefix_length(keys[lo], keys[hi - 1][start:], start)
+
+            label = keys[lo][start: depth] if lo < hi else b''
+
+            has_val = lo < hi and len(keys[lo]) == depth
+            val = items[lo][1] if has_val else None
+
+            # children are runs of keys with the same byte after the label
+            first_child = num_nodes
+            j = lo + 1 if has_val else lo
+            while j < hi:
+                b = keys[j][depth]
+                k = j + 1
+                while k < hi and keys[k][depth] == b:
+                    k += 1
+                queue.append((j, k, depth))
+                num_nodes += 1
+                j = k
+
+            fields = (len(labels), len(label), first_child, num_nodes - first_child, has_val)
+            if has_val:
+                fields += val if isinstance(val, tuple) else (val,)
+            else:
+                fields += empty_val
+
+            records.append(node_struct.pack(*fields))
+            first.append(label[0] if label else 0)
+            labels += label
+
+        nodes_offset = HEADER.size
+        first_offset = nodes_offset + len(records) * node_struct.size
+        labels_offset = first_offset + len(first)
+
+        header = HEADER.pack(cls.magic, VERSION, len(records), len(keys), nodes_offset, first_offset, labels_offset,
+                             val_format.encode())
+
+        return b''.join([header, b''.join(records), bytes(first), bytes(labels)])
+
+    def save(self, path):
+
+        with open(path, 'wb') as f:
+            f.write(self.buf)
+
+    @classmethod
+    def load(cls, path):
+        """Read trie from file into memory."""
+
+        with open(path, 'rb') as f:
+            return cls(f.read())
+
+    @classmethod
+    def open(cls, path):
+        """Memory map trie from file without reading it into memory."""
+
+        f = open(path, 'rb')
+
+        try:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            f.close()
+            raise
+
+        try:
+            trie = cls(mm)
+        except Exception:
+            mm.close()
+            f.close()
+            raise
+
+        trie.file = f
+        trie.mmap = mm
+
+        return trie
+
+    def close(self):
+
+        if self.mmap is None:
+            return
+
+        self.mmap.close()
+        self.file.close()
+
+        self.buf = self.mmap = self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __len__(self):
+        return self.size
+
+    def node(self, i):
+        """(label start, label length, first child, number children, has value, *value) of node i."""
+
+        return self.node_struct.unpack_from(self.buf, self.nodes_offset + i * self.node_struct.size)
+
+    def label(self, record):
+
+        start = self.labels_offset + record[0]
+
+        return self.buf[start: start + record[1]]
+
+    def value(self, record):
+
+        val = record[5:]
+
+        return val[0] if len(val) == 1 else val
+
+    def child(self, record, b):
+        """Index of child of node (given its record) whose label starts with byte b or -1."""
+
+        start = self.first_offset + record[2]
+        idx = self.buf.find(BYTES[b], start, start + record[3])
+
+        return idx - self.first_offset if idx >= 0 else -1
+
+    def find(self, key):
+        """Record of node for key (bytes) or None."""
+
+        record = self.node(0)
+        pos = 0
+
+        while pos < len(key):
+            i = self.child(record, key[pos])
+
+            if i < 0:
+                return None
+
+            record = self.node(i)
+
+            if not key.startswith(self.label(record), pos):
+                return None
+
+            pos += record[1]
+
+        return record
+
+    def __contains__(self, key):
+
+        record = self.find(to_bytes(key))
+
+        return record is not None and record[4]
+
+    def get(self, key, default=None):
+
+        record = self.find(to_bytes(key))
+
+        return self.value(record) if record is not None and record[4] else default
+
+    def __getitem__(self, key):
+
+        record = self.find(to_bytes(key))
+
+        if record is None or not record[4]:
+            raise KeyError(key)
+
+        return self.value(record)
+
+    def items(self, prefix=''):
+        """Generate (key, val) for keys starting with prefix in sorted order."""
+
+        decode = isinstance(prefix, str)
+        prefix = to_bytes(prefix)
+
+        record = self.node(0)
+        pos = 0
+
+        while pos < len(prefix):
+            i = self.child(record, prefix[pos])
+
+            if i < 0:
+                return
+
+            record = self.node(i)
+            label = self.label(record)
+
+            if prefix.startswith(label, pos):
+                pos += len(label)
+            elif label.startswith(prefix[pos:]):
+                break
+            else:
+                return
+
+        key = prefix[:pos] + (self.label(record) if pos < len(prefix) else b'')
+
+        # children are stored sorted by first byte
+        stack = [(record, key)]
+
+        while stack:
+            record, key = stack.pop()
+
+            if record[4]:
+                yield (key.decode() if decode else key), self.value(record)
+
+            for i in range(record[2] + record[3] - 1, record[2] - 1, -1):
+                child = self.node(i)
+                stack.append((child, key + self.label(child)))
+
+    def keys_with_prefix(self, prefix):
+        """Generate keys starting with prefix in sorted order."""
+
+        for key, _ in self.items(prefix):
+            yield key
+
+    def __iter__(self):
+        return self.keys_with_prefix('')
+
+    def longest_prefix_of(self, s):
+        """(key, val) for the longest key that is a prefix of s or None."""
+
+        decode = isinstance(s, str)
+        s = to_bytes(s)
+
+        record = self.node(0)
+        pos = 0
+        best = (0, record) if record[4] else None
+
+        while pos < len(s):
+            i = self.child(record, s[pos])
+
+            if i < 0:
+                break
+
+            record = self.node(i)
+
+            if not s.startswith(self.label(record), pos):
+                break
+
+            pos += record[1]
+
+            if record[4]:
+                best = (pos, record)
+
+        if best is None:
+            return None
+
+        key = s[:best[0]]
+
+        return (key.decode() if decode else key), self.value(best[1])
+
+
+def dict_trie_memory(keys):
+    """Bytes allocated building a per character dict trie of keys (aho_corasick's Node)."""
+
+    import tracemalloc
+    from string_search.aho_corasick import construct_trie
+
+    tracemalloc.start()
+    root = construct_trie(*keys)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    del root
+
+    return used
+
+
+def random_urls(n, seed=0):
+    """URL like keys sharing hosts and path segments."""
+
+    import random
+
+    rng = random.Random(seed)
+
+    words = ['api', 'v1', 'v2', 'users', 'items', 'orders', 'search', 'static', 'img', 'docs', 'blog', 'cart', 'admin',
+             'settings', 'profile', 'reports', 'export', 'media', 'assets', 'help']
+    hosts = ['https://{}.example{}.com'.format(rng.choice(words), i) for i in range(max(1, n // 100))]
+
+    urls = set()
+
+    while len(urls) < n:
+        segments = [rng.choice(words) for _ in range(rng.randint(1, 4))]
+        segments.append(str(rng.randrange(100000)))
+        urls.add(rng.choice(hosts) + '/' + '/'.join(segments))
+
+    return sorted(urls)
+
+
+def benchmark(n=100000):
+
+    import os
+    import random
+    import tempfile
+    import time
+    import tracemalloc
+
+    urls = random_urls(n)
+    # the same order for every structure
+    random.Random(1).shuffle(urls)
+
+    tracemalloc.start()
+    trie = RadixTrie()
+    for i, url in enumerate(urls):
+        trie.insert(url, i)
+    radix_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    path = os.path.join(tempfile.mkdtemp(), 'urls.rdx')
+    with open(path, 'wb') as f:
+        f.write(trie.freeze())
+
+    dict_bytes = dict_trie_memory(urls)
+
+    print('{} urls ({} characters)'.format(n, sum(map(len, urls))))
+    print('    dict trie:   {:6.1f} MB allocated'.format(dict_bytes / 2 ** 20))
+    print('    radix trie:  {:6.1f} MB allocated ({:.1f} MB reported by memory_usage, {} nodes)'.format(
+        radix_bytes / 2 ** 20, trie.memory_usage() / 2 ** 20, trie.num_nodes()))
+    print('    frozen trie: {:6.1f} MB file'.format(os.path.getsize(path) / 2 ** 20))
+
+    from string_search.aho_corasick import construct_trie
+
+    root = construct_trie(*urls)
+
+    def dict_get(key):
+        node = root
+        for c in key:
+            node = node.paths.get(c)
+            if node is None:
+                return None
+        return node.out
+
+    t0 = time.perf_counter()
+    frozen = FrozenRadixTrie.open(path)
+    open_time = time.perf_counter() - t0
+
+    queries = urls[:20000] + [url + 'x' for url in urls[:20000]]
+
+    for name, get in [('dict trie', dict_get), ('radix trie', trie.get), ('frozen trie (mmap)', frozen.get)]:
+        t0 = time.perf_counter()
+        for q in queries:
+            get(q)
+        print('    {:20s} {:8.0f} lookups/s'.format(name, len(queries) / (time.perf_counter() - t0)))
+
+    print('    opened frozen trie in {:.1f} ms'.format(open_time * 1000))
+
+    frozen.close()
+    os.remove(path)
+
+
+if __name__ == '__main__':
+
+    import random
+
+    t = RadixTrie()
+    for w in ['romane', 'romanus', 'romulus', 'rubens', 'ruber', 'rubicon', 'rubicundus', 'rom']:
+        t[w] = len(w)
+
+    assert list(t.keys_with_prefix('rub')) == ['rubens', 'ruber', 'rubicon', 'rubicundus']
+    assert list(t.keys_with_prefix('ro')) == ['rom', 'romane', 'romanus', 'romulus']
+    assert list(t.keys_with_prefix('romu')) == ['romulus']
+    assert t.longest_prefix_of('romanesque') == ('romane', 6)
+    assert t.longest_prefix_of('rubi') is None
+
+    del t['romane']
+    assert 'romane' not in t and t['romanus'] == 7
+
+    # random words from a small alphabet so keys share lots of prefixes
+    rng = random.Random(0)
+    d = {}
+    t = RadixTrie()
+    for i in range(20000):
+        key = ''.join(rng.choice('abc') for _ in range(rng.randint(0, 8)))
+        if key in d and rng.random() < 0.5:
+            assert t.delete(key) == d.pop(key)
+        else:
+            d[key] = t[key] = i
+
+    assert list(t.items()) == sorted(d.items()) and len(t) == len(d)
+    # deletes keep the trie compressed
+    assert t.num_nodes() == RadixTrie(d.items()).num_nodes()
+
+    frozen = FrozenRadixTrie(t.freeze())
+    assert list(frozen.items()) == sorted(d.items())
+
+    for prefix in ['', 'a', 'ab', 'cab', 'abcabca', 'x']:
+        expected = sorted(k for k in d if k.startswith(prefix))
+        assert list(t.keys_with_prefix(prefix)) == expected
+        assert list(frozen.keys_with_prefix(prefix)) == expected
+
+    for s in ['abcabcabcab', 'cccccccc', 'x', '']:
+        expected = max((k for k in d if s.startswith(k)), key=len, default=None)
+        expected = None if expected is None else (expected, d[expected])
+        assert t.longest_prefix_of(s) == expected == frozen.longest_prefix_of(s)
+
+    benchmark()
@@ -13,9 +13,21 @@ Summary:
 
     See operations section of wikipedia for details: wikipedia.org/wiki/Red–black_tree#Operations
 
+    All leaves are one shared black NIL node (instead of two new leaf nodes per key) and nodes use __slots__ so a tree
+    needs one small object per key.
+
+    A tree can also be built from sorted items in O(n) and trees combined with join based set operations: join(l, k, r)
+    hangs k and the shorter tree off the spine of the taller one at equal black height and repairs like an insert
+    (O(difference in heights)). split, union and difference are built from join (Blelloch et al. "Just Join for
+    Parallel Ordered Sets").
+
+    Each node also stores the size of its subtree (kept up to date on insert/delete and in rotations). That gives rank
+    (number of keys less than a key) and select (k-th smallest key) by walking one path from the root.
+
 Characteristics:
 
     * n number elements
+    * k number elements generated
 
     Search:
         Worst Time: O(logn)
@@ -23,30 +35,36 @@ Characteristics:
         Worst Time: O(logn)
     Delete:
         Worst Time: O(logn)
+    Floor/ceiling/rank/select:
+        Worst Time: O(logn)
+    Range:
+        Worst Time: O(logn + k)
 """
 
 KEY_LEAF = object()
 
+RED = True
+BLACK = False
+
 
 class Node(object):
 
-    def __init__(self, key, val=None, color='r', parent=None, left=True, right=True):
+    __slots__ = ('key', 'val', 'color', 'size', 'parent', 'left', 'right')
+
+    def __init__(self, key, val=None, color=RED, parent=None, left=None, right=None):
 
         self.key = key
         self.val = val
         self.color = color
 
-        self.parent = parent
+        # number of keys in subtree rooted here
+        self.size = 1
 
-        if left:
-            self.left = Node(KEY_LEAF, color='b', parent=self, left=False, right=False)
-        else:
-            self.left = None
+        self.parent = parent
 
-        if right:
-            self.right = Node(KEY_LEAF, color='b', parent=self, left=False, right=False)
-        else:
-            self.left = None
+        # all leaves are the shared NIL node
+        self.left = NIL if left is None else left
+        self.right = NIL if right is None else right
 
     def __lt__(self, other):
         return self.key < other.key
@@ -59,18 +77,10 @@ class Node(object):
 
     def __contains__(self, key):
 
-        if self.is_leaf:
-            return False
-
-        if self.key == key:
-            return True
-
-        if key < self.key:
-            return key in self.left
-        return key in self.right
+        return find(self, key) is not None
 
     def create_string(self, indent):
-        string = str(self.key) + ' ' + self.color + '---+'
+        string = str(self.key) + ' ' + ('r' if self.color else 'b') + '---+'
         if self.left.key is not KEY_LEAF:
             string += '\n(l)' + indent + self.left.create_string(indent + '    ')
         if self.right.key is not KEY_LEAF:
@@ -79,15 +89,7 @@ class Node(object):
 
     def ordered_elems(self):
 
-        parts = []
-
-        if self.left.key is not KEY_LEAF:
-            parts += self.left.ordered_elems()
-        parts.append((self.key, self.val))
-        if self.right.key is not KEY_LEAF:
-            parts += self.right.ordered_elems()
-
-        return parts
+        return list(iter_range(self))
 
     @property
     def grandparent(self):
@@ -117,13 +119,38 @@ class Node(object):
 
     @property
     def is_leaf(self):
-        return self.key is KEY_LEAF
+        return self is NIL
+
+
+# Shared black leaf. Never changed (delete passes parents explicitly) so trees in different threads can share it.
+NIL = Node.__new__(Node)
+NIL.key = KEY_LEAF
+NIL.val = None
+NIL.color = BLACK
+NIL.size = 0
+NIL.parent = None
+NIL.left = NIL.right = None
+
+
+def find(root, key):
+    """Node with key (None if not present)."""
+
+    node = root
+
+    while node is not NIL:
+        if key == node.key:
+            return node
+        node = node.left if key < node.key else node.right
+
+    return None
 
 
 def insert(root, key, val):
 
     node = Node(key, val)
-    insert_add_node(root, node)
+
+    if not insert_add_node(root, node):
+        return root
 
     insert_repair(node, root)
 
@@ -134,16 +161,18 @@ def insert(root, key, val):
 
 
 def insert_repair(node, root):
+    """Fix red node with red parent. Return True if it reached the root (black height of the tree grew by 1)."""
 
     if not node.parent:
-        node.color = 'b'
-    elif node.parent.color == 'b':
+        node.color = BLACK
+        return True
+    elif node.parent.color == BLACK:
         pass
-    elif node.uncle.color == 'r':
+    elif node.uncle.color == RED:
         # both parent and uncle are red
-        node.parent.color = node.uncle.color = 'b'
-        node.grandparent.color = 'r'
-        insert_repair(node.grandparent, root)
+        node.parent.color = node.uncle.color = BLACK
+        node.grandparent.color = RED
+        return insert_repair(node.grandparent, root)
     else:
         # parent red, uncle black
         if not node.grandparent.left.is_leaf and node is node.grandparent.left.right:
@@ -164,8 +193,10 @@ def insert_repair(node, root):
         else:
             rotate_left(grandparent)
 
-        parent.color = 'b'
-        grandparent.color = 'r'
+        parent.color = BLACK
+        grandparent.color = RED
+
+    return False
 
 
 def rotate_left(node):
@@ -183,13 +214,16 @@ def rotate_left(node):
 
     # update node-right child
     node.right = new_node.left
-    if node.right:
+    if node.right is not NIL:
         node.right.parent = node
 
     # update new_node-node (left child)
     new_node.left = node
     new_node.left.parent = new_node
 
+    new_node.size = node.size
+    node.size = node.left.size + node.right.size + 1
+
 
 def rotate_right(node):
 
@@ -206,44 +240,88 @@ def rotate_right(node):
 
     # update node-left child
     node.left = new_node.right
-    if node.left:
+    if node.left is not NIL:
         node.left.parent = node
 
     # update new_node-node (right child)
     new_node.right = node
     new_node.right.parent = new_node
 
+    new_node.size = node.size
+    node.size = node.left.size + node.right.size + 1
+
 
 def insert_add_node(root, node):
+    """Add node as a leaf below root. If key already present update its value instead and return False."""
 
-    if not root.is_leaf:
-        if node < root:
-            if not root.left.is_leaf:
-                insert_add_node(root.left, node)
-                return
-            else:
-                root.left = node
-        else:
-            if not root.right.is_leaf:
-                insert_add_node(root.right, node)
-                return
-            else:
-                root.right = node
+    parent = root
+
+    while True:
+        if node.key == parent.key:
+            parent.val = node.val
+            return False
+
+        child = parent.left if node < parent else parent.right
+        if child.is_leaf:
+            break
+        parent = child
+
+    if node < parent:
+        parent.left = node
+    else:
+        parent.right = node
+
+    node.parent = parent
+    node.color = RED
+
+    update_sizes(parent, 1)
 
-    node.parent = root
-    node.color = 'r'
+    return True
+
+
+def update_sizes(node, delta):
+    """Add delta to subtree sizes of node and its ancestors."""
+
+    while node:
+        node.size += delta
+        node = node.parent
 
 
 def check_parents(root):
 
-    if root.left:
-        assert root.left.parent == root
+    if root.left is not NIL:
+        assert root.left.parent is root
         check_parents(root.left)
-    if root.right:
-        assert root.right.parent == root
+    if root.right is not NIL:
+        assert root.right.parent is root
         check_parents(root.right)
 
 
+def check_sizes(root):
+
+    if root.is_leaf:
+        return 0
+
+    assert root.size == check_sizes(root.left) + check_sizes(root.right) + 1
+
+    return root.size
+
+
+def check_colors(root):
+    """Check no red node has a red child and all paths have the same number of black nodes. Return black height."""
+
+    if root is NIL:
+        return 1
+
+    if root.color == RED:
+        assert root.left.color == BLACK and root.right.color == BLACK
+
+    black_height = check_colors(root.left)
+    assert black_height == check_colors(root.right)
+
+    return black_height + (root.color == BLACK)
+
+
 def get_min_max_heights(root: Node, level=0):
 
     if root.is_leaf:
@@ -257,7 +335,7 @@ def get_min_max_heights(root: Node, level=0):
 
 def delete(root, key):
 
-    node = delete_get_node(root, Node(key))
+    node = delete_get_node(root, key)
 
     if node is None:
         raise KeyError
@@ -269,139 +347,150 @@ def delete(root, key):
     node = replace_with_pred_or_succ(node)
 
     child = node.right if node.left.is_leaf else node.left
+    parent = node.parent
 
-    child.parent = node.parent
-    if node.is_left_child:
-        node.parent.left = child
+    # (parent is passed along explicitly since the shared NIL leaf has no parent of its own)
+    if child is not NIL:
+        child.parent = parent
+    if parent.left is node:
+        parent.left = child
     else:
-        node.parent.right = child
+        parent.right = child
 
-    if node.color == 'r' or child.color == 'r':
-        child.color = 'b'
-    else:
+    update_sizes(parent, -1)
+
+    if child.color == RED:
+        child.color = BLACK
+    elif node.color == BLACK:
         # node black and child black -> child must be leaf here since replacement only has maximum one child
-        delete_case1(child)
+        delete_case1(child, parent)
 
-    root = child
+    root = parent
     while root.parent:
         root = root.parent
 
     return root
 
 
-def delete_case1(node):
-    """Correct black height of paths through node (since it is 1 less than others)."""
+def sibling_of(node, parent):
+    return parent.right if node is parent.left else parent.left
+
+
+def delete_case1(node, parent):
+    """Correct black height of paths through node (since it is 1 less than others). node may be NIL."""
 
     # if deleted node was root, then removed one black node from each path so black heights equal
 
-    if node.parent:
-        delete_case2(node)
+    if parent:
+        delete_case2(node, parent)
 
 
-def delete_case2(node):
+def delete_case2(node, parent):
 
-    sibling = node.sibling
+    sibling = sibling_of(node, parent)
 
-    if sibling.color == 'r':
+    if sibling.color == RED:
 
-        node.parent.color = 'r'
-        sibling.color = 'b'
+        parent.color = RED
+        sibling.color = BLACK
 
-        if node.is_left_child:
-            rotate_left(node.parent)
+        # node stays a child of parent
+        if node is parent.left:
+            rotate_left(parent)
         else:
-            rotate_right(node.parent)
+            rotate_right(parent)
 
-    delete_case3(node)
+    delete_case3(node, parent)
 
 
-def delete_case3(node: Node):
+def delete_case3(node, parent):
 
-    sibling = node.sibling
+    sibling = sibling_of(node, parent)
 
     b = all([
-        node.parent.color == 'b',
-        sibling.color == 'b',
-        sibling.left.color == 'b',
-        sibling.right.color == 'b'
+        parent.color == BLACK,
+        sibling.color == BLACK,
+        sibling.left.color == BLACK,
+        sibling.right.color == BLACK
     ])
 
     if b:
         # coloring sibling red means all paths through parents have black height - 1
-        sibling.color = 'r'
+        sibling.color = RED
         # rebalance parent
-        delete_case1(node.parent)
+        delete_case1(parent, parent.parent)
     else:
-        delete_case4(node)
+        delete_case4(node, parent)
 
 
-def delete_case4(node: Node):
+def delete_case4(node, parent):
 
-    sibling = node.sibling
+    sibling = sibling_of(node, parent)
 
     b = all([
-        sibling.parent.color == 'r',
-        sibling.color == 'b',
-        sibling.left.color == 'b',
-        sibling.right.color == 'b'
+        parent.color == RED,
+        sibling.color == BLACK,
+        sibling.left.color == BLACK,
+        sibling.right.color == BLACK
     ])
 
     if b:
         # parent red, sibling black -> switching colors corrects black height through node by increasing it 1
-        sibling.color = 'r'
-        sibling.parent.color = 'b'
+        sibling.color = RED
+        parent.color = BLACK
     else:
-        delete_case5(node)
+        delete_case5(node, parent)
 
 
-def delete_case5(node: Node):
+def delete_case5(node, parent):
 
-    sibling = node.sibling
+    sibling = sibling_of(node, parent)
+    is_left = node is parent.left
 
     # force sibling to be black with red child - this doesn't change black height
-    if sibling.color == 'b':
+    if sibling.color == BLACK:
 
         b1 = all([
-            node.is_left_child,
-            sibling.right.color == 'b',
-            sibling.left.color == 'r'
+            is_left,
+            sibling.right.color == BLACK,
+            sibling.left.color == RED
         ])
 
         b2 = all([
-            node.is_right_child,
-            sibling.left.color == 'b',
-            sibling.right.color == 'r'
+            not is_left,
+            sibling.left.color == BLACK,
+            sibling.right.color == RED
         ])
 
         if b1:
-            sibling.color = 'r'
-            sibling.left.color = 'b'
+            sibling.color = RED
+            sibling.left.color = BLACK
 
             rotate_right(sibling)
         elif b2:
-            sibling.color = 'r'
-            sibling.right.color = 'b'
+            sibling.color = RED
+            sibling.right.color = BLACK
 
             rotate_left(sibling)
 
-    delete_case6(node)
+    delete_case6(node, parent)
 
 
-def delete_case6(node: Node):
+def delete_case6(node, parent):
 
-    sibling = node.sibling
+    sibling = sibling_of(node, parent)
 
     # sibling's outside child is red
 
-    sibling.color = node.parent.color
-    node.parent.color = 'b'
+    sibling.color = parent.color
+    parent.color = BLACK
 
-    if node.is_left_child:
-        sibling.right.color = 'b'
-        rotate_left(node.parent)
+    if node is parent.left:
+        sibling.right.color = BLACK
+        rotate_left(parent)
     else:
-        sibling.left.color = 'b'
-        rotate_right(node.parent)
+        sibling.left.color = BLACK
+        rotate_right(parent)
 
 
 def replace_with_pred_or_succ(node: Node):
@@ -426,22 +515,636 @@ def replace_with_pred_or_succ(node: Node):
     return replacement
 
 
-def delete_get_node(root: Node, node: Node):
+def delete_get_node(root: Node, key):
 
-    if root.is_leaf:
+    return find(root, key)
+
+
+def floor(root, key):
+    """Node with greatest key <= key (None if there is none)."""
+
+    best = None
+    node = root
+
+    while node is not NIL:
+        if key == node.key:
+            return node
+        if key < node.key:
+            node = node.left
+        else:
+            best = node
+            node = node.right
+
+    return best
+
+
+def ceiling(root, key):
+    """Node with smallest key >= key (None if there is none)."""
+
+    best = None
+    node = root
+
+    while node is not NIL:
+        if key == node.key:
+            return node
+        if key > node.key:
+            node = node.right
+        else:
+            best = node
+            node = node.left
+
+    return best
+
+
+def iter_range(root, lo=None, hi=None):
+    """
+    Generate (key, val) with lo <= key < hi in order (None for no bound).
+
+    Walks the tree with a stack of O(logn) nodes so nothing is materialized and subtrees below lo are skipped.
+    """
+
+    stack = []
+    node = root
+
+    while stack or node is not NIL:
+
+        while node is not NIL:
+            if lo is not None and node.key < lo:
+                node = node.right
+            else:
+                stack.append(node)
+                node = node.left
+
+        if not stack:
+            return
+
+        node = stack.pop()
+
+        if hi is not None and not node.key < hi:
+            return
+
+        yield node.key, node.val
+
+        node = node.right
+
+
+def rank(root, key):
+    """Number of keys < key."""
+
+    r = 0
+    node = root
+
+    while node is not NIL:
+        if node.key < key:
+            r += node.left.size + 1
+            node = node.right
+        else:
+            node = node.left
+
+    return r
+
+
+def select(root, k):
+    """Node with k-th smallest key (0 indexed)."""
+
+    if not 0 <= k < root.size:
+        raise IndexError
+
+    node = root
+
+    while True:
+        size_left = node.left.size
+
+        if k < size_left:
+            node = node.left
+        elif k == size_left:
+            return node
+        else:
+            k -= size_left + 1
+            node = node.right
+
+
+def from_sorted(items):
+    """
+    Root of a tree holding (key, val) items given in increasing key order (None if there are none).
+
+    The middle item becomes the root and each half is built the same way, so the tree is as balanced as possible. Every
+    level is full except maybe the bottom one and coloring the nodes on an incomplete bottom level red (all others
+    black) gives every path the same number of black nodes. No rotations are needed and keys are only compared to
+    check they are strictly increasing (ValueError if not).
+    """
+
+    checked = []
+    append = checked.append
+
+    for item in items:
+        if checked and not checked[-1][0] < item[0]:
+            raise ValueError('keys not strictly increasing: {!r} then {!r}'.format(checked[-1][0], item[0]))
+        append(item)
+
+    items = checked
+    n = len(items)
+
+    if not n:
         return None
 
-    if node < root:
-        return delete_get_node(root.left, node)
-    elif node > root:
-        return delete_get_node(root.right, node)
+    # levels 0..red_depth - 1 are full
+    red_depth = (n + 1).bit_length() - 1
 
-    return root
+    def build(lo, hi, depth):
+
+        if lo >= hi:
+            return NIL
+
+        mid = (lo + hi) // 2
+        key, val = items[mid]
+
+        node = Node(key, val, RED if depth == red_depth else BLACK)
+        node.size = hi - lo
+
+        node.left = build(lo, mid, depth + 1)
+        node.right = build(mid + 1, hi, depth + 1)
+
+        if node.left is not NIL:
+            node.left.parent = node
+        if node.right is not NIL:
+            node.right.parent = node
+
+        return node
+
+    return build(0, n, 0)
+
+
+def black_height(root):
+    """Number of black nodes on each path from root to a leaf (not counting the leaf)."""
+
+    h = 0
+    node = root
+
+    while node is not NIL:
+        h += node.color == BLACK
+        node = node.left
+
+    return h
+
+
+def detach(root, h):
+    """
+    Make subtree at root (with black height h) a tree on its own: no parent and a black root.
+
+    Get (root, black height).
+    """
+
+    if root is NIL:
+        return root, 0
+
+    root.parent = None
+
+    if root.color == RED:
+        root.color = BLACK
+        h += 1
+
+    return root, h
+
+
+def join_right(left, hl, node, right, hr):
+    """Join when left is taller: hang node (with right as its right child) off the right spine of left."""
+
+    # find black node on right spine of left with the same black height as right
+    parent, child, h = None, left, hl
+    while child.color == RED or h != hr:
+        h -= child.color == BLACK
+        parent, child = child, child.right
+
+    node.color = RED
+    node.parent = parent
+    node.left, node.right = child, right
+    node.size = child.size + right.size + 1
+
+    for c in (child, right):
+        if c is not NIL:
+            c.parent = node
+
+    parent.right = node
+    update_sizes(parent, right.size + 1)
+
+    hl += insert_repair(node, left)
+
+    # a rotation at the root pushes it down one level
+    return (left if left.parent is None else left.parent), hl
+
+
+def join_left(left, hl, node, right, hr):
+    """Join when right is taller: hang node (with left as its left child) off the left spine of right."""
+
+    parent, child, h = None, right, hr
+    while child.color == RED or h != hl:
+        h -= child.color == BLACK
+        parent, child = child, child.left
+
+    node.color = RED
+    node.parent = parent
+    node.left, node.right = left, child
+    node.size = left.size + child.size + 1
+
+    for c in (left, child):
+        if c is not NIL:
+            c.parent = node
+
+    parent.left = node
+    update_sizes(parent, left.size + 1)
+
+    hr += insert_repair(node, right)
+
+    return (right if right.parent is None else right.parent), hr
+
+
+def join_h(left, hl, node, right, hr):
+    """
+    Tree with keys of left, node and right (keys in left < node.key < keys in right). Trees have black roots.
+
+    Get (root, black height). Takes O(|hl - hr|) time.
+    """
+
+    if hl > hr:
+        return join_right(left, hl, node, right, hr)
+    if hl < hr:
+        return join_left(left, hl, node, right, hr)
+
+    node.color = BLACK
+    node.parent = None
+    node.left, node.right = left, right
+    node.size = left.size + right.size + 1
+
+    for c in (left, right):
+        if c is not NIL:
+            c.parent = node
+
+    return node, hl + 1
+
+
+def split_h(root, h, key):
+    """
+    Split tree into nodes with keys < key and keys > key (reusing nodes).
+
+    Get (left, left black height, node with key or None, right, right black height).
+    """
+
+    if root is NIL:
+        return NIL, 0, None, NIL, 0
+
+    left, hl = detach(root.left, h - 1)
+    right, hr = detach(root.right, h - 1)
+
+    if key < root.key:
+        ll, hll, found, lr, hlr = split_h(left, hl, key)
+        right, hr = join_h(lr, hlr, root, right, hr)
+        return ll, hll, found, right, hr
+
+    if key > root.key:
+        rl, hrl, found, rr, hrr = split_h(right, hr, key)
+        left, hl = join_h(left, hl, root, rl, hrl)
+        return left, hl, found, rr, hrr
+
+    return left, hl, root, right, hr
+
+
+def pop_last_h(root, h):
+    """Remove node with greatest key. Get (root, black height, removed node)."""
+
+    node = root
+    while node.right is not NIL:
+        node = node.right
+
+    last = Node(node.key, node.val)
+
+    root = delete(root, node.key)
+
+    if root is None:
+        return NIL, 0, last
+
+    root, _ = detach(root, 0)
+
+    return root, black_height(root), last
+
+
+def insert_all_h(root, other, overwrite):
+    """Insert items of tree other into tree root one by one (keeping values already in root unless overwrite)."""
+
+    for key, val in iter_range(other):
+        if overwrite or find(root, key) is None:
+            root = insert(root, key, val)
+
+    return root, black_height(root)
+
+
+# union inserts the keys of the smaller tree one by one when it has fewer than this fraction of the keys of the larger
+# one -- walking down for each insert costs less than splitting and joining until the sizes are close
+UNION_INSERT_RATIO = 0.25
+
+
+def union_h(root1, h1, root2, h2):
+
+    if root1 is NIL:
+        return root2, h2
+    if root2 is NIL:
+        return root1, h1
+
+    if root2.size < UNION_INSERT_RATIO * root1.size:
+        return insert_all_h(root1, root2, True)
+    if root1.size < UNION_INSERT_RATIO * root2.size:
+        return insert_all_h(root2, root1, False)
+
+    left1, hl1 = detach(root1.left, h1 - 1)
+    right1, hr1 = detach(root1.right, h1 - 1)
+
+    left2, hl2, found, right2, hr2 = split_h(root2, h2, root1.key)
+
+    if found is not None:
+        root1.val = found.val
+
+    left, hl = union_h(left1, hl1, left2, hl2)
+    right, hr = union_h(right1, hr1, right2, hr2)
+
+    return join_h(left, hl, root1, right, hr)
+
+
+def difference_h(root1, h1, root2):
+
+    if root1 is NIL or root2 is NIL:
+        return root1, h1
+
+    left1, hl1, _, right1, hr1 = split_h(root1, h1, root2.key)
+
+    left, hl = difference_h(left1, hl1, root2.left)
+    right, hr = difference_h(right1, hr1, root2.right)
+
+    # join without a middle node
+    if left is NIL:
+        return right, hr
+
+    left, hl, last = pop_last_h(left, hl)
+
+    return join_h(left, hl, last, right, hr)
+
+
+def as_tree(root):
+    """(root, black height) of root which may be None for an empty tree."""
+
+    if root is None:
+        return NIL, 0
+
+    return detach(root, black_height(root))
+
+
+def as_root(root):
+    return None if root is NIL else root
+
+
+def split(root, key):
+    """
+    Split tree into trees with keys < key and keys > key. Nodes are reused so root is no longer valid.
+
+    Get (left root, node with key or None, right root).
+    """
+
+    left, _, found, right, _ = split_h(*as_tree(root), key)
+
+    return as_root(left), found, as_root(right)
+
+
+def union(root1, root2):
+    """
+    Root of tree with keys of both trees (values from root2 for keys in both). Nodes are reused so neither root is
+    valid afterwards.
+
+    By splitting root2 with the keys of root1 (joining the pieces back together) it takes O(m log(n/m + 1)) for sizes
+    m <= n instead of O(m logn) for inserting one tree into the other. Splitting and joining cost several times more
+    per key than an insert though, so (at every level of the recursion) a tree with fewer than UNION_INSERT_RATIO
+    times the keys of the other is inserted into it one key at a time instead -- in practice the join based union only
+    pays off for trees of similar size.
+    """
+
+    return as_root(union_h(*as_tree(root1), *as_tree(root2))[0])
+
+
+def difference(root1, root2):
+    """Root of tree with keys of root1 not in root2. Nodes of root1 are reused (root2 is unchanged)."""
+
+    return as_root(difference_h(*as_tree(root1), root2 if root2 is not None else NIL)[0])
+
+
+class RedBlackTree(object):
+    """Ordered map wrapping the functions above (handles the empty tree)."""
+
+    def __init__(self, items=()):
+
+        self.root = None
+
+        for key, val in items:
+            self.insert(key, val)
+
+    def __len__(self):
+        return self.root.size if self.root else 0
+
+    def __iter__(self):
+
+        for key, _ in self.items():
+            yield key
+
+    def __str__(self):
+        return str(self.root) if self.root else ''
+
+    def __contains__(self, key):
+        return self.root is not None and key in self.root
+
+    def __getitem__(self, key):
+
+        node = find(self.root, key) if self.root else None
+
+        if node is None:
+            raise KeyError(key)
+
+        return node.val
+
+    def get(self, key, default=None):
+
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __setitem__(self, key, val):
+        self.insert(key, val)
+
+    def __delitem__(self, key):
+        self.delete(key)
+
+    def insert(self, key, val=None):
+
+        if self.root is None:
+            self.root = Node(key, val, BLACK)
+        else:
+            self.root = insert(self.root, key, val)
+
+    def delete(self, key):
+
+        if self.root is None:
+            raise KeyError(key)
+
+        self.root = delete(self.root, key)
+
+    def items(self, lo=None, hi=None):
+        return iter_range(self.root, lo, hi) if self.root else iter(())
+
+    def range(self, lo=None, hi=None):
+        """Generate (key, val) with lo <= key < hi."""
+
+        return self.items(lo, hi)
+
+    @staticmethod
+    def item(node):
+        return None if node is None else (node.key, node.val)
+
+    def floor(self, key):
+        """(key, val) with greatest key <= key or None."""
+
+        return self.item(floor(self.root, key)) if self.root else None
+
+    def ceiling(self, key):
+        """(key, val) with smallest key >= key or None."""
+
+        return self.item(ceiling(self.root, key)) if self.root else None
+
+    def rank(self, key):
+        return rank(self.root, key) if self.root else 0
+
+    def select(self, k):
+        """(key, val) with k-th smallest key. Negative k counts from the end."""
+
+        if k < 0:
+            k += len(self)
+
+        if self.root is None:
+            raise IndexError
+
+        return self.item(select(self.root, k))
+
+    def bisect_left(self, key):
+        return self.rank(key)
+
+    def bisect_right(self, key):
+        return self.rank(key) + (key in self)
+
+    @classmethod
+    def from_sorted(cls, items):
+        """Tree from (key, val) items in strictly increasing key order in O(n) (ValueError if they are not)."""
+
+        tree = cls()
+        tree.root = from_sorted(items)
+
+        return tree
+
+    def union(self, other):
+        """Add items of other (its values win for keys in both). other is emptied since its nodes are reused."""
+
+        self.root = union(self.root, other.root)
+        other.root = None
+
+    def difference(self, other):
+        """Remove keys in other."""
+
+        self.root = difference(self.root, other.root)
+
+    def split(self, key):
+        """Split into trees with keys < key and keys >= key. self is emptied."""
+
+        left, found, right = split(self.root, key)
+
+        self.root = None
+
+        left_tree, right_tree = RedBlackTree(), RedBlackTree()
+        left_tree.root, right_tree.root = left, right
+
+        if found is not None:
+            right_tree.insert(found.key, found.val)
+
+        return left_tree, right_tree
+
+
+def benchmark(n):
+    """Memory per key and operations per second for n random keys."""
+
+    import random
+    import time
+    import tracemalloc
+
+    keys = random.sample(range(n), n)
+
+    tracemalloc.start()
+    tree = RedBlackTree((k, None) for k in keys)
+    res = {'bytes per key': tracemalloc.get_traced_memory()[0] / n}
+    tracemalloc.stop()
+
+    del tree
+
+    tree = RedBlackTree()
+
+    t0 = time.perf_counter()
+    for k in keys:
+        tree[k] = None
+    res['inserts/s'] = n / (time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    for k in keys:
+        k in tree
+    res['lookups/s'] = n / (time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    for k in keys:
+        del tree[k]
+    res['deletes/s'] = n / (time.perf_counter() - t0)
+
+    return res
+
+
+def benchmark_bulk(n, m):
+    """Seconds to build a tree of n sorted keys and to merge m keys into it: one by one vs bulk."""
+
+    import random
+    import time
+
+    items = [(k, None) for k in range(0, 2 * n, 2)]
+    new_items = sorted((k, None) for k in random.sample(range(2 * n), m))
+
+    res = {}
+
+    t0 = time.perf_counter()
+    tree = RedBlackTree(items)
+    res['build with insert'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    tree = RedBlackTree.from_sorted(items)
+    res['build with from_sorted'] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for k, v in new_items:
+        tree.insert(k, v)
+    res['merge with insert'] = time.perf_counter() - t0
+
+    tree = RedBlackTree.from_sorted(items)
+    other = RedBlackTree.from_sorted(new_items)
+
+    t0 = time.perf_counter()
+    tree.union(other)
+    res['merge with union'] = time.perf_counter() - t0
+
+    return res
 
 
 if __name__ == '__main__':
 
-    root = Node(0, 'foo', 'b')
+    root = Node(0, 'foo', BLACK)
 
     import random
     l = list(range(1, 1000))
@@ -460,3 +1163,88 @@ if __name__ == '__main__':
         root = delete(root, x)
 
     print(root)
+
+    import bisect
+    import time
+
+    tree = RedBlackTree()
+    keys = []
+
+    for _ in range(5000):
+        k = random.randrange(2000)
+        i = bisect.bisect_left(keys, k)
+        if i < len(keys) and keys[i] == k and random.random() < 0.5:
+            del tree[k]
+            keys.pop(i)
+        else:
+            tree[k] = -k
+            if i == len(keys) or keys[i] != k:
+                keys.insert(i, k)
+
+    check_sizes(tree.root)
+    check_parents(tree.root)
+    check_colors(tree.root)
+    assert list(tree) == keys and len(tree) == len(keys)
+    # the shared leaf is never modified
+    assert NIL.parent is None and NIL.color == BLACK and NIL.size == 0
+
+    for k in range(-5, 2005, 7):
+        i = bisect.bisect_left(keys, k)
+        j = bisect.bisect_right(keys, k)
+        assert tree.rank(k) == i and tree.bisect_right(k) == j
+        assert tree.ceiling(k) == ((keys[i], -keys[i]) if i < len(keys) else None)
+        assert tree.floor(k) == ((keys[j - 1], -keys[j - 1]) if j else None)
+        assert [key for key, _ in tree.range(k, k + 50)] == keys[i: bisect.bisect_left(keys, k + 50)]
+
+    assert all(tree.select(i)[0] == keys[i] for i in range(len(keys)))
+
+    # floor query by scanning ordered_elems vs walking the tree
+    n, n_queries = 100000, 100
+    tree = RedBlackTree((k, k) for k in range(0, 2 * n, 2))
+    queries = [random.randrange(2 * n) for _ in range(n_queries)]
+
+    t0 = time.perf_counter()
+    for q in queries:
+        elems = tree.root.ordered_elems()
+        elems[bisect.bisect_right(elems, (q, float('inf'))) - 1]
+    t_scan = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for q in queries:
+        tree.floor(q)
+    t_floor = time.perf_counter() - t0
+
+    print('{} floor queries on {} keys: ordered_elems {:.3f}s  floor {:.4f}s'.format(n_queries, n, t_scan, t_floor))
+
+    print({k: round(v) for k, v in benchmark(10 ** 6).items()})
+
+    a = RedBlackTree.from_sorted((k, 'a') for k in range(0, 1000, 2))
+    b = RedBlackTree.from_sorted((k, 'b') for k in range(0, 1000, 3))
+    a.union(b)
+    check_colors(a.root)
+    assert list(a) == sorted(set(range(0, 1000, 2)) | set(range(0, 1000, 3))) and a[6] == 'b'
+    # much smaller trees are inserted into the larger one (values of the second tree still win)
+    big = RedBlackTree.from_sorted((k, 'big') for k in range(1000))
+    big.union(RedBlackTree.from_sorted((k, 'small') for k in range(0, 2000, 100)))
+    small = RedBlackTree.from_sorted((k, 'small') for k in range(0, 2000, 100))
+    small.union(RedBlackTree.from_sorted((k, 'big') for k in range(1000)))
+    for t, winner in [(big, 'small'), (small, 'big')]:
+        check_sizes(t.root)
+        check_colors(t.root)
+        assert list(t) == sorted(set(range(1000)) | set(range(0, 2000, 100))) and t[100] == winner and t[1500] == 'small'
+
+    for bad in [[(1, None), (0, None)], [(0, None), (0, None)]]:
+        try:
+            RedBlackTree.from_sorted(bad)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError('from_sorted accepted {}'.format(bad))
+
+    a.difference(RedBlackTree.from_sorted((k, None) for k in range(0, 1000, 5)))
+    left, right = a.split(500)
+    assert len(left) + len(right) == len([k for k in range(1000) if (k % 2 == 0 or k % 3 == 0) and k % 5])
+
+    for n, m in [(10 ** 6, 1000), (10 ** 6, 100000), (10 ** 5, 10 ** 5)]:
+        print('n = {} m = {}: '.format(n, m) + '  '.join(
+            '{} {:.3f}s'.format(name, t) for name, t in benchmark_bulk(n, m).items()))
@@ -0,0 +1,267 @@
+"""
+Bounded FIFO queue of fixed size records in shared memory for passing data between processes without pickling.
+
+Summary:
+
+    Records live in a ring of slots in a `multiprocessing.shared_memory` block. Each slot has a sequence number saying
+    whose turn it is (a bounded MPMC queue as described by Dmitry Vyukov):
+
+    * slot for position p is free for the producer of p when seq == p
+    * it holds the record for position p when seq == p + 1
+    * after the consumer of p takes the record it sets seq = p + capacity (free for the next lap)
+
+    A producer claims position `tail` by incrementing it and a consumer claims `head` the same way. Python has no
+    atomic compare-and-swap on shared memory so claiming (read + increment of one counter) is done under a lock, but
+    copying the record in/out and publishing it happens outside the lock so producers and consumers copy in parallel.
+    With a single producer (or consumer) that lock can be skipped.
+
+    Counters and sequence numbers are 8 byte aligned words written with a single store.
+
+Characteristics:
+
+    * r record size
+
+    Enqueue:
+        Worst Time: O(r)
+    Dequeue:
+        Worst Time: O(r)
+"""
+
+import multiprocessing
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+
+from data_structures.blocking_queue import FullQueueException
+from data_structures.fifo_queue import EmptyQueueException
+
+WORD = struct.Struct('<Q')
+SLOT_HEADER = struct.Struct('<QQ')  # seq, record length
+
+# head and tail on separate cache lines
+TAIL_OFFSET = 0
+HEAD_OFFSET = 64
+HEADER_SIZE = 128
+
+
+class SharedMemoryQueue(object):
+
+    def __init__(self, capacity, record_size, multi_producer=True, multi_consumer=True, name=None,
+                 poll_interval=1e-5):
+
+        self.capacity = capacity
+        self.record_size = record_size
+        self.poll_interval = poll_interval
+
+        # slots padded to 8 bytes so sequence numbers stay aligned
+        self.slot_size = SLOT_HEADER.size + (record_size + 7) // 8 * 8
+
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=HEADER_SIZE + capacity * self.slot_size)
+        # forked children inherit this object so remember which process should unlink the block
+        self.owner_pid = os.getpid()
+
+        self.buf = self.shm.buf
+        self.buf[:HEADER_SIZE] = bytes(HEADER_SIZE)
+
+        for pos in range(capacity):
+            SLOT_HEADER.pack_into(self.buf, self.slot_offset(pos), pos, 0)
+
+        self.producer_lock = multiprocessing.Lock() if multi_producer else None
+        self.consumer_lock = multiprocessing.Lock() if multi_consumer else None
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def __getstate__(self):
+
+        # locks can only be pickled when passed to a new process
+        return (self.shm.name, self.capacity, self.record_size, self.slot_size, self.poll_interval,
+                self.producer_lock, self.consumer_lock)
+
+    def __setstate__(self, state):
+
+        (name, self.capacity, self.record_size, self.slot_size, self.poll_interval,
+         self.producer_lock, self.consumer_lock) = state
+
+        # child processes share the creator's resource tracker so attaching does not add a second registration
+        self.shm = shared_memory.SharedMemory(name=name)
+
+        self.owner_pid = None
+        self.buf = self.shm.buf
+
+    def __len__(self):
+
+        return WORD.unpack_from(self.buf, TAIL_OFFSET)[0] - WORD.unpack_from(self.buf, HEAD_OFFSET)[0]
+
+    def slot_offset(self, pos):
+        return HEADER_SIZE + (pos % self.capacity) * self.slot_size
+
+    def claim(self, counter_offset, lock, expected_seq):
+        """Claim next position of counter if its slot has the expected sequence number (relative to position)."""
+
+        buf = self.buf
+
+        if lock is not None:
+            lock.acquire()
+
+        try:
+            pos = WORD.unpack_from(buf, counter_offset)[0]
+
+            if WORD.unpack_from(buf, self.slot_offset(pos))[0] != pos + expected_seq:
+                return None
+
+            WORD.pack_into(buf, counter_offset, pos + 1)
+        finally:
+            if lock is not None:
+                lock.release()
+
+        return pos
+
+    def enqueue(self, record):
+
+        n = len(record)
+
+        if n > self.record_size:
+            raise ValueError('record larger than record size {}'.format(self.record_size))
+
+        pos = self.claim(TAIL_OFFSET, self.producer_lock, 0)
+
+        if pos is None:
+            raise FullQueueException
+
+        offset = self.slot_offset(pos)
+        start = offset + SLOT_HEADER.size
+
+        self.buf[start: start + n] = record
+
+        # publish record
+        SLOT_HEADER.pack_into(self.buf, offset, pos + 1, n)
+
+    def dequeue(self):
+
+        pos = self.claim(HEAD_OFFSET, self.consumer_lock, 1)
+
+        if pos is None:
+            raise EmptyQueueException
+
+        offset = self.slot_offset(pos)
+        start = offset + SLOT_HEADER.size
+
+        n = SLOT_HEADER.unpack_from(self.buf, offset)[1]
+        record = bytes(self.buf[start: start + n])
+
+        # free slot for next lap
+        WORD.pack_into(self.buf, offset, pos + self.capacity)
+
+        return record
+
+    def wait(self, func, exception, arg, timeout):
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        while True:
+            try:
+                return func(*arg)
+            except exception:
+                if deadline is not None and time.monotonic() >= deadline:
+                    raise
+                time.sleep(self.poll_interval)
+
+    def put(self, record, block=True, timeout=None):
+
+        if not block:
+            return self.enqueue(record)
+
+        self.wait(self.enqueue, FullQueueException, (record,), timeout)
+
+    def get(self, block=True, timeout=None):
+
+        if not block:
+            return self.dequeue()
+
+        return self.wait(self.dequeue, EmptyQueueException, (), timeout)
+
+    def close(self):
+
+        self.buf = None
+        self.shm.close()
+
+        if self.owner_pid == os.getpid():
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def produce(q, num_records, record):
+
+    for _ in range(num_records):
+        q.put(record)
+
+    q.close()
+
+
+def produce_mp(q, num_records, record):
+
+    for _ in range(num_records):
+        q.put(record)
+
+
+def benchmark(record_size, num_producers=4, num_records=20000):
+    """Records per second from producer processes to this process."""
+
+    record = bytes(record_size)
+    per_producer = num_records // num_producers
+
+    res = {}
+
+    for name in ['multiprocessing.Queue', 'SharedMemoryQueue']:
+
+        if name == 'SharedMemoryQueue':
+            q = SharedMemoryQueue(1024, record_size, multi_consumer=False)
+        else:
+            q = multiprocessing.Queue(1024)
+
+        procs = [multiprocessing.Process(target=produce if name == 'SharedMemoryQueue' else produce_mp,
+                                         args=(q, per_producer, record)) for _ in range(num_producers)]
+
+        t0 = time.perf_counter()
+
+        for p in procs:
+            p.start()
+        for _ in range(per_producer * num_producers):
+            q.get()
+        for p in procs:
+            p.join()
+
+        res[name] = per_producer * num_producers / (time.perf_counter() - t0)
+
+        if name == 'SharedMemoryQueue':
+            q.close()
+
+    return res
+
+
+if __name__ == '__main__':
+
+    with SharedMemoryQueue(4, 16) as q:
+        q.enqueue(b'hello')
+        q.enqueue(b'world')
+        print(q.dequeue(), q.dequeue(), len(q))
+
+        for i in range(4):
+            q.enqueue(bytes([i]))
+        try:
+            q.enqueue(b'full')
+        except FullQueueException:
+            print('full')
+
+    for record_size in [64, 1024, 16384]:
+        rates = benchmark(record_size)
+        print('record size {:6d}: '.format(record_size) +
+              '  '.join('{} {:.0f} records/s'.format(name, rate) for name, rate in rates.items()))
@@ -0,0 +1,344 @@
+"""
+Ordered map as a skip list: sorted linked lists at several levels where each level skips over more nodes.
+
+Summary:
+
+    Every node is in the level 0 list. A node is also in levels 1..h-1 where its height h is random (each extra level
+    with probability 1/2), so level i holds ~n / 2^i nodes. A search starts at the top level of the head node, moves
+    right while the next key is smaller and drops a level otherwise -- ~2 steps per level in expectation.
+
+    Nodes are towers: one object with a list of next pointers (one per level it is in).
+
+    Unlike a balanced tree, changes never move other nodes: an insert or delete only relinks the next pointers before
+    and after one node. With one writer at a time (writers share a lock) readers need no lock at all:
+
+    * an insert fills in all next pointers of the new node before linking it in, bottom level first, so a reader that
+      reaches the node at any level can continue down and right from it
+    * a delete unlinks the node top level first and leaves its own next pointers unchanged, so a reader standing on it
+      still continues to later nodes
+
+    Each link update is a single list item store which is atomic under the GIL.
+
+Characteristics:
+
+    * n number elements
+    * k number elements generated
+
+    Search:
+        Average Time: O(logn)
+        Worst Time: O(n)
+    Insert/delete:
+        Average Time: O(logn)
+        Worst Time: O(n)
+    Floor/ceiling:
+        Average Time: O(logn)
+    Range:
+        Average Time: O(logn + k)
+"""
+
+import random
+import threading
+
+MAX_LEVEL = 32
+
+
+class Node(object):
+
+    __slots__ = ('key', 'val', 'next')
+
+    def __init__(self, key, val, height):
+
+        self.key = key
+        self.val = val
+
+        self.next = [None] * height
+
+
+class SkipList(object):
+
+    def __init__(self, items=()):
+
+        self.head = Node(None, None, MAX_LEVEL)
+
+        # number of levels in use
+        self.level = 1
+        self.size = 0
+
+        self.write_lock = threading.Lock()
+
+        for key, val in items:
+            self.insert(key, val)
+
+    def __len__(self):
+        return self.size
+
+    @staticmethod
+    def random_height():
+
+        # number of trailing zero bits of a random int + 1 is geometric with p = 1/2
+        bits = random.getrandbits(MAX_LEVEL - 1) | (1 << (MAX_LEVEL - 1))
+
+        return (bits & -bits).bit_length()
+
+    def last_before(self, key):
+        """Last node with key < key (head if there is none)."""
+
+        node = self.head
+        # node known to have key >= key (no need to compare again on the level below)
+        stop = None
+
+        for i in range(self.level - 1, -1, -1):
+            nxt = node.next[i]
+            # (nxt can still be None if a writer unlinked stop meanwhile)
+            while nxt is not stop and nxt is not None and nxt.key < key:
+                node = nxt
+                nxt = node.next[i]
+            stop = nxt
+
+        return node
+
+    def find(self, key):
+
+        node = self.last_before(key).next[0]
+
+        return node if node is not None and node.key == key else None
+
+    def __contains__(self, key):
+        return self.find(key) is not None
+
+    def get(self, key, default=None):
+
+        node = self.find(key)
+
+        return default if node is None else node.val
+
+    def __getitem__(self, key):
+
+        node = self.find(key)
+
+        if node is None:
+            raise KeyError(key)
+
+        return node.val
+
+    def __setitem__(self, key, val):
+        self.insert(key, val)
+
+    def __delitem__(self, key):
+        self.delete(key)
+
+    def predecessors(self, key):
+        """Last node with key < key at each level (writer only)."""
+
+        preds = [self.head] * MAX_LEVEL
+        node = self.head
+
+        for i in range(self.level - 1, -1, -1):
+            nxt = node.next[i]
+            while nxt is not None and nxt.key < key:
+                node = nxt
+                nxt = node.next[i]
+            preds[i] = node
+
+        return preds
+
+    def insert(self, key, val):
+
+        with self.write_lock:
+
+            preds = self.predecessors(key)
+
+            node = preds[0].next[0]
+            if node is not None and node.key == key:
+                node.val = val
+                return
+
+            height = self.random_height()
+            node = Node(key, val, height)
+
+            for i in range(height):
+                node.next[i] = preds[i].next[i]
+
+            # publish bottom up so a node reachable at level i is already linked below i
+            for i in range(height):
+                preds[i].next[i] = node
+
+            if height > self.level:
+                self.level = height
+
+            self.size += 1
+
+    def delete(self, key):
+        """Remove key and return its value."""
+
+        with self.write_lock:
+
+            preds = self.predecessors(key)
+
+            node = preds[0].next[0]
+            if node is None or node.key != key:
+                raise KeyError(key)
+
+            # unlink top down (node.next stays intact for readers on it)
+            for i in range(len(node.next) - 1, -1, -1):
+                preds[i].next[i] = node.next[i]
+
+            while self.level > 1 and self.head.next[self.level - 1] is None:
+                self.level -= 1
+
+            self.size -= 1
+
+            return node.val
+
+    def floor(self, key):
+        """(key, val) with greatest key <= key or None."""
+
+        node = self.head
+
+        for i in range(self.level - 1, -1, -1):
+            nxt = node.next[i]
+            while nxt is not None and not key < nxt.key:
+                node = nxt
+                nxt = node.next[i]
+
+        return None if node is self.head else (node.key, node.val)
+
+    def ceiling(self, key):
+        """(key, val) with smallest key >= key or None."""
+
+        node = self.last_before(key).next[0]
+
+        return None if node is None else (node.key, node.val)
+
+    def items(self, lo=None, hi=None):
+        """Generate (key, val) with lo <= key < hi in order (None for no bound)."""
+
+        node = self.head.next[0] if lo is None else self.last_before(lo).next[0]
+
+        while node is not None and (hi is None or node.key < hi):
+            yield node.key, node.val
+            node = node.next[0]
+
+    def range(self, lo=None, hi=None):
+        """Generate (key, val) with lo <= key < hi."""
+
+        return self.items(lo, hi)
+
+    def __iter__(self):
+
+        for key, _ in self.items():
+            yield key
+
+
+class LockedRedBlackTree(object):
+    """RedBlackTree where readers and writers share one lock (rotations make unlocked reads unsafe)."""
+
+    def __init__(self):
+
+        from data_structures.red_black_tree import RedBlackTree
+
+        self.tree = RedBlackTree()
+        self.lock = threading.Lock()
+
+    def get(self, key, default=None):
+
+        with self.lock:
+            return self.tree.get(key, default)
+
+    def insert(self, key, val):
+
+        with self.lock:
+            self.tree.insert(key, val)
+
+    def delete(self, key):
+
+        with self.lock:
+            self.tree.delete(key)
+
+
+def benchmark_threads(m, num_readers, n=100000, duration=2.0):
+    """
+    Reads and writes per second with num_readers threads doing lookups while one thread inserts/deletes.
+
+    m starts with n keys (even numbers) and the writer inserts and deletes odd keys.
+    """
+
+    import time
+
+    for k in range(0, 2 * n, 2):
+        m.insert(k, k)
+
+    stop = threading.Event()
+    counts = [0] * (num_readers + 1)
+
+    def read(idx):
+
+        rng = random.Random(idx)
+        get = m.get
+        count = 0
+
+        while not stop.is_set():
+            for _ in range(100):
+                key = 2 * rng.randrange(n)
+                assert get(key) == key
+            count += 100
+
+        counts[idx] = count
+
+    def write():
+
+        rng = random.Random(-1)
+        count = 0
+
+        while not stop.is_set():
+            key = 2 * rng.randrange(n) + 1
+            m.insert(key, key)
+            m.delete(key)
+            count += 2
+
+        counts[-1] = count
+
+    threads = [threading.Thread(target=read, args=(i,)) for i in range(num_readers)]
+    threads.append(threading.Thread(target=write))
+
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    return sum(counts[:-1]) / duration, counts[-1] / duration
+
+
+if __name__ == '__main__':
+
+    import bisect
+
+    sl = SkipList()
+    keys = []
+
+    for _ in range(20000):
+        k = random.randrange(3000)
+        i = bisect.bisect_left(keys, k)
+        if i < len(keys) and keys[i] == k:
+            if random.random() < 0.5:
+                assert sl.delete(k) == -k
+                keys.pop(i)
+        else:
+            sl[k] = -k
+            keys.insert(i, k)
+
+    assert list(sl) == keys and len(sl) == len(keys)
+
+    for k in range(-5, 3005, 7):
+        i = bisect.bisect_left(keys, k)
+        j = bisect.bisect_right(keys, k)
+        assert sl.ceiling(k) == ((keys[i], -keys[i]) if i < len(keys) else None)
+        assert sl.floor(k) == ((keys[j - 1], -keys[j - 1]) if j else None)
+        assert [key for key, _ in sl.range(k, k + 50)] == keys[i: bisect.bisect_left(keys, k + 50)]
+
+    for num_readers in [1, 4]:
+        for name, make_map in [('SkipList', SkipList), ('RedBlackTree + lock', LockedRedBlackTree)]:
+            reads, writes = benchmark_threads(make_map(), num_readers)
+            print('{} readers {:20s} {:9.0f} reads/s {:8.0f} writes/s'.format(num_readers, name, reads, writes))
@@ -1,16 +1,21 @@
 """
-Stack (LIFO) implemented using singly linked list.
+Stack (LIFO) implemented using singly linked list or an array.
 
 Summary:
 
     Supports pushing to top of stack and popping off of top of stack.
 
+    The array version keeps the top of the stack at the end of a dynamic array (a Python list) so no node is allocated
+    per item and batches are pushed/popped with one slice operation.
+
 Characteristics:
 
     Push:
-        Worst Time: O(1)
+        Worst Time: O(1) -- amortized for array
     Pop:
-        Worst Time: O(1)
+        Worst Time: O(1) -- amortized for array
+    Push/pop k items (array):
+        Worst Time: O(k) amortized
 """
 
 from data_structures.linked_list import LinkedList
@@ -21,9 +26,17 @@ class Stack:
     def __init__(self):
         self.list = LinkedList()
 
+    def __len__(self):
+        return self.list.n
+
     def push(self, item):
         self.list.append_left(item)
 
+    def push_many(self, items):
+
+        for item in items:
+            self.list.append_left(item)
+
     def pop(self):
 
         if self.list.n == 0:
@@ -31,6 +44,86 @@ class Stack:
 
         return self.list.pop(0)
 
+    def pop_many(self, k):
+
+        if k < 0:
+            raise ValueError('k must be >= 0')
+
+        return [self.list.pop(0) for _ in range(min(k, self.list.n))]
+
+    def peek(self):
+
+        if self.list.n == 0:
+            raise EmptyStackException
+
+        return self.list.head.val
+
+
+class ArrayStack:
+
+    def __init__(self):
+        self.array = []
+
+    def __len__(self):
+        return len(self.array)
+
+    def push(self, item):
+        self.array.append(item)
+
+    def push_many(self, items):
+        self.array.extend(items)
+
+    def pop(self):
+
+        if not self.array:
+            raise EmptyStackException
+
+        return self.array.pop()
+
+    def pop_many(self, k):
+        """Pop up to k items (top of stack first)."""
+
+        if k < 0:
+            raise ValueError('k must be >= 0')
+
+        k = min(k, len(self.array))
+
+        if not k:
+            return []
+
+        items = self.array[:-k - 1:-1]
+        del self.array[-k:]
+
+        return items
+
+    def peek(self):
+
+        if not self.array:
+            raise EmptyStackException
+
+        return self.array[-1]
+
 
 class EmptyStackException(Exception):
     pass
+
+
+if __name__ == '__main__':
+
+    import time
+
+    for cls in [Stack, ArrayStack]:
+        s = cls()
+        s.push_many([1, 2, 3])
+        s.push(4)
+        assert s.peek() == 4 and s.pop_many(3) == [4, 3, 2] and s.pop() == 1 and len(s) == 0
+
+    batch = list(range(1000))
+
+    for cls in [Stack, ArrayStack]:
+        s = cls()
+        t0 = time.perf_counter()
+        for _ in range(1000):
+            s.push_many(batch)
+            s.pop_many(len(batch))
+        print('{:10s} {:.3f}s for 1e6 items in batches of 1000'.format(cls.__name__, time.perf_counter() - t0))
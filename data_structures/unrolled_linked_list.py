@@ -0,0 +1,252 @@
+"""
+Linked list of fixed size blocks of values.
+
+Summary:
+
+    Each node holds up to block_size values in an array (a Python list) instead of one value. Iterating/searching then
+    follows one pointer per block, and indexing skips whole blocks by their lengths. A full block is split in two on
+    insert and a block less than half full is merged with (or refilled from) its successor on pop, so blocks stay at
+    least half full (apart from the ends) and memory overhead per value stays low.
+
+    Unlike LinkedList there are no per value nodes, so indexing returns the value itself.
+
+Characteristics:
+
+    * n number elements
+    * b block size
+
+    Index:
+        Worst Time: O(n / b)
+    Search:
+        Worst Time: O(n)
+    Append left/right:
+        Worst Time: O(b) -- O(1) for right
+    Pop:
+        Worst Time: O(n / b + b)
+    Insert:
+        Worst Time: O(n / b + b)
+"""
+
+
+class Block(object):
+
+    __slots__ = ('vals', 'next')
+
+    def __init__(self, vals, next_=None):
+
+        self.vals = vals
+        self.next = next_
+
+
+class UnrolledLinkedList(object):
+
+    def __init__(self, block_size=64):
+
+        self.block_size = block_size
+
+        self.head = None
+        self.last = None
+        self.n = 0
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+
+        block = self.head
+        while block is not None:
+            yield from block.vals
+            block = block.next
+
+    def __str__(self):
+
+        return '-'.join(map(str, self))
+
+    def __contains__(self, item):
+
+        block = self.head
+        while block is not None:
+            # search within a block is done in C
+            if item in block.vals:
+                return True
+            block = block.next
+
+        return False
+
+    def find(self, idx):
+        """Get (block before, block, offset in block) for element idx."""
+
+        prev, block = None, self.head
+
+        while idx >= len(block.vals):
+            idx -= len(block.vals)
+            prev, block = block, block.next
+
+        return prev, block, idx
+
+    def __getitem__(self, idx):
+
+        if not isinstance(idx, int):
+            raise TypeError
+
+        if idx < 0:
+            idx += self.n
+
+        if not 0 <= idx < self.n:
+            raise IndexError
+
+        _, block, offset = self.find(idx)
+
+        return block.vals[offset]
+
+    def append_left(self, item):
+
+        if self.head is None or len(self.head.vals) >= self.block_size:
+            self.head = Block([item], self.head)
+            if self.last is None:
+                self.last = self.head
+        else:
+            self.head.vals.insert(0, item)
+
+        self.n += 1
+
+    def append_right(self, item):
+
+        if self.last is None or len(self.last.vals) >= self.block_size:
+            block = Block([item])
+            if self.last is None:
+                self.head = block
+            else:
+                self.last.next = block
+            self.last = block
+        else:
+            self.last.vals.append(item)
+
+        self.n += 1
+
+    def insert(self, idx, val):
+
+        if idx < 0:
+            idx += self.n
+
+        if not 0 <= idx <= self.n:
+            raise IndexError
+
+        if idx == 0:
+            return self.append_left(val)
+        if idx == self.n:
+            return self.append_right(val)
+
+        _, block, offset = self.find(idx)
+
+        if len(block.vals) >= self.block_size:
+            # split full block in half
+            half = len(block.vals) // 2
+            block.next = Block(block.vals[half:], block.next)
+            del block.vals[half:]
+
+            if block is self.last:
+                self.last = block.next
+
+            if offset > half:
+                block, offset = block.next, offset - half
+
+        block.vals.insert(offset, val)
+
+        self.n += 1
+
+    def pop(self, idx):
+
+        if idx < 0:
+            idx += self.n
+
+        if not 0 <= idx < self.n:
+            raise IndexError
+
+        prev, block, offset = self.find(idx)
+
+        val = block.vals.pop(offset)
+
+        self.n -= 1
+
+        nxt = block.next
+
+        if not block.vals:
+            # unlink empty block
+            if prev is None:
+                self.head = nxt
+            else:
+                prev.next = nxt
+            if block is self.last:
+                self.last = prev
+        elif nxt is not None and len(block.vals) < self.block_size // 2:
+            if len(block.vals) + len(nxt.vals) <= self.block_size:
+                # merge successor into block
+                block.vals.extend(nxt.vals)
+                block.next = nxt.next
+                if nxt is self.last:
+                    self.last = block
+            else:
+                # refill block from front of successor
+                k = self.block_size // 2 - len(block.vals)
+                block.vals.extend(nxt.vals[:k])
+                del nxt.vals[:k]
+
+        return val
+
+
+if __name__ == '__main__':
+
+    import random
+    import time
+    from collections import deque
+
+    from data_structures.linked_list import LinkedList
+
+    ul = UnrolledLinkedList(block_size=4)
+    l = []
+
+    for i in range(5000):
+        if random.random() < 0.6 or not l:
+            idx = random.randint(0, len(l))
+            ul.insert(idx, i)
+            l.insert(idx, i)
+        else:
+            idx = random.randint(-len(l), len(l) - 1)
+            assert ul.pop(idx) == l.pop(idx)
+
+    assert list(ul) == l and all(ul[i] == l[i] for i in range(-len(l), len(l), 7))
+
+    for bad in [len(l), -len(l) - 1]:
+        try:
+            ul[bad]
+        except IndexError:
+            pass
+        else:
+            raise AssertionError('index {} should be out of range'.format(bad))
+
+    n = 100000
+    n_lookups = 200
+
+    for cls in [LinkedList, UnrolledLinkedList, deque]:
+
+        c = cls()
+        append = c.append if cls is deque else c.append_right
+
+        t0 = time.perf_counter()
+        for i in range(n):
+            append(i)
+        t_append = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for i in range(0, n, n // n_lookups):
+            c[i]
+        t_index = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        for _ in range(10):
+            -1 in c
+        t_contains = time.perf_counter() - t0
+
+        print('{:18s} append {:.4f}s  index x{} {:.4f}s  contains (miss) x10 {:.4f}s'.format(
+            cls.__name__, t_append, n_lookups, t_index, t_contains))
@@ -11,44 +11,45 @@ Characteristics:
     * n number nodes
     * e number edges
 
-    Worst Time: O(n ** 2) or O(n e loge) if using priority queue
+    Worst Time: O(n ** 2) or O(e logn) if using priority queue with decrease key
 
 Other:
 
     * Bellman-Ford slower but handles negative weights
 """
 
-from collections import defaultdict
+from data_structures.heap import IndexedHeap
 
 
 def djikstra(graph: dict, source: str, destination: str):
 
-    # TODO(jalex): improve this with a priority q (implementing modify operation)
     # TODO(jalex): Change this to be directed
     # TODO(jalex): Update this to be all destinations
 
-    distances = defaultdict(lambda: float('inf'))
-    distances[source] = 0
+    distances = IndexedHeap()
+    handles = {source: distances.push(0, source)}
 
     processed = set()
 
-    current = source
+    while distances:
 
-    while current != destination:
+        dist_current, current = distances.pop()
 
-        for neighbor, dist in graph[current]:
-            distances[neighbor] = min(distances[neighbor], distances[current] + dist)
+        if current == destination:
+            return dist_current
 
         processed.add(current)
 
-        while current in processed:
-            distances.pop(current)
-            try:
-                current = min(distances.items(), key=lambda x: x[1])[0]
-            except ValueError:
-                return
+        for neighbor, dist in graph[current]:
+            if neighbor in processed:
+                continue
+
+            dist_neighbor = dist_current + dist
 
-    return distances[destination]
+            if neighbor not in handles:
+                handles[neighbor] = distances.push(dist_neighbor, neighbor)
+            elif dist_neighbor < distances.priority(handles[neighbor]):
+                distances.decrease_key(handles[neighbor], dist_neighbor)
 
 
 if __name__ == '__main__':
@@ -23,7 +23,7 @@ Other:
     * Kruskal
 """
 
-from data_structures.heap import Heap
+from data_structures.heap import IndexedHeap
 
 import bisect
 
@@ -46,9 +46,9 @@ def prim(graph: list):
 
     n = len(vertices)
 
-    distances = [float('inf')] * n
-    min_dist_heap = Heap.heapify(zip(distances, vertices[1:]))
-    min_dist_heap.push((0, vertices[0]))
+    min_dist_heap = IndexedHeap(arity=4)
+    handles = {v: min_dist_heap.push(float('inf'), v) for v in vertices[1:]}
+    handles[vertices[0]] = min_dist_heap.push(0, vertices[0])
 
     mst = []
 
@@ -65,7 +65,8 @@ def prim(graph: list):
         idx_adj_list = bisect.bisect_left(keys, node_added)
 
         # O(e) times total in this block
-        for n1, n2, w in adj_list[idx_adj_list:]:
+        for idx in range(idx_adj_list, len(adj_list)):
+            n1, n2, w = adj_list[idx]
             if n1 != node_added:
                 break
 
@@ -73,12 +74,10 @@ def prim(graph: list):
             if n2 not in candidate_edge:
                 continue
 
-            idx_dist = bisect.bisect_left(vertices, n2)
-            if w < distances[idx_dist]:
-                w0 = distances[idx_dist]
-                distances[idx_dist] = w
+            handle = handles[n2]
+            if w < min_dist_heap.priority(handle):
                 # O(logn)
-                min_dist_heap.modify((w0, n2), (w, n2))
+                min_dist_heap.decrease_key(handle, w)
                 candidate_edge[n2] = (n1, n2, w)
 
     return mst[1:]
@@ -12,19 +12,15 @@ Characteristics:
     Worst Time: O(n logn)
 """
 
-from data_structures.heap import Heap
+from data_structures.heap import DaryHeap
 
 
 def heap_sort(l: list):
 
-    min_heap = Heap.heapify(l)
+    # 4-ary heap is shallower so fewer levels are traversed per pop
+    min_heap = DaryHeap.heapify(l, typecode=None)
 
-    res = []
-
-    while min_heap.size > 0:
-        res.append(min_heap.pop())
-
-    return res
+    return [val for val, _ in min_heap.pop_many(len(min_heap))]
 
 
 if __name__ == '__main__':